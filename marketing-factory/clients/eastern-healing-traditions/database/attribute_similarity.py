@@ -0,0 +1,256 @@
+"""
+Attribute Similarity Fallback for Eastern Healing Traditions
+Droom Marketing Factory
+
+Answers "find content similar to X" when Pinecone is unavailable, using the
+shared attribute graph instead of embeddings. Each brand's Content ->
+Tone / Aesthetic / ColorPalette / Composition / NarrativeElement edges are
+exported once into a SciPy CSR matrix (one row per content item, one column
+per shared attribute value, weighted by HAS_TONE / HAS_AESTHETIC confidence
+and LABEL_WEIGHTS), rows are L2-normalized, and top-k neighbors come from a
+sparse matrix-vector product: milliseconds per query instead of a live
+multi-hop traversal.
+
+The matrix is cached under .cache/similarity/ and refreshed incrementally:
+only content whose profile_date is newer than the last refresh (new or
+re-profiled by ingest_content.py) is re-read from Neo4j, and its rows are
+replaced or appended. --rebuild re-exports everything (e.g. after content
+is deleted).
+
+Usage:
+    python attribute_similarity.py eht-3f2a9c1b7d4e5f60
+    python attribute_similarity.py eht-3f2a9c1b7d4e5f60 --top 20
+    python attribute_similarity.py --rebuild
+
+    from attribute_similarity import AttributeSimilarity
+    engine = AttributeSimilarity.load()
+    engine.refresh(driver)
+    engine.similar("eht-3f2a9c1b7d4e5f60", top_k=10)   # [(content_id, score), ...]
+
+Requires:
+    pip install neo4j numpy scipy python-dotenv
+
+Environment variables (loaded from ../../.env or set directly):
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+from ingest_content import RELATIONSHIPS
+from init_neo4j import BRAND_ID, NEO4J_URI, SHARED_ATTRIBUTES, connect, require_env
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+_script_dir = Path(__file__).resolve().parent
+CACHE_DIR = _script_dir / ".." / ".." / ".." / ".cache" / "similarity"
+
+# Relative weight of each attribute family in the cosine.
+LABEL_WEIGHTS = {
+    "Tone": 1.0,
+    "Aesthetic": 1.0,
+    "ColorPalette": 0.5,
+    "Composition": 0.5,
+    "NarrativeElement": 0.75,
+}
+
+# Fixed column space: every seeded value of every content attribute label.
+COLUMNS = [
+    (label, name)
+    for label, _, _ in RELATIONSHIPS.values()
+    for name in SHARED_ATTRIBUTES[label]
+]
+COLUMN_INDEX = {column: i for i, column in enumerate(COLUMNS)}
+REL_LABELS = {rel: label for rel, (label, _, _) in RELATIONSHIPS.items()}
+
+EDGE_QUERY = (
+    "MATCH (c:Droom:Content {brand_id: $brand_id}) "
+    "WHERE $since IS NULL OR c.profile_date > datetime($since) "
+    "OPTIONAL MATCH (c)-[r:" + "|".join(RELATIONSHIPS) + "]->(a:Droom) "
+    "RETURN c.id AS id, toString(c.profile_date) AS profile_date, "
+    "  collect([type(r), a.name, r.confidence]) AS edges"
+)
+
+# ---------------------------------------------------------------------------
+# Engine
+# ---------------------------------------------------------------------------
+
+
+def attribute_rows(records):
+    """Build (ids, normalized CSR matrix, newest profile_date) from EDGE_QUERY records."""
+    ids, data, indices, indptr = [], [], [], [0]
+    newest = None
+    for record in records:
+        weights = {}
+        for rel, name, confidence in record["edges"]:
+            column = COLUMN_INDEX.get((REL_LABELS.get(rel), name))
+            if column is None:
+                continue
+            label = COLUMNS[column][0]
+            weight = LABEL_WEIGHTS[label] * (1.0 if confidence is None else float(confidence))
+            weights[column] = max(weights.get(column, 0.0), weight)
+        ids.append(record["id"])
+        indices.extend(weights)
+        data.extend(weights.values())
+        indptr.append(len(indices))
+        if record["profile_date"] and (newest is None or record["profile_date"] > newest):
+            newest = record["profile_date"]
+    matrix = sparse.csr_matrix(
+        (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), indptr),
+        shape=(len(ids), len(COLUMNS)),
+    )
+    return ids, _normalize(matrix), newest
+
+
+def _normalize(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(sparse.diags(1.0 / norms).dot(matrix), dtype=np.float32)
+
+
+class AttributeSimilarity:
+    """Weighted-cosine content similarity over one brand's attribute matrix."""
+
+    def __init__(self, brand_id=BRAND_ID, ids=None, matrix=None, watermark=None):
+        self.brand_id = brand_id
+        self.ids = list(ids or [])
+        self.matrix = matrix if matrix is not None else \
+            sparse.csr_matrix((0, len(COLUMNS)), dtype=np.float32)
+        self.watermark = watermark
+        self._positions = {cid: i for i, cid in enumerate(self.ids)}
+
+    # --- persistence ---
+
+    @staticmethod
+    def paths(brand_id, cache_dir=CACHE_DIR):
+        return Path(cache_dir) / f"{brand_id}.npz", Path(cache_dir) / f"{brand_id}.json"
+
+    @classmethod
+    def load(cls, brand_id=BRAND_ID, cache_dir=CACHE_DIR):
+        """Load the cached matrix, or an empty engine if there is none."""
+        matrix_path, meta_path = cls.paths(brand_id, cache_dir)
+        if not matrix_path.exists() or not meta_path.exists():
+            return cls(brand_id)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("columns") != len(COLUMNS):
+            return cls(brand_id)  # attribute vocabulary changed; rebuild
+        return cls(brand_id, meta["ids"], sparse.load_npz(matrix_path).tocsr(),
+                   meta.get("watermark"))
+
+    def save(self, cache_dir=CACHE_DIR):
+        matrix_path, meta_path = self.paths(self.brand_id, cache_dir)
+        matrix_path.parent.mkdir(parents=True, exist_ok=True)
+        sparse.save_npz(matrix_path, self.matrix)
+        with open(meta_path, "w") as f:
+            json.dump({"ids": self.ids, "watermark": self.watermark,
+                       "columns": len(COLUMNS)}, f)
+
+    # --- maintenance ---
+
+    def refresh(self, driver, rebuild=False):
+        """Pull content profiled since the watermark; returns rows changed."""
+        since = None if rebuild else self.watermark
+        with driver.session() as session:
+            records = session.run(EDGE_QUERY, brand_id=self.brand_id, since=since).data()
+        ids, rows, newest = attribute_rows(records)
+        if rebuild:
+            self.ids, self.matrix = [], rows[:0]
+        if ids:
+            changed = set(ids)
+            keep = [i for i, cid in enumerate(self.ids) if cid not in changed]
+            self.ids = [self.ids[i] for i in keep] + ids
+            self.matrix = sparse.vstack([self.matrix[keep], rows], format="csr")
+        self._positions = {cid: i for i, cid in enumerate(self.ids)}
+        if newest and (self.watermark is None or newest > self.watermark):
+            self.watermark = newest
+        return len(ids)
+
+    # --- queries ---
+
+    def similar(self, content_id, top_k=10):
+        """Top-k (content_id, score) most similar to `content_id`, excluding itself."""
+        position = self._positions.get(content_id)
+        if position is None:
+            raise KeyError(f"Content '{content_id}' is not in the attribute matrix")
+        scores = self.matrix.dot(self.matrix[position].T).toarray().ravel()
+        scores[position] = -1.0
+        return self._top(scores, top_k)
+
+    def similar_to_profile(self, profile, top_k=10):
+        """Top-k for an un-ingested profile (same shape as ingest_content input)."""
+        analysis = profile.get("analysis", profile)
+        edges = []
+        for rel, (_, field, weighted) in RELATIONSHIPS.items():
+            values = analysis.get(field) or []
+            for value in values if isinstance(values, list) else [values]:
+                if weighted and isinstance(value, dict):
+                    edges.append([rel, value.get("name"), value.get("confidence")])
+                else:
+                    edges.append([rel, value, None])
+        _, row, _ = attribute_rows([{"id": None, "profile_date": None, "edges": edges}])
+        return self._top(self.matrix.dot(row.T).toarray().ravel(), top_k)
+
+    def _top(self, scores, top_k):
+        top_k = min(top_k, len(scores))
+        if top_k <= 0:
+            return []
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return [(self.ids[i], float(scores[i])) for i in best if scores[i] > 0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Attribute-graph content similarity.")
+    parser.add_argument("content_id", nargs="?", help="Content to find neighbors for")
+    parser.add_argument("--brand", default=BRAND_ID, help=f"Brand (default {BRAND_ID})")
+    parser.add_argument("--top", type=int, default=10, help="Neighbors to return")
+    parser.add_argument("--rebuild", action="store_true", help="Re-export the whole brand")
+    parser.add_argument("--offline", action="store_true",
+                        help="Use the cached matrix without refreshing from Neo4j")
+    args = parser.parse_args()
+
+    print("=" * 64)
+    print("Droom Marketing Factory - Attribute Similarity (Pinecone fallback)")
+    print(f"Brand: {args.brand}")
+    print(f"Target: {'cache only' if args.offline else NEO4J_URI}")
+    print("=" * 64)
+
+    engine = AttributeSimilarity.load(args.brand)
+    if not args.offline:
+        require_env()
+        driver = connect()
+        try:
+            started = time.perf_counter()
+            changed = engine.refresh(driver, rebuild=args.rebuild)
+            print(f"  [OK] Refreshed {changed} content rows in "
+                  f"{time.perf_counter() - started:.2f}s")
+        finally:
+            driver.close()
+        engine.save()
+    print(f"  Matrix: {len(engine.ids)} content x {len(COLUMNS)} attributes, "
+          f"{engine.matrix.nnz} edges")
+
+    if args.content_id:
+        started = time.perf_counter()
+        try:
+            neighbors = engine.similar(args.content_id, args.top)
+        except KeyError as e:
+            print(f"\n  [FAIL] {e.args[0]}")
+            sys.exit(1)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"\n  Top {len(neighbors)} similar to {args.content_id} ({elapsed:.1f} ms):")
+        for content_id, score in neighbors:
+            print(f"    {score:.3f}  {content_id}")
+
+
+if __name__ == "__main__":
+    main()
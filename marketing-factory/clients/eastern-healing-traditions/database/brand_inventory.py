@@ -0,0 +1,171 @@
+"""
+Brand Inventory for Eastern Healing Traditions
+Droom Marketing Factory
+
+Counts one brand's nodes per label without scanning the shared instance.
+Brand-specific labels are the ones with a `droom_<label>_brand_id` index in
+init_neo4j.INDEXES; each is counted with its own index seek, and the seeks
+run concurrently. Shared attribute labels (init_neo4j.SHARED_ATTRIBUTES)
+are counted with a single-label `count(n)`, which Neo4j answers from its
+label count store. Neither grows with other clients' data, so the cost
+stays flat as the shared instance fills up.
+
+Results are cached per brand for a short TTL, so dashboards and health
+checks can call it freely.
+
+Note: the count store is per label, so a shared attribute label also used
+outside Droom on the same instance is counted in full.
+
+Usage:
+    python brand_inventory.py
+    python brand_inventory.py --brand another-client
+
+    from brand_inventory import BrandInventory
+    inventory = BrandInventory(driver)
+    counts = inventory.counts("eastern-healing-traditions")
+
+Requires:
+    pip install neo4j python-dotenv
+
+Environment variables (loaded from ../../.env or set directly):
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+    DROOM_INVENTORY_TTL (optional, seconds, default 60)
+"""
+
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from init_neo4j import (
+    BRAND_ID,
+    INDEXES,
+    NEO4J_URI,
+    SHARED_ATTRIBUTES,
+    connect,
+    parse_schema_definition,
+    require_env,
+)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+INVENTORY_TTL = float(os.environ.get("DROOM_INVENTORY_TTL", "60"))
+MAX_WORKERS = 8
+
+
+def brand_labels(indexes=INDEXES):
+    """Entity labels that carry a brand_id index, in INDEXES order."""
+    labels = []
+    for _, cypher in indexes:
+        definition = parse_schema_definition("index", cypher)
+        if definition["properties"] == ["brand_id"]:
+            labels.append(definition["labels"][-1])
+    return labels
+
+
+BRAND_LABELS = brand_labels()
+SHARED_LABELS = list(SHARED_ATTRIBUTES)
+
+# Equality on brand_id seeks the label's brand_id index.
+BRAND_COUNT = "MATCH (n:Droom:{label} {{brand_id: $brand_id}}) RETURN count(n) AS count"
+# A single label and no predicate is served by the label count store. Adding
+# :Droom would turn this into a label scan (see the module docstring note).
+SHARED_COUNT = "MATCH (n:{label}) RETURN count(n) AS count"
+
+# ---------------------------------------------------------------------------
+# Inventory
+# ---------------------------------------------------------------------------
+
+
+def _count(tx, cypher, **params):
+    return tx.run(cypher, **params).single()["count"]
+
+
+class BrandInventory:
+    """Per-brand node counts with a TTL cache.
+
+    `counts()` returns {"brand": {label: n}, "shared": {label: n},
+    "fetched_at": epoch seconds, "seconds": query time}.
+    """
+
+    def __init__(self, driver, ttl=INVENTORY_TTL, database=None, workers=MAX_WORKERS):
+        self.driver = driver
+        self.ttl = ttl
+        self.database = database
+        self.workers = workers
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _run(self, cypher, **params):
+        with self.driver.session(database=self.database) as session:
+            return session.execute_read(_count, cypher, **params)
+
+    def _fetch(self, brand_id):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            brand = {
+                label: pool.submit(self._run, BRAND_COUNT.format(label=label), brand_id=brand_id)
+                for label in BRAND_LABELS
+            }
+            shared = {
+                label: pool.submit(self._run, SHARED_COUNT.format(label=label))
+                for label in SHARED_LABELS
+            }
+            result = {
+                "brand": {label: future.result() for label, future in brand.items()},
+                "shared": {label: future.result() for label, future in shared.items()},
+            }
+        result["fetched_at"] = time.time()
+        result["seconds"] = time.perf_counter() - started
+        return result
+
+    def counts(self, brand_id=BRAND_ID, refresh=False):
+        with self._lock:
+            cached = self._cache.get(brand_id)
+        if cached and not refresh and time.time() - cached["fetched_at"] < self.ttl:
+            return cached
+        result = self._fetch(brand_id)
+        with self._lock:
+            self._cache[brand_id] = result
+        return result
+
+    def invalidate(self, brand_id=None):
+        with self._lock:
+            if brand_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(brand_id, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count one brand's Droom nodes per label.")
+    parser.add_argument("--brand", default=BRAND_ID, help=f"Brand (default {BRAND_ID})")
+    args = parser.parse_args()
+    require_env()
+
+    print("=" * 64)
+    print("Droom Marketing Factory - Brand Inventory")
+    print(f"Brand: {args.brand}")
+    print(f"Target: {NEO4J_URI}")
+    print("=" * 64)
+
+    driver = connect()
+    try:
+        counts = BrandInventory(driver).counts(args.brand)
+    finally:
+        driver.close()
+
+    print(f"\n  Brand nodes ({len(BRAND_LABELS)} index seeks):")
+    for label, count in counts["brand"].items():
+        print(f"    :Droom:{label:<20} {count:>8}")
+    print("\n  Shared attribute nodes (count store):")
+    for label, count in counts["shared"].items():
+        print(f"    :{label:<26} {count:>8}")
+    print(f"\n  Elapsed: {counts['seconds'] * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
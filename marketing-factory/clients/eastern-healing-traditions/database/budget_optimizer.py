@@ -0,0 +1,517 @@
+"""
+Budget Allocation Solver for Eastern Healing Traditions
+Droom Marketing Factory
+
+Deterministic allocation for the nightly budget-optimization run, so the
+Chief Strategy Officer agent reviews a plan instead of computing one. The
+daily budget of every brand is split into a 15% test reserve and an
+optimizable remainder, and the remainder is allocated independently across
+four dimensions:
+
+  platform     Campaign.platform                     (ROAS from Performance)
+  demographic  (Campaign)-[:TARGETED]->(Demographic)  (ROAS from Performance)
+  zone         (Campaign)-[:TARGETED_AREA]->(Geographic)
+  time_slot    (Demographic)-[:ACTIVE_ON]->(TimeSlot) (avg_engagement)
+
+Each (brand, dimension) pair is one problem. A cell's ROAS over the window
+is shrunk toward the pooled ROAS of its dimension by its sample size
+(campaign-days), so a cell with two lucky days cannot pull budget. The
+allocation maximizes the shrunk score minus a quadratic move penalty,
+subject to the guardrails from the CSO and Media Buyer prompts:
+
+  - every active platform keeps >= $50/day, otherwise the lowest-scoring
+    platforms are deactivated entirely (never funded below the minimum)
+  - at most 30% of the total daily budget moves per cycle
+  - 15% of the daily budget is held back as the test allocation
+  - the core zone never drops below 40% of the optimizable budget
+  - cells with no active campaign stay at zero (no new campaigns or
+    audience expansion)
+
+The problem has a closed-form solution per water level (clip to the box
+bounds), so every problem for every brand is padded into one matrix and
+solved with a vectorized bisection; the shift cap is then applied by
+moving along the segment from the constrained baseline to the optimum.
+The plan is written as JSON with inputs, shrunk scores, bounds and the
+binding constraint of every cell. Nothing is written to Neo4j.
+
+Usage:
+    python budget_optimizer.py
+    python budget_optimizer.py --all-brands --window 30
+    python budget_optimizer.py --out plan.json --as-of 2026-03-01
+
+    from budget_optimizer import solve_allocation
+    proposed = solve_allocation(base, score, lower, upper, totals, caps)
+
+Requires:
+    pip install neo4j numpy python-dotenv
+
+Environment variables (loaded from ../../.env or set directly):
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+    DROOM_BUDGET_PLANS (optional, directory for plan files)
+"""
+
+import argparse
+import datetime as dt
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from init_neo4j import (
+    BRAND_ID, NEO4J_URI, SHARED_ATTRIBUTES, brand_predicate, connect, require_env,
+)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+WINDOW_DAYS = 30
+TEST_ALLOCATION = 0.15
+MAX_SHIFT = 0.30
+PLATFORM_MIN_DAILY = 50.0
+# Minimum share of the optimizable budget per zone name.
+ZONE_MIN_SHARE = {"core": 0.40}
+# Prior strength of the ROAS shrinkage, in campaign-days: a cell with this
+# many days of data is weighted half its own ROAS, half the pooled ROAS.
+SHRINKAGE_DAYS = 14
+# Fraction of the optimizable budget that moves toward a cell per unit of
+# relative score (shrunk ROAS / pooled ROAS - 1), before the shift cap.
+RESPONSIVENESS = 0.5
+BISECTION_STEPS = 60
+UNTARGETED = "untargeted"
+
+DIMENSIONS = ["platform", "demographic", "zone", "time_slot"]
+
+_script_dir = Path(__file__).resolve().parent
+PLAN_DIR = Path(
+    os.environ.get("DROOM_BUDGET_PLANS")
+    or _script_dir / ".." / ".." / ".." / ".cache" / "budget-plans"
+)
+
+CAMPAIGN_QUERY = (
+    "MATCH (c:Droom:Campaign) "
+    "WHERE {brand} "
+    "  AND c.status IN ['active', 'paused'] "
+    "RETURN c.id AS id, c.brand_id AS brand_id, c.status AS status, "
+    "  c.platform AS platform, coalesce(c.budget_per_day, 0.0) AS budget, "
+    "  [(c)-[:TARGETED]->(d:Droom:Demographic) | d.name] AS demographics, "
+    "  [(c)-[:TARGETED_AREA]->(g:Droom:Geographic) | g.name] AS zones, "
+    "  c.demographic_target AS demographic_target, "
+    "  c.geographic_target AS geographic_target, "
+    "  [(c)-[:ACHIEVED]->(p:Droom:Performance) "
+    "    WHERE p.date >= date($start) AND p.date <= date($end) "
+    "    | [coalesce(p.spend, 0.0), coalesce(p.revenue, 0.0)]] AS days"
+)
+
+TIME_SLOT_QUERY = (
+    "MATCH (d:Droom:Demographic)-[r:ACTIVE_ON]->(t:Droom:TimeSlot) "
+    "WHERE {brand} "
+    "RETURN d.brand_id AS brand_id, d.name AS demographic, t.name AS time_slot, "
+    "  coalesce(r.avg_engagement, 0.0) AS engagement"
+)
+
+# ---------------------------------------------------------------------------
+# Problem construction
+# ---------------------------------------------------------------------------
+
+
+def fetch_inputs(driver, start, end, brand_id=BRAND_ID):
+    """Return (campaign rows, time-slot rows) for one brand (None = all)."""
+    with driver.session() as session:
+        campaigns = session.run(CAMPAIGN_QUERY.format(brand=brand_predicate("c", brand_id)),
+                                brand_id=brand_id,
+                                start=start.isoformat(), end=end.isoformat()).data()
+        slots = session.run(TIME_SLOT_QUERY.format(brand=brand_predicate("d", brand_id)),
+                            brand_id=brand_id).data()
+    return campaigns, slots
+
+
+def _targets(names, fallback):
+    names = sorted({n for n in names if n}) or ([fallback] if fallback else [])
+    return names or [UNTARGETED]
+
+
+def build_problems(campaigns, slots):
+    """Group campaign rows into one allocation problem per (brand, dimension).
+
+    A campaign's daily budget, spend and revenue are split evenly across its
+    targets; its sample size counts once per target. Only active campaigns
+    carry budget, paused ones still contribute performance. Time slots have
+    no spend history, so every slot starts at an even share and is scored by
+    ACTIVE_ON engagement weighted by each demographic's current budget.
+    """
+    cells = defaultdict(lambda: defaultdict(lambda: np.zeros(4)))  # budget, spend, revenue, days
+    for row in campaigns:
+        days = np.asarray(row["days"] or [], dtype=float).reshape(-1, 2)
+        budget = float(row["budget"] or 0.0) if row["status"] == "active" else 0.0
+        spend, revenue = days.sum(axis=0) if len(days) else (0.0, 0.0)
+        groups = {
+            "platform": [row["platform"] or UNTARGETED],
+            "demographic": _targets(row["demographics"], row["demographic_target"]),
+            "zone": _targets(row["zones"], row["geographic_target"]),
+        }
+        for dimension, names in groups.items():
+            share = 1.0 / len(names)
+            for name in names:
+                cells[(row["brand_id"], dimension)][name] += (
+                    budget * share, spend * share, revenue * share, len(days),
+                )
+
+    problems = []
+    for (brand, dimension), by_name in sorted(cells.items()):
+        names = sorted(by_name)
+        values = np.array([by_name[n] for n in names])
+        problems.append({
+            "brand_id": brand, "dimension": dimension, "names": names,
+            "current": values[:, 0], "spend": values[:, 1],
+            "revenue": values[:, 2], "samples": values[:, 3],
+        })
+
+    engagement = defaultdict(lambda: defaultdict(float))
+    weight = defaultdict(lambda: defaultdict(float))
+    demo_budget = {
+        p["brand_id"]: dict(zip(p["names"], p["current"]))
+        for p in problems if p["dimension"] == "demographic"
+    }
+    for row in slots:
+        w = demo_budget.get(row["brand_id"], {}).get(row["demographic"], 0.0)
+        if w > 0:
+            engagement[row["brand_id"]][row["time_slot"]] += w * row["engagement"]
+            weight[row["brand_id"]][row["time_slot"]] += w
+    for brand in sorted(engagement):
+        names = list(SHARED_ATTRIBUTES["TimeSlot"])
+        total = sum(demo_budget[brand].values())
+        problems.append({
+            "brand_id": brand, "dimension": "time_slot", "names": names,
+            "current": np.full(len(names), total / len(names)),
+            # Engagement plays the role of revenue per dollar; no shrinkage.
+            "spend": np.array([weight[brand][n] for n in names]),
+            "revenue": np.array([engagement[brand][n] for n in names]),
+            "samples": np.full(len(names), np.inf),
+        })
+    problems.sort(key=lambda p: (p["brand_id"], DIMENSIONS.index(p["dimension"])))
+    return problems
+
+
+def shrunk_scores(spend, revenue, samples, prior_days=SHRINKAGE_DAYS):
+    """Return (raw ROAS, shrunk ROAS, relative score) for one problem's cells.
+
+    The prior is the pooled (spend-weighted) ROAS of the dimension; a cell
+    with n campaign-days is weighted n / (n + prior_days). The relative
+    score is shrunk / pooled - 1, so dimensions in different units (ROAS,
+    engagement) share one responsiveness.
+    """
+    pooled = revenue.sum() / spend.sum() if spend.sum() > 0 else 0.0
+    raw = np.divide(revenue, spend, out=np.full(len(spend), pooled), where=spend > 0)
+    weight = np.divide(samples, samples + prior_days, out=np.ones(len(samples)),
+                       where=np.isfinite(samples))
+    shrunk = weight * raw + (1 - weight) * pooled
+    score = shrunk / pooled - 1 if pooled > 0 else np.zeros(len(spend))
+    return raw, shrunk, score
+
+
+def bounds(problem, budget):
+    """Return (lower, upper, active) bounds for one problem's cells.
+
+    Platforms that cannot all hold PLATFORM_MIN_DAILY are deactivated
+    lowest shrunk score first; their names are recorded on the problem.
+    The best-scoring platform is always kept, so a brand whose budget is
+    below the minimum puts all of it there.
+    """
+    active = problem["current"] > 0
+    lower = np.zeros(len(active))
+    problem["deactivated"] = []
+    if problem["dimension"] == "platform":
+        order = np.argsort(problem["shrunk"], kind="stable")
+        for i in order:
+            if active.sum() * PLATFORM_MIN_DAILY <= budget or active.sum() <= 1:
+                break
+            if active[i]:
+                active[i] = False
+                problem["deactivated"].append(problem["names"][i])
+        lower = np.where(active, min(PLATFORM_MIN_DAILY, budget), 0.0)
+    elif problem["dimension"] == "zone":
+        shares = np.array([ZONE_MIN_SHARE.get(n, 0.0) for n in problem["names"]])
+        lower = np.where(active, shares * budget, 0.0)
+    upper = np.where(active, budget, 0.0)
+    return lower, upper, active
+
+
+# ---------------------------------------------------------------------------
+# Solver
+# ---------------------------------------------------------------------------
+
+
+def _project(values, lower, upper, totals):
+    """Project each row onto {lower <= x <= upper, sum(x) = total}.
+
+    The projection is clip(values - nu) for the row's water level nu, found
+    by bisection on all rows at once. Rows must be feasible.
+    """
+    low = (values - upper).min(axis=1)
+    high = (values - lower).max(axis=1)
+    for _ in range(BISECTION_STEPS):
+        nu = (low + high) / 2
+        over = np.clip(values - nu[:, None], lower, upper).sum(axis=1) > totals
+        low = np.where(over, nu, low)
+        high = np.where(over, high, nu)
+    return np.clip(values - high[:, None], lower, upper)
+
+
+def _shift(x, base):
+    return np.abs(x - base).sum(axis=1) / 2
+
+
+def solve_allocation(base, score, lower, upper, totals, caps):
+    """Solve a padded batch of allocation problems, one per row.
+
+    base is the current allocation scaled to `totals`; padding cells have
+    lower == upper == 0. Each row maximizes
+        sum(score * x) - sum((x - anchor)^2) / (2 * RESPONSIVENESS * total)
+    over the box and sum constraints, where anchor is the projection of
+    base onto them. The result is moved back toward the anchor until no
+    more than `caps` dollars move from base; moves forced by the bounds
+    alone are never undone. Returns (proposed, anchor, step) where step is
+    the fraction of the unconstrained move kept.
+    """
+    anchor = _project(base, lower, upper, totals)
+    target = _project(anchor + RESPONSIVENESS * totals[:, None] * score, lower, upper, totals)
+    limit = np.maximum(caps, _shift(anchor, base))
+    low = np.zeros(len(base))
+    high = np.ones(len(base))
+    fits = _shift(target, base) <= limit
+    for _ in range(BISECTION_STEPS):
+        step = (low + high) / 2
+        ok = _shift(anchor + step[:, None] * (target - anchor), base) <= limit
+        low = np.where(ok, step, low)
+        high = np.where(ok, high, step)
+    step = np.where(fits, 1.0, low)
+    return anchor + step[:, None] * (target - anchor), anchor, step
+
+
+def optimize(problems):
+    """Score, bound and solve every problem in one batch; annotate in place."""
+    totals = defaultdict(float)
+    for p in problems:
+        if p["dimension"] == "platform":
+            totals[p["brand_id"]] = p["current"].sum()
+    problems[:] = [p for p in problems if totals.get(p["brand_id"], 0) > 0]
+    if not problems:
+        return problems
+
+    width = max(len(p["names"]) for p in problems)
+    shape = (len(problems), width)
+    base, score, lower, upper = (np.zeros(shape) for _ in range(4))
+    budgets = np.zeros(len(problems))
+    caps = np.zeros(len(problems))
+    for row, p in enumerate(problems):
+        daily = totals[p["brand_id"]]
+        budget = daily * (1 - TEST_ALLOCATION)
+        p["raw"], p["shrunk"], p["score"] = shrunk_scores(p["spend"], p["revenue"], p["samples"])
+        lo, hi, active = bounds(p, budget)
+        k = len(p["names"])
+        base[row, :k] = p["current"] * budget / p["current"].sum()
+        score[row, :k] = np.where(active, p["score"], 0.0)
+        lower[row, :k], upper[row, :k] = lo, hi
+        budgets[row] = budget
+        caps[row] = MAX_SHIFT * daily
+        p["daily_budget"], p["budget"], p["lower"], p["upper"] = daily, budget, lo, hi
+
+    proposed, anchor, step = solve_allocation(base, score, lower, upper, budgets, caps)
+    for row, p in enumerate(problems):
+        k = len(p["names"])
+        p["base"], p["anchor"], p["proposed"] = base[row, :k], anchor[row, :k], proposed[row, :k]
+        p["step"] = float(step[row])
+        p["shift"] = float(_shift(proposed[row:row + 1], base[row:row + 1])[0])
+        p["forced_shift"] = float(_shift(anchor[row:row + 1], base[row:row + 1])[0])
+        p["shift_cap"] = float(caps[row])
+    return problems
+
+
+# ---------------------------------------------------------------------------
+# Plan
+# ---------------------------------------------------------------------------
+
+
+def _binding(p, i, tol=0.01):
+    name = p["names"][i]
+    if name in p["deactivated"]:
+        return "deactivated"
+    if p["upper"][i] == 0:
+        return "no-active-campaign"
+    if p["lower"][i] > 0 and p["proposed"][i] <= p["lower"][i] + tol:
+        return "platform-minimum" if p["dimension"] == "platform" else "zone-floor"
+    if p["proposed"][i] <= tol:
+        return "zero"
+    return "shift-cap" if p["step"] < 1 else None
+
+
+def check_problem(p, tol=0.01):
+    """Return the guardrail violations of a solved problem (empty if none)."""
+    errors = []
+    label = f"{p['brand_id']}/{p['dimension']}"
+    if abs(p["proposed"].sum() - p["budget"]) > tol:
+        errors.append(f"{label}: allocated {p['proposed'].sum():.2f} of {p['budget']:.2f}")
+    if np.any(p["proposed"] < p["lower"] - tol) or np.any(p["proposed"] > p["upper"] + tol):
+        errors.append(f"{label}: allocation outside bounds")
+    if p["shift"] > max(p["shift_cap"], p["forced_shift"]) + tol:
+        errors.append(f"{label}: shift {p['shift']:.2f} over cap {p['shift_cap']:.2f}")
+    return errors
+
+
+def plan_document(problems, start, end, solve_seconds):
+    """Return the auditable JSON plan for the solved problems."""
+    brands = defaultdict(lambda: {"dimensions": {}})
+    for p in problems:
+        brand = brands[p["brand_id"]]
+        brand["daily_budget"] = round(p["daily_budget"], 2)
+        brand["test_allocation"] = round(p["daily_budget"] * TEST_ALLOCATION, 2)
+        brand["optimizable_budget"] = round(p["budget"], 2)
+        brand["dimensions"][p["dimension"]] = {
+            "shift": round(p["shift"], 2),
+            "forced_shift": round(p["forced_shift"], 2),
+            "shift_cap": round(p["shift_cap"], 2),
+            "step": round(p["step"], 4),
+            "deactivated": p["deactivated"],
+            "violations": check_problem(p),
+            "cells": [
+                {
+                    "name": name,
+                    "current": round(float(p["current"][i]), 2),
+                    "baseline": round(float(p["base"][i]), 2),
+                    "proposed": round(float(p["proposed"][i]), 2),
+                    "delta": round(float(p["proposed"][i] - p["base"][i]), 2),
+                    "lower": round(float(p["lower"][i]), 2),
+                    "upper": round(float(p["upper"][i]), 2),
+                    "raw_score": round(float(p["raw"][i]), 4),
+                    "shrunk_score": round(float(p["shrunk"][i]), 4),
+                    "sample_size": None if np.isinf(p["samples"][i]) else int(p["samples"][i]),
+                    "binding": _binding(p, i),
+                }
+                for i, name in enumerate(p["names"])
+            ],
+        }
+    return {
+        "generated_at": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+        "window": {"start": start.isoformat(), "end": end.isoformat()},
+        "parameters": {
+            "test_allocation": TEST_ALLOCATION,
+            "max_shift": MAX_SHIFT,
+            "platform_min_daily": PLATFORM_MIN_DAILY,
+            "zone_min_share": ZONE_MIN_SHARE,
+            "shrinkage_days": SHRINKAGE_DAYS,
+            "responsiveness": RESPONSIVENESS,
+        },
+        "solve_seconds": round(solve_seconds, 4),
+        "brands": dict(brands),
+    }
+
+
+def print_plan(problems):
+    for p in problems:
+        forced = f", ${p['forced_shift']:.2f} forced" if p["forced_shift"] > 0.01 else ""
+        print(f"\n  {p['brand_id']} / {p['dimension']}  "
+              f"(moved ${p['shift']:.2f} of ${p['shift_cap']:.2f} cap{forced}"
+              f"{', capped' if p['step'] < 1 else ''})")
+        print(f"    {'Cell':<30} {'Now':>8} {'Plan':>8} {'Delta':>8} {'Score':>7} {'n':>5}  Binding")
+        for i, name in enumerate(p["names"]):
+            n = "-" if np.isinf(p["samples"][i]) else f"{int(p['samples'][i])}"
+            print(f"    {name:<30} {p['base'][i]:>8.2f} {p['proposed'][i]:>8.2f} "
+                  f"{p['proposed'][i] - p['base'][i]:>+8.2f} {p['shrunk'][i]:>7.2f} {n:>5}  "
+                  f"{_binding(p, i) or ''}")
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Solve the nightly budget allocation.")
+    parser.add_argument("--brand", default=BRAND_ID, help=f"Brand to plan (default {BRAND_ID})")
+    parser.add_argument("--all-brands", action="store_true", help="Plan every Droom brand")
+    parser.add_argument(
+        "--as-of",
+        type=dt.date.fromisoformat,
+        default=dt.date.today() - dt.timedelta(days=1),
+        help="Last day of the performance window (default yesterday)",
+    )
+    parser.add_argument("--window", type=int, default=WINDOW_DAYS,
+                        help=f"Days of performance history (default {WINDOW_DAYS})")
+    parser.add_argument("--out", type=Path, default=None,
+                        help="Plan file (default <cache>/budget-plans/plan-<as-of>.json)")
+    parser.add_argument("--quiet", action="store_true", help="Skip the per-cell tables")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    require_env()
+    brand_id = None if args.all_brands else args.brand
+    start = args.as_of - dt.timedelta(days=args.window - 1)
+    out = args.out or PLAN_DIR / f"plan-{args.as_of}.json"
+
+    print("=" * 64)
+    print("Droom Marketing Factory - Budget Allocation Solver")
+    print(f"Brand: {brand_id or 'all brands'}")
+    print(f"Window: {start} .. {args.as_of} ({args.window} days)")
+    print(f"Target: {NEO4J_URI}")
+    print("=" * 64)
+
+    driver = connect()
+    try:
+        started = time.perf_counter()
+        campaigns, slots = fetch_inputs(driver, start, args.as_of, brand_id)
+        fetched = time.perf_counter()
+    finally:
+        driver.close()
+    print(f"\n  [OK] Fetched {len(campaigns)} campaigns and {len(slots)} ACTIVE_ON edges "
+          f"in {fetched - started:.2f}s")
+
+    problems = optimize(build_problems(campaigns, slots))
+    solved = time.perf_counter() - fetched
+    brands = sorted({p["brand_id"] for p in problems})
+    print(f"  [OK] Solved {len(problems)} problems for {len(brands)} brand(s) in {solved:.3f}s")
+    if not problems:
+        print("  [WARN] No active campaign budget to allocate")
+        return
+
+    if not args.quiet:
+        print_plan(problems)
+
+    plan = plan_document(problems, start, args.as_of, solved)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(plan, f, indent=2)
+
+    print("\n" + "=" * 64)
+    print("PLAN SUMMARY")
+    print("=" * 64)
+    errors = []
+    for brand in brands:
+        entry = plan["brands"][brand]
+        print(f"  {brand}: ${entry['daily_budget']:.2f}/day, "
+              f"test ${entry['test_allocation']:.2f}, optimized ${entry['optimizable_budget']:.2f}")
+        if entry["optimizable_budget"] < PLATFORM_MIN_DAILY:
+            print(f"  [WARN] {brand}: optimizable budget below ${PLATFORM_MIN_DAILY:.0f}/day "
+                  f"platform minimum; all of it goes to the best platform")
+        for dimension, detail in entry["dimensions"].items():
+            if detail["deactivated"]:
+                print(f"  [WARN] {brand}: deactivated below ${PLATFORM_MIN_DAILY:.0f}/day "
+                      f"minimum: {', '.join(detail['deactivated'])}")
+            errors.extend(detail["violations"])
+    print(f"  Plan: {out}")
+    if errors:
+        print(f"\n  ERRORS ({len(errors)}):")
+        for e in errors:
+            print(f"    - {e}")
+        sys.exit(1)
+    print("\n  [OK] All guardrails satisfied")
+
+
+if __name__ == "__main__":
+    main()
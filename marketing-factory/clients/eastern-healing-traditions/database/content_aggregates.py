@@ -0,0 +1,461 @@
+"""
+Content Aggregate Maintenance for Eastern Healing Traditions
+Droom Marketing Factory
+
+Keeps the :Droom:Content aggregates
+
+    total_impressions, total_clicks, total_conversions,
+    total_spend, total_revenue, avg_roas (= total_revenue / total_spend)
+
+up to date from the Performance of the campaigns each item RAN_IN, by
+applying deltas instead of re-summing every linked Performance node.
+
+Every Performance node records the values already folded into the
+aggregates (aggregated_impressions, ..., aggregated_revenue). Applying a
+day reads that day's Performance nodes (droom_performance_date index),
+takes current - aggregated per node, sums the deltas per linked content
+item in NumPy and, in one write transaction per brand, adds them to the
+content totals and stamps the nodes with their current values. The
+nightly cost is O(that day's rows); re-running a day is a no-op, and a
+day reloaded with corrected numbers applies only the correction, so days
+can be (re)applied in any order. avg_roas is recomputed from the raw
+sums, never averaged.
+
+The same run pushes the new totals into each item's Pinecone metadata in
+droom-content-essence-{brand_id} (the fields pinecone_backfill copies).
+
+`verify` recomputes a random sample of content from the stamped
+Performance values and reports drift (e.g. content linked to a campaign
+after its days were applied) and pending deltas; --repair resets drifted
+items. `rebuild` stamps every Performance node of the brand and resets all
+content totals, and must be run once before the first delta run.
+
+Usage:
+    python content_aggregates.py                         # apply yesterday
+    python content_aggregates.py --since 2026-03-01      # (re)apply a range
+    python content_aggregates.py --all-brands --no-pinecone
+    python content_aggregates.py verify --sample 200
+    python content_aggregates.py verify --sample 200 --repair
+    python content_aggregates.py rebuild
+
+Requires:
+    pip install neo4j numpy pinecone-client python-dotenv
+
+Environment variables (loaded from ../../.env or set directly):
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+    PINECONE_API_KEY (or DROOM_VECTOR_STORE=local; not needed with --no-pinecone)
+"""
+
+import argparse
+import datetime as dt
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from init_neo4j import BRAND_ID, NEO4J_URI, brand_predicate, connect, require_env
+from load_performance import COUNT_FIELDS, MONEY_FIELDS
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+FIELDS = COUNT_FIELDS + MONEY_FIELDS
+TOTALS = {field: f"total_{field}" for field in FIELDS}
+APPLIED = {field: f"aggregated_{field}" for field in FIELDS}
+MONEY_COLUMNS = [FIELDS.index(field) for field in MONEY_FIELDS]
+
+VERIFY_SAMPLE = 200
+# Content and Performance ids per rebuild / repair transaction.
+RESET_BATCH_SIZE = 500
+PINECONE_WORKERS = 4
+# Money drift below this (USD) is rounding, not drift.
+MONEY_TOLERANCE = 0.01
+
+_LINKED_PERFORMANCE = "(c)-[:RAN_IN]->(:Droom:Campaign)-[:ACHIEVED]->(p:Droom:Performance)"
+
+
+def _values(prefix, names):
+    return "[" + ", ".join(f"coalesce({prefix}.{name}, 0)" for name in names) + "]"
+
+
+DAY_QUERY = (
+    "MATCH (p:Droom:Performance) "
+    "WHERE p.date = date($date) AND {brand} "
+    f"RETURN p.id AS id, p.brand_id AS brand_id, {_values('p', FIELDS)} AS current, "
+    f"  {_values('p', APPLIED.values())} AS applied, "
+    "  [(c:Droom:Content)-[:RAN_IN]->(:Droom:Campaign)-[:ACHIEVED]->(p) | c.id] AS content_ids"
+)
+
+_RETURN_TOTALS = (
+    "RETURN c.id AS id, c.brand_id AS brand_id, "
+    + ", ".join(f"c.{name} AS {name}" for name in TOTALS.values())
+    + ", c.avg_roas AS avg_roas"
+)
+
+_SET_ROAS = (
+    "SET c.avg_roas = CASE WHEN c.total_spend > 0 "
+    "THEN round(c.total_revenue / c.total_spend, 6) ELSE 0.0 END, "
+    "c.aggregates_updated_at = datetime() "
+)
+
+CONTENT_APPLY = (
+    "UNWIND $rows AS row "
+    "MATCH (c:Droom:Content {id: row.id}) "
+    "SET " + ", ".join(
+        f"c.{TOTALS[f]} = coalesce(c.{TOTALS[f]}, 0) + row.{f}" if f in COUNT_FIELDS
+        else f"c.{TOTALS[f]} = round(coalesce(c.{TOTALS[f]}, 0.0) + row.{f}, 2)"
+        for f in FIELDS
+    ) + " "
+    "WITH c " + _SET_ROAS + _RETURN_TOTALS
+)
+
+PERFORMANCE_STAMP = (
+    "UNWIND $rows AS row "
+    "MATCH (p:Droom:Performance {id: row.id}) "
+    "SET " + ", ".join(f"p.{APPLIED[f]} = row.{f}" for f in FIELDS) + " "
+    "RETURN count(p) AS stamped"
+)
+
+# Totals = sum of the values stamped on the linked Performance nodes.
+CONTENT_RESET = (
+    "UNWIND $ids AS id "
+    "MATCH (c:Droom:Content {id: id}) "
+    f"WITH c, [{_LINKED_PERFORMANCE} | p] AS performance "
+    "SET " + ", ".join(
+        f"c.{TOTALS[f]} = reduce(s = 0, p IN performance | s + coalesce(p.{APPLIED[f]}, 0))"
+        if f in COUNT_FIELDS else
+        f"c.{TOTALS[f]} = round(reduce(s = 0.0, p IN performance | "
+        f"s + coalesce(p.{APPLIED[f]}, 0.0)), 2)"
+        for f in FIELDS
+    ) + " "
+    "WITH c " + _SET_ROAS + _RETURN_TOTALS
+)
+
+# Keyset pages on the unique id indexes.
+PERFORMANCE_STAMP_PAGE = (
+    "MATCH (p:Droom:Performance) "
+    "WHERE p.brand_id = $brand_id AND p.id > $after "
+    "WITH p ORDER BY p.id LIMIT $limit "
+    "SET " + ", ".join(f"p.{APPLIED[f]} = coalesce(p.{f}, 0)" for f in FIELDS) + " "
+    "RETURN max(p.id) AS last, count(p) AS stamped"
+)
+
+CONTENT_PAGE = (
+    "MATCH (c:Droom:Content) "
+    "WHERE c.brand_id = $brand_id AND c.id > $after "
+    "RETURN c.id AS id ORDER BY c.id LIMIT $limit"
+)
+
+SAMPLE_QUERY = (
+    "MATCH (c:Droom:Content) "
+    "WHERE {brand} "
+    "WITH c ORDER BY rand() LIMIT $size "
+    f"RETURN c.id AS id, c.brand_id AS brand_id, {_values('c', TOTALS.values())} AS stored, "
+    f"  [{_LINKED_PERFORMANCE} | {_values('p', APPLIED.values())}] AS applied, "
+    f"  [{_LINKED_PERFORMANCE} | {_values('p', FIELDS)}] AS current"
+)
+
+BRANDS_QUERY = "MATCH (c:Droom:Content) RETURN DISTINCT c.brand_id AS brand_id"
+
+# ---------------------------------------------------------------------------
+# Deltas
+# ---------------------------------------------------------------------------
+
+
+def day_deltas(records):
+    """Reduce one day's Performance records to per-brand write rows.
+
+    Returns {brand_id: (content_rows, performance_rows)}: content deltas
+    summed per item, and the changed Performance nodes with the values to
+    stamp. Nodes without linked content are stamped too.
+    """
+    if not records:
+        return {}
+    current = np.array([r["current"] for r in records], dtype=float)
+    delta = current - np.array([r["applied"] for r in records], dtype=float)
+    delta[:, MONEY_COLUMNS] = np.round(delta[:, MONEY_COLUMNS], 2)
+    changed = np.flatnonzero(np.any(delta != 0, axis=1))
+
+    by_brand = defaultdict(lambda: ({}, []))
+    for i in changed:
+        record = records[i]
+        content_deltas, stamps = by_brand[record["brand_id"]]
+        stamps.append({"id": record["id"], **dict(zip(FIELDS, current[i].tolist()))})
+        for cid in set(record["content_ids"]):
+            content_deltas[cid] = content_deltas.get(cid, 0) + delta[i]
+
+    result = {}
+    for brand, (content_deltas, stamps) in by_brand.items():
+        rows = []
+        for cid, values in content_deltas.items():
+            row = {"id": cid}
+            for field, value in zip(FIELDS, values.tolist()):
+                row[field] = int(round(value)) if field in COUNT_FIELDS else round(value, 2)
+            rows.append(row)
+        for stamp in stamps:
+            for field in COUNT_FIELDS:
+                stamp[field] = int(stamp[field])
+        result[brand] = (rows, stamps)
+    return result
+
+
+def _apply(tx, content_rows, stamps):
+    totals = tx.run(CONTENT_APPLY, rows=content_rows).data() if content_rows else []
+    stamped = tx.run(PERFORMANCE_STAMP, rows=stamps).single()["stamped"]
+    return totals, stamped
+
+
+def apply_day(driver, date, brand_id=BRAND_ID):
+    """Fold one day's Performance deltas into the content aggregates.
+
+    Returns (rows read, nodes stamped, updated content totals).
+    """
+    with driver.session() as session:
+        records = session.run(DAY_QUERY.format(brand=brand_predicate("p", brand_id)),
+                              date=date.isoformat(), brand_id=brand_id).data()
+        stamped, totals = 0, []
+        for brand, (content_rows, stamps) in sorted(day_deltas(records).items()):
+            brand_totals, brand_stamped = session.execute_write(_apply, content_rows, stamps)
+            totals.extend(brand_totals)
+            stamped += brand_stamped
+    return len(records), stamped, totals
+
+
+# ---------------------------------------------------------------------------
+# Verification and rebuild
+# ---------------------------------------------------------------------------
+
+
+def _sum_lists(lists):
+    return np.array(lists, dtype=float).reshape(-1, len(FIELDS)).sum(axis=0)
+
+
+def verify_sample(driver, brand_id=BRAND_ID, size=VERIFY_SAMPLE):
+    """Recompute a random sample of content. Returns a report dict.
+
+    drift is stored totals minus the sum of the stamped Performance values
+    (should be zero); pending is what the next delta runs will still add.
+    """
+    with driver.session() as session:
+        records = session.run(SAMPLE_QUERY.format(brand=brand_predicate("c", brand_id)),
+                              brand_id=brand_id, size=size).data()
+    report = {"sampled": len(records), "drifted": [], "pending": 0,
+              "max_drift": dict.fromkeys(FIELDS, 0.0)}
+    tolerance = np.where(np.isin(FIELDS, MONEY_FIELDS), MONEY_TOLERANCE, 0.5)
+    for record in records:
+        stored = np.asarray(record["stored"], dtype=float)
+        expected = _sum_lists(record["applied"])
+        drift = stored - expected
+        if np.any(np.abs(drift) > tolerance):
+            report["drifted"].append({
+                "id": record["id"], "brand_id": record["brand_id"],
+                **{field: round(float(d), 2) for field, d in zip(FIELDS, drift)},
+            })
+        for field, d in zip(FIELDS, np.abs(drift)):
+            report["max_drift"][field] = max(report["max_drift"][field], round(float(d), 4))
+        if np.any(np.abs(_sum_lists(record["current"]) - expected) > tolerance):
+            report["pending"] += 1
+    return report
+
+
+def reset_content(driver, ids, batch_size=RESET_BATCH_SIZE):
+    """Recompute totals of `ids` from stamped Performance. Returns the totals."""
+    totals = []
+    with driver.session() as session:
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            totals.extend(session.execute_write(
+                lambda tx: tx.run(CONTENT_RESET, ids=batch).data()
+            ))
+    return totals
+
+
+def rebuild_brand(driver, brand_id, batch_size=RESET_BATCH_SIZE):
+    """Stamp every Performance node and reset every content item of a brand.
+
+    Returns (nodes stamped, updated content totals).
+    """
+    stamped, after = 0, ""
+    with driver.session() as session:
+        while True:
+            page = session.execute_write(lambda tx: tx.run(
+                PERFORMANCE_STAMP_PAGE, brand_id=brand_id, after=after, limit=batch_size
+            ).single())
+            if not page or not page["stamped"]:
+                break
+            stamped += page["stamped"]
+            after = page["last"]
+        ids, after = [], ""
+        while True:
+            page = [r["id"] for r in session.run(
+                CONTENT_PAGE, brand_id=brand_id, after=after, limit=batch_size
+            )]
+            ids.extend(page)
+            if len(page) < batch_size:
+                break
+            after = page[-1]
+    return stamped, reset_content(driver, ids, batch_size)
+
+
+# ---------------------------------------------------------------------------
+# Pinecone metadata
+# ---------------------------------------------------------------------------
+
+
+def pinecone_sync(totals, workers=PINECONE_WORKERS):
+    """Copy updated totals into content-essence metadata. Returns (updated, errors).
+
+    The local stand-in takes one batched metadata write per namespace;
+    real Pinecone has no batch update, so ids are updated concurrently.
+    """
+    from init_pinecone import INDEX_NAME, PINECONE_API_KEY, Pinecone, client_namespaces
+    from pinecone_backfill import CONTENT_METADATA_FIELDS, clean_metadata
+
+    fields = [f for f in CONTENT_METADATA_FIELDS if f in TOTALS.values() or f == "avg_roas"]
+    index = Pinecone(api_key=PINECONE_API_KEY).Index(INDEX_NAME)
+
+    by_namespace = defaultdict(dict)
+    namespaces = {}
+    for row in totals:
+        brand = row["brand_id"]
+        if brand not in namespaces:
+            namespaces[brand] = client_namespaces(brand)[0]["name"]
+        by_namespace[namespaces[brand]][row["id"]] = clean_metadata({f: row[f] for f in fields})
+
+    errors = []
+    total = sum(len(updates) for updates in by_namespace.values())
+    if hasattr(index, "update_metadata"):
+        for namespace, updates in by_namespace.items():
+            try:
+                index.update_metadata(updates, namespace=namespace)
+            except Exception as e:
+                errors.extend(f"pinecone {cid}: {e}" for cid in updates)
+        return total - len(errors), errors
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(index.update, id=cid, set_metadata=changes, namespace=namespace): cid
+            for namespace, updates in by_namespace.items()
+            for cid, changes in updates.items()
+        }
+        for future, cid in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(f"pinecone {cid}: {e}")
+    return total - len(errors), errors
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+
+def parse_args():
+    yesterday = dt.date.today() - dt.timedelta(days=1)
+    parser = argparse.ArgumentParser(description="Maintain content aggregate metrics.")
+    parser.add_argument("command", nargs="?", default="apply",
+                        choices=["apply", "verify", "rebuild"])
+    parser.add_argument("--date", type=dt.date.fromisoformat, default=yesterday,
+                        help="Day to apply (default yesterday)")
+    parser.add_argument("--since", type=dt.date.fromisoformat,
+                        help="Apply every day from this date through --date")
+    parser.add_argument("--brand", default=BRAND_ID, help=f"Brand (default {BRAND_ID})")
+    parser.add_argument("--all-brands", action="store_true", help="Every Droom brand")
+    parser.add_argument("--sample", type=int, default=VERIFY_SAMPLE,
+                        help=f"verify: content items to recompute (default {VERIFY_SAMPLE})")
+    parser.add_argument("--repair", action="store_true", help="verify: reset drifted items")
+    parser.add_argument("--no-pinecone", action="store_true",
+                        help="Do not sync totals into Pinecone metadata")
+    args = parser.parse_args()
+    if args.since and args.since > args.date:
+        parser.error("--since must not be after --date")
+    return args
+
+
+def main():
+    args = parse_args()
+    require_env()
+    brand_id = None if args.all_brands else args.brand
+
+    print("=" * 64)
+    print(f"Droom Marketing Factory - Content Aggregates ({args.command})")
+    print(f"Brand: {brand_id or 'all brands'}")
+    print(f"Target: {NEO4J_URI}")
+    print("=" * 64)
+
+    errors = []
+    totals = []
+    started = time.perf_counter()
+    driver = connect()
+    try:
+        if args.command == "apply":
+            first = args.since or args.date
+            for i in range((args.date - first).days + 1):
+                day = first + dt.timedelta(days=i)
+                try:
+                    rows, stamped, day_totals = apply_day(driver, day, brand_id)
+                except Exception as e:
+                    print(f"  [FAIL] {day}: {e}")
+                    errors.append(f"{day}: {e}")
+                    continue
+                totals.extend(day_totals)
+                print(f"  [OK] {day}: {rows} performance rows, {stamped} with deltas, "
+                      f"{len(day_totals)} content updates")
+
+        elif args.command == "verify":
+            report = verify_sample(driver, brand_id, args.sample)
+            print(f"  Sampled: {report['sampled']} content items")
+            print(f"  Pending deltas: {report['pending']} items (applied by the next run)")
+            print("  Max drift: " + ", ".join(
+                f"{field} {value:g}" for field, value in report["max_drift"].items()))
+            for item in report["drifted"][:20]:
+                print(f"  [WARN] {item['id']}: " + ", ".join(
+                    f"{field} {item[field]:+g}" for field in FIELDS if item[field]))
+            if report["drifted"]:
+                status = "FAIL" if not args.repair else "WARN"
+                print(f"  [{status}] {len(report['drifted'])}/{report['sampled']} sampled "
+                      f"items drifted")
+                if args.repair:
+                    totals = reset_content(driver, [item["id"] for item in report["drifted"]])
+                    print(f"  [OK] Reset {len(totals)} content items")
+                else:
+                    errors.append(f"{len(report['drifted'])} drifted content items "
+                                  f"(re-run with --repair)")
+            else:
+                print("  [OK] No drift in sample")
+
+        else:
+            if args.all_brands:
+                with driver.session() as session:
+                    brands = sorted(r["brand_id"] for r in session.run(BRANDS_QUERY)
+                                    if r["brand_id"])
+            else:
+                brands = [args.brand]
+            for brand in brands:
+                stamped, brand_totals = rebuild_brand(driver, brand)
+                totals.extend(brand_totals)
+                print(f"  [OK] {brand}: stamped {stamped} performance nodes, "
+                      f"reset {len(brand_totals)} content items")
+    finally:
+        driver.close()
+
+    if totals and not args.no_pinecone:
+        updated, pinecone_errors = pinecone_sync(totals)
+        errors.extend(pinecone_errors)
+        print(f"  [{'FAIL' if pinecone_errors else 'OK'}] Pinecone metadata: "
+              f"{updated} content vectors updated")
+
+    print(f"\n  Elapsed: {time.perf_counter() - started:.1f}s")
+    if errors:
+        print(f"\n  ERRORS ({len(errors)}):")
+        for err in errors[:20]:
+            print(f"    {err}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
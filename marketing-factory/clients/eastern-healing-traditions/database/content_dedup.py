@@ -0,0 +1,524 @@
+"""
+Near-Duplicate Content Detection for Eastern Healing Traditions
+Droom Marketing Factory
+
+Pre-profiling dedup stage for the content-ingestion workflow. Every upload
+is fingerprinted before Claude Vision sees it:
+
+    sha256      exact byte match (the same file uploaded twice)
+    pHash       64-bit DCT perceptual hash of an image, or of KEYFRAMES
+                frames sampled at fixed fractions of a video's duration,
+                so re-encodes, resizes and recompressions still match
+
+Fingerprints of profiled content live in a local SQLite index; per brand,
+the perceptual hashes are loaded into an in-memory BK-tree (Hamming
+metric) for radius lookups. An image matches within PHASH_THRESHOLD bits;
+a video matches when at least VIDEO_MATCH_FRACTION of its keyframes match
+frames of the same stored video. On a hit the existing content_id (and the
+stored profile, when one was registered) is reused and the upload skips
+Vision, embedding and the Neo4j/Pinecone writes.
+
+In n8n, `check` runs after Set Content Variables and stages the fingerprint
+of a miss under its S3 key; `register` commits it against the new
+content_id, with the parsed Vision analysis as its profile, once the
+Content node exists, so nothing is downloaded twice. A hit on a
+fingerprint with no stored profile is profiled like a miss, but under the
+matched content_id: `check` stages it against that id and `register`
+stores the profile there, so the next re-upload reuses it. Both steps fail
+open: a dedup error sends the upload through the normal profiling path.
+
+Usage:
+    python content_dedup.py check path/to/upload.mp4
+    python content_dedup.py check --s3-key clients/eastern-healing-traditions/raw/a.jpg --json
+    python content_dedup.py register --s3-key clients/.../a.jpg --content-id eht-...
+    python content_dedup.py register --s3-key clients/.../a.jpg --content-id eht-... \
+        --profile '{"semantic_description": "...", "tones": [...]}'
+    python content_dedup.py stats
+
+    from content_dedup import DedupIndex, fingerprint
+    index = DedupIndex("eastern-healing-traditions")
+    fp = fingerprint("upload.jpg")
+    match = index.find(fp)              # None or {"content_id", "match", ...}
+    if match is None:
+        index.add(content_id, fp, profile=analysis)
+
+Requires:
+    pip install numpy scipy pillow python-dotenv
+    ffmpeg and ffprobe on PATH (videos only)
+    pip install boto3 (only for --s3-key)
+
+Environment variables (loaded from ../../.env or set directly):
+    AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY (only for --s3-key)
+    DROOM_DEDUP_INDEX (optional, path of the SQLite file)
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+from scipy.fft import dctn
+
+from media_files import media_type_for, video_duration
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+BRAND_ID = "eastern-healing-traditions"
+S3_BUCKET = "droom"
+
+_script_dir = Path(__file__).resolve().parent
+_env_path = _script_dir / ".." / ".." / ".." / ".env"
+load_dotenv(dotenv_path=_env_path)
+
+INDEX_PATH = Path(
+    os.environ.get("DROOM_DEDUP_INDEX")
+    or _script_dir / ".." / ".." / ".." / ".cache" / "dedup.sqlite3"
+)
+
+# Hamming radius (of 64 bits) for two frames to count as the same picture.
+PHASH_THRESHOLD = 8
+# Frames sampled per video, and the share that must match one stored video.
+KEYFRAMES = 8
+VIDEO_MATCH_FRACTION = 0.75
+
+HASH_SIZE = 8
+HASH_INPUT_SIZE = 32  # pixels per side fed to the DCT
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    brand_id TEXT NOT NULL,
+    content_id TEXT NOT NULL,
+    sha256 BLOB NOT NULL,
+    media_type TEXT NOT NULL,
+    phashes BLOB NOT NULL,
+    profile TEXT,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (brand_id, content_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS fingerprints_sha256 ON fingerprints (brand_id, sha256);
+CREATE TABLE IF NOT EXISTS pending (
+    brand_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    sha256 BLOB NOT NULL,
+    media_type TEXT NOT NULL,
+    phashes BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    content_id TEXT,
+    PRIMARY KEY (brand_id, source)
+) WITHOUT ROWID;
+"""
+
+# ---------------------------------------------------------------------------
+# Fingerprints
+# ---------------------------------------------------------------------------
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def phash(pixels):
+    """64-bit pHash of a HASH_INPUT_SIZE-square grayscale array.
+
+    Bits are the low-frequency 8x8 DCT coefficients above their median
+    (the DC term excluded from the median).
+    """
+    coefficients = dctn(np.asarray(pixels, dtype=np.float64), norm="ortho")
+    low = coefficients[:HASH_SIZE, :HASH_SIZE].ravel()
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def image_pixels(path):
+    from PIL import Image
+
+    with Image.open(path) as image:
+        image = image.convert("L").resize(
+            (HASH_INPUT_SIZE, HASH_INPUT_SIZE), Image.Resampling.LANCZOS
+        )
+        return np.asarray(image, dtype=np.float64)
+
+
+def video_frames(path, count=KEYFRAMES):
+    """`count` grayscale frames at the midpoints of equal slices of the video.
+
+    Sampling by fraction of duration (not by keyframe flags or frame
+    index) keeps the positions stable across re-encodes and frame rates.
+    """
+    duration = video_duration(path)
+    size = HASH_INPUT_SIZE
+    frames = []
+    for i in range(count):
+        raw = subprocess.run(
+            ["ffmpeg", "-v", "error", "-ss", f"{duration * (i + 0.5) / count:.3f}",
+             "-i", str(path), "-frames:v", "1",
+             "-vf", f"scale={size}:{size}:flags=area,format=gray",
+             "-f", "rawvideo", "pipe:1"],
+            capture_output=True, check=True,
+        ).stdout
+        if len(raw) >= size * size:
+            frames.append(np.frombuffer(raw[:size * size], dtype=np.uint8).reshape(size, size))
+    return frames
+
+
+def fingerprint(path, media_type=None):
+    """{"sha256": bytes, "media_type": str, "phashes": [int, ...]} for a file."""
+    media_type = media_type or media_type_for(path)
+    if media_type == "video":
+        hashes = [phash(frame) for frame in video_frames(path)]
+    else:
+        hashes = [phash(image_pixels(path))]
+    return {"sha256": file_sha256(path), "media_type": media_type, "phashes": hashes}
+
+
+def _pack(hashes):
+    return np.asarray(hashes, dtype=">u8").tobytes()
+
+
+def _unpack(blob):
+    return [int(h) for h in np.frombuffer(blob, dtype=">u8")]
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes under Hamming distance."""
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value, item):
+        self.size += 1
+        if self.root is None:
+            self.root = (value, [item], {})
+            return
+        node = self.root
+        while True:
+            distance = (value ^ node[0]).bit_count()
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (value, [item], {})
+                return
+            node = child
+
+    def search(self, value, radius):
+        """[(distance, item), ...] for every stored hash within `radius`."""
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = (value ^ node[0]).bit_count()
+            if distance <= radius:
+                found.extend((distance, item) for item in node[1])
+            for edge, child in node[2].items():
+                if distance - radius <= edge <= distance + radius:
+                    stack.append(child)
+        return found
+
+
+class DedupIndex:
+    """Fingerprints of one brand's profiled content, with exact and perceptual lookup."""
+
+    def __init__(self, brand_id=BRAND_ID, path=INDEX_PATH, threshold=PHASH_THRESHOLD):
+        self.brand_id = brand_id
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(pending)")}
+        if "content_id" not in columns:  # index created before profile-less hits were staged
+            self._db.execute("ALTER TABLE pending ADD COLUMN content_id TEXT")
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._trees = None
+
+    def _load(self):
+        """Build one BK-tree per media type from the stored hashes, once."""
+        if self._trees is not None:
+            return
+        self._trees = {"image": BKTree(), "video": BKTree()}
+        rows = self._db.execute(
+            "SELECT content_id, media_type, phashes FROM fingerprints WHERE brand_id = ?",
+            (self.brand_id,),
+        )
+        for content_id, media_type, blob in rows:
+            self._insert(content_id, media_type, _unpack(blob))
+
+    def _insert(self, content_id, media_type, hashes):
+        tree = self._trees[media_type]
+        for h in hashes:
+            tree.add(h, content_id)
+
+    def _profile(self, content_id):
+        row = self._db.execute(
+            "SELECT profile FROM fingerprints WHERE brand_id = ? AND content_id = ?",
+            (self.brand_id, content_id),
+        ).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def find(self, fp):
+        """Return the best match for a fingerprint, or None.
+
+        Match: {"content_id", "match": "exact"|"perceptual", "distance",
+        "frames_matched", "profile"}.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content_id FROM fingerprints WHERE brand_id = ? AND sha256 = ?",
+                (self.brand_id, fp["sha256"]),
+            ).fetchone()
+            if row:
+                return {"content_id": row[0], "match": "exact", "distance": 0,
+                        "frames_matched": len(fp["phashes"]), "profile": self._profile(row[0])}
+            if not fp["phashes"]:
+                return None
+
+            self._load()
+            tree = self._trees[fp["media_type"]]
+            # Per candidate: frames of the upload it matched, and their distances.
+            frames, distances = {}, {}
+            for h in fp["phashes"]:
+                best = {}
+                for distance, content_id in tree.search(h, self.threshold):
+                    best[content_id] = min(distance, best.get(content_id, distance))
+                for content_id, distance in best.items():
+                    frames[content_id] = frames.get(content_id, 0) + 1
+                    distances.setdefault(content_id, []).append(distance)
+
+            needed = 1
+            if fp["media_type"] == "video":
+                needed = math.ceil(VIDEO_MATCH_FRACTION * len(fp["phashes"]))
+            candidates = [
+                (-count, sum(distances[cid]) / count, cid)
+                for cid, count in frames.items() if count >= needed
+            ]
+            if not candidates:
+                return None
+            count, distance, content_id = min(candidates)
+            return {"content_id": content_id, "match": "perceptual",
+                    "distance": round(distance, 2), "frames_matched": -count,
+                    "profile": self._profile(content_id)}
+
+    def add(self, content_id, fp, profile=None):
+        """Record profiled content so later uploads of it are caught."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO fingerprints "
+                "(brand_id, content_id, sha256, media_type, phashes, profile, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.brand_id, content_id, fp["sha256"], fp["media_type"],
+                 _pack(fp["phashes"]), json.dumps(profile) if profile else None, time.time()),
+            )
+            self._db.commit()
+            if self._trees is not None:
+                self._insert(content_id, fp["media_type"], fp["phashes"])
+
+    def stage(self, source, fp, content_id=None):
+        """Park a fingerprint under `source` (e.g. its S3 key) until registered.
+
+        `content_id` is the match of a hit with no stored profile; register()
+        then stores the profile on that content instead of adding new content.
+        """
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pending "
+                "(brand_id, source, sha256, media_type, phashes, created_at, content_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.brand_id, source, fp["sha256"], fp["media_type"],
+                 _pack(fp["phashes"]), time.time(), content_id),
+            )
+            self._db.commit()
+
+    def staged(self, source):
+        row = self._db.execute(
+            "SELECT sha256, media_type, phashes, content_id FROM pending "
+            "WHERE brand_id = ? AND source = ?",
+            (self.brand_id, source),
+        ).fetchone()
+        if not row:
+            return None
+        return {"sha256": row[0], "media_type": row[1], "phashes": _unpack(row[2]),
+                "content_id": row[3]}
+
+    def set_profile(self, content_id, profile):
+        with self._lock:
+            self._db.execute(
+                "UPDATE fingerprints SET profile = ? WHERE brand_id = ? AND content_id = ?",
+                (json.dumps(profile), self.brand_id, content_id),
+            )
+            self._db.commit()
+
+    def register(self, source, content_id, profile=None):
+        """Commit the fingerprint staged under `source`.
+
+        Returns the content_id it was recorded under (the matched content for a
+        profile-less hit, else `content_id`), or None if nothing was staged.
+        """
+        fp = self.staged(source)
+        if fp is None:
+            return None
+        original = fp.pop("content_id")
+        if original:
+            if profile:
+                self.set_profile(original, profile)
+            content_id = original
+        else:
+            self.add(content_id, fp, profile)
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM pending WHERE brand_id = ? AND source = ?",
+                (self.brand_id, source),
+            )
+            self._db.commit()
+        return content_id
+
+    def stats(self):
+        rows = dict(self._db.execute(
+            "SELECT media_type, COUNT(*) FROM fingerprints WHERE brand_id = ? "
+            "GROUP BY media_type", (self.brand_id,),
+        ).fetchall())
+        (pending,) = self._db.execute(
+            "SELECT COUNT(*) FROM pending WHERE brand_id = ?", (self.brand_id,)
+        ).fetchone()
+        return {"images": rows.get("image", 0), "videos": rows.get("video", 0),
+                "pending": pending}
+
+    def close(self):
+        self._db.close()
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+
+def download_s3(key, directory):
+    import boto3
+
+    s3 = boto3.client(
+        "s3",
+        region_name="us-east-1",
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+    )
+    path = Path(directory) / Path(key).name
+    s3.download_file(S3_BUCKET, key, str(path))
+    return path
+
+
+def load_profile(value):
+    """A --profile value: inline JSON (as the workflow passes it) or a file."""
+    if value.lstrip().startswith("{"):
+        return json.loads(value)
+    with open(value) as f:
+        return json.load(f)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Near-duplicate detection before profiling.")
+    parser.add_argument("--brand", default=BRAND_ID, help=f"Brand (default {BRAND_ID})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    check = commands.add_parser("check", help="Look up an upload; stage it on a miss")
+    check.add_argument("path", nargs="?", help="Local file")
+    check.add_argument("--s3-key", help=f"Object key in s3://{S3_BUCKET}")
+    check.add_argument("--json", action="store_true", help="Print one JSON object")
+
+    register = commands.add_parser("register", help="Commit a staged fingerprint")
+    register.add_argument("path", nargs="?", help="Local file (fingerprinted now)")
+    register.add_argument("--s3-key", help="Key the fingerprint was staged under")
+    register.add_argument("--content-id", required=True)
+    register.add_argument("--profile",
+                          help="Profile to reuse on hits: a JSON file, or the JSON object itself")
+
+    commands.add_parser("stats", help="Print index counts")
+    args = parser.parse_args()
+    if args.command in ("check", "register") and bool(args.path) == bool(args.s3_key):
+        parser.error(f"{args.command} needs exactly one of PATH or --s3-key")
+    return args
+
+
+def main():
+    args = parse_args()
+    index = DedupIndex(args.brand)
+    try:
+        if args.command == "stats":
+            stats = index.stats()
+            print(f"Dedup index: {index.path.resolve()} ({args.brand})")
+            print(f"  Images:  {stats['images']}")
+            print(f"  Videos:  {stats['videos']}")
+            print(f"  Pending: {stats['pending']}")
+            return
+
+        profile = None
+        if args.command == "register" and args.profile:
+            profile = load_profile(args.profile)
+        if args.command == "register" and args.s3_key:
+            content_id = index.register(args.s3_key, args.content_id, profile)
+            if content_id is None:
+                print(f"[FAIL] Nothing staged for {args.s3_key}; run check first")
+                sys.exit(1)
+            print(f"[OK] Registered {args.s3_key} as {content_id}")
+            return
+
+        with tempfile.TemporaryDirectory(prefix="droom-dedup-") as tmp:
+            path = download_s3(args.s3_key, tmp) if args.s3_key else Path(args.path)
+            started = time.perf_counter()
+            fp = fingerprint(path)
+            hashed = time.perf_counter()
+            if args.command == "register":
+                index.add(args.content_id, fp, profile)
+                print(f"[OK] Registered {path} as {args.content_id}")
+                return
+            match = index.find(fp)
+            staged = match is None or match["profile"] is None
+            if staged:
+                index.stage(args.s3_key or str(path.resolve()), fp,
+                            content_id=match["content_id"] if match else None)
+        result = {
+            "duplicate": match is not None,
+            "staged": staged,
+            **(match or {}),
+            "media_type": fp["media_type"],
+            "fingerprint_ms": round((hashed - started) * 1000, 1),
+            "lookup_ms": round((time.perf_counter() - hashed) * 1000, 2),
+        }
+        if args.json:
+            print(json.dumps(result))
+        elif match:
+            print(f"[DUPLICATE] {match['match']} match of {match['content_id']} "
+                  f"(distance {match['distance']}, {match['frames_matched']} frame(s))")
+            if staged:
+                print("  No stored profile; staged to be re-profiled under that content_id")
+        else:
+            print(f"[OK] No duplicate; fingerprint staged ({result['lookup_ms']} ms lookup)")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+"""
+Content Fetch & Prepare for Eastern Healing Traditions
+Droom Marketing Factory
+
+Bulk fetch-and-prepare stage ahead of Vision profiling. Lists
+s3://droom/clients/{brand_id}/content/, downloads every object with ranged
+GETs (objects larger than PART_SIZE are split into parts) through one
+bounded thread pool, so many objects and many parts of large videos are in
+flight at once, and prepares each object as soon as its last part lands:
+
+    images   downscaled to MAX_IMAGE_EDGE on the long edge, re-encoded JPEG
+    videos   sampled to at most MAX_KEYFRAMES frames at scene changes
+             (ffmpeg scene score > SCENE_THRESHOLD, evenly thinned when there
+             are more; uniform sampling for single-shot clips); the
+             downloaded video is deleted once sampled
+
+Preparation runs on its own pool, overlapping with downloads. The output
+directory gets one folder per object plus a manifest.json with the frames
+to send to Vision, their size and an estimated image-token count for each.
+
+Usage:
+    python content_fetch.py
+    python content_fetch.py --workers 32 --out /data/eht-backlog
+    python content_fetch.py --prefix brief-0 --limit 20
+
+Requires:
+    pip install boto3 pillow python-dotenv
+    ffmpeg and ffprobe on PATH (videos only)
+
+Environment variables (loaded from ../../.env or set directly):
+    AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY
+    S3_BUCKET (optional, default droom)
+    DROOM_FETCH_WORKERS (optional, default 16)
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from media_files import media_type_for, video_duration
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+BRAND_ID = "eastern-healing-traditions"
+
+_script_dir = Path(__file__).resolve().parent
+load_dotenv(dotenv_path=_script_dir / ".." / ".." / ".." / ".env")
+S3_BUCKET = os.environ.get("S3_BUCKET", "droom")
+S3_REGION = "us-east-1"
+OUTPUT_DIR = _script_dir / ".." / ".." / ".." / ".cache" / "prepared"
+
+FETCH_WORKERS = int(os.environ.get("DROOM_FETCH_WORKERS", "16"))
+PART_SIZE = 8 * 1024 * 1024
+READ_CHUNK = 1024 * 1024
+
+# Claude downsizes anything larger, so bigger uploads only cost bandwidth.
+MAX_IMAGE_EDGE = 1568
+JPEG_QUALITY = 85
+MAX_KEYFRAMES = 12
+SCENE_THRESHOLD = 0.3
+# Approximate Vision cost of one image: width * height / 750 tokens.
+PIXELS_PER_TOKEN = 750
+
+# ---------------------------------------------------------------------------
+# Fetch
+# ---------------------------------------------------------------------------
+
+
+def s3_client(workers=FETCH_WORKERS):
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        "s3",
+        region_name=S3_REGION,
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        config=Config(max_pool_connections=workers),
+    )
+
+
+def list_content(s3, brand_id=BRAND_ID, prefix=""):
+    """[{"key", "size", "etag"}, ...] under the brand's content/ prefix."""
+    root = f"clients/{brand_id}/content/"
+    objects = []
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=S3_BUCKET, Prefix=root + prefix):
+        for item in page.get("Contents", []):
+            if item["Key"].endswith("/") or not item["Size"]:
+                continue
+            objects.append({"key": item["Key"], "size": item["Size"],
+                            "etag": item["ETag"].strip('"')})
+    return objects
+
+
+def local_name(key):
+    """Flatten a key below content/ into a unique file name."""
+    return key.split("/content/", 1)[-1].replace("/", "--")
+
+
+def plan_parts(size, part_size=PART_SIZE):
+    """Inclusive byte ranges covering `size` bytes."""
+    return [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+
+
+def fetch_part(s3, key, path, start, end):
+    """GET one byte range and write it at its offset in `path`."""
+    body = s3.get_object(Bucket=S3_BUCKET, Key=key, Range=f"bytes={start}-{end}")["Body"]
+    with open(path, "r+b") as f:
+        f.seek(start)
+        for chunk in body.iter_chunks(READ_CHUNK):
+            f.write(chunk)
+    return end - start + 1
+
+
+def download_all(s3, objects, dest, on_complete, workers=FETCH_WORKERS):
+    """Download every object's parts on one pool; call on_complete(obj, path, error).
+
+    Parts are submitted lazily with at most 2 * workers in flight, so a
+    large backlog does not queue millions of futures. An object whose part
+    fails is reported once and its remaining parts are skipped.
+    """
+    parts = []
+    state = {}
+    for obj in objects:
+        path = Path(dest) / local_name(obj["key"])
+        with open(path, "wb") as f:
+            f.truncate(obj["size"])
+        ranges = plan_parts(obj["size"])
+        state[obj["key"]] = {"path": path, "remaining": len(ranges), "failed": False}
+        parts.extend((obj, start, end) for start, end in ranges)
+
+    pending = iter(parts)
+    in_flight = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            while len(in_flight) < 2 * workers:
+                part = next(pending, None)
+                if part is None:
+                    break
+                obj, start, end = part
+                if state[obj["key"]]["failed"]:
+                    continue
+                future = pool.submit(fetch_part, s3, obj["key"], state[obj["key"]]["path"],
+                                     start, end)
+                in_flight[future] = obj
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                obj = in_flight.pop(future)
+                entry = state[obj["key"]]
+                if entry["failed"]:
+                    continue
+                try:
+                    future.result()
+                except Exception as e:
+                    entry["failed"] = True
+                    on_complete(obj, entry["path"], e)
+                    continue
+                entry["remaining"] -= 1
+                if entry["remaining"] == 0:
+                    on_complete(obj, entry["path"], None)
+
+
+# ---------------------------------------------------------------------------
+# Prepare
+# ---------------------------------------------------------------------------
+
+
+def vision_tokens(width, height):
+    scale = min(1.0, MAX_IMAGE_EDGE / max(width, height))
+    return math.ceil(width * scale * height * scale / PIXELS_PER_TOKEN)
+
+
+def downscale_image(path, out_path, max_edge=MAX_IMAGE_EDGE):
+    """Write a JPEG no larger than max_edge; return (original, prepared) sizes."""
+    from PIL import Image
+
+    with Image.open(path) as image:
+        original = image.size
+        image = image.convert("RGB")
+        image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+        image.save(out_path, "JPEG", quality=JPEG_QUALITY, optimize=True)
+        return original, image.size
+
+
+def _ffmpeg_frames(video_path, out_dir, pattern, video_filter):
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y", "-i", str(video_path),
+         "-vf", video_filter, "-vsync", "vfr", "-q:v", "3", str(out_dir / pattern)],
+        check=True,
+    )
+    return sorted(out_dir.glob(pattern.replace("%04d", "*")))
+
+
+def sample_keyframes(video_path, out_dir, max_frames=MAX_KEYFRAMES,
+                     threshold=SCENE_THRESHOLD, max_edge=MAX_IMAGE_EDGE):
+    """Scene-change frames of a video, thinned to at most `max_frames`."""
+    scale = (f"scale='if(gt(iw,ih),min({max_edge},iw),-2)':"
+             f"'if(gt(iw,ih),-2,min({max_edge},ih))'")
+    frames = _ffmpeg_frames(
+        video_path, out_dir, "scene-%04d.jpg",
+        f"select='eq(n\\,0)+gt(scene\\,{threshold})',{scale}",
+    )
+    if len(frames) < 2:
+        # One continuous shot: fall back to evenly spaced frames.
+        for frame in frames:
+            frame.unlink()
+        duration = max(video_duration(video_path), 0.1)
+        frames = _ffmpeg_frames(
+            video_path, out_dir, "frame-%04d.jpg",
+            f"fps={max_frames / duration:.6f},{scale}",
+        )[:max_frames]
+    if len(frames) > max_frames:
+        keep = {round(i * (len(frames) - 1) / (max_frames - 1)) for i in range(max_frames)}
+        for i, frame in enumerate(frames):
+            if i not in keep:
+                frame.unlink()
+        frames = [frame for i, frame in enumerate(frames) if i in keep]
+    return frames
+
+
+def image_size(path):
+    from PIL import Image
+
+    with Image.open(path) as image:
+        return image.size
+
+
+def prepare(obj, path, out_root):
+    """Turn one downloaded object into Vision-ready frames; returns its manifest entry."""
+    name = path.name
+    # Keyed on the whole flattened key so a.jpg and a.png get separate folders.
+    out_dir = Path(out_root) / name
+    out_dir.mkdir(parents=True, exist_ok=True)
+    media_type = media_type_for(name)
+    entry = {"key": obj["key"], "etag": obj["etag"], "bytes": obj["size"],
+             "media_type": media_type}
+    if media_type == "video":
+        frames = sample_keyframes(path, out_dir)
+        path.unlink()
+    else:
+        original, _ = downscale_image(path, out_dir / f"{path.stem}.jpg")
+        frames = [out_dir / f"{path.stem}.jpg"]
+        entry["original_size"] = list(original)
+        path.unlink()
+    entry["frames"] = [str(frame.relative_to(out_root)) for frame in frames]
+    entry["payload_bytes"] = sum(frame.stat().st_size for frame in frames)
+    entry["vision_tokens"] = sum(vision_tokens(*image_size(frame)) for frame in frames)
+    return entry
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fetch and prepare a brand's S3 content.")
+    parser.add_argument("--brand", default=BRAND_ID, help=f"Brand (default {BRAND_ID})")
+    parser.add_argument("--prefix", default="", help="Only keys under content/<prefix>")
+    parser.add_argument("--limit", type=int, help="Fetch at most this many objects")
+    parser.add_argument("--workers", type=int, default=FETCH_WORKERS,
+                        help=f"Concurrent ranged GETs (default {FETCH_WORKERS})")
+    parser.add_argument("--prepare-workers", type=int, default=os.cpu_count() or 4,
+                        help="Concurrent image/video preparations")
+    parser.add_argument("--out", type=Path, help="Output directory")
+    args = parser.parse_args()
+    if args.workers < 1 or args.prepare_workers < 1:
+        parser.error("--workers and --prepare-workers must be at least 1")
+    return args
+
+
+def main():
+    args = parse_args()
+    if not (os.getenv("AWS_ACCESS_KEY_ID") and os.getenv("AWS_SECRET_ACCESS_KEY")):
+        print("ERROR: Missing AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY.")
+        sys.exit(1)
+    out_root = args.out or OUTPUT_DIR / f"{args.brand}-{time.strftime('%Y%m%dT%H%M%S')}"
+    download_dir = out_root / ".download"
+    download_dir.mkdir(parents=True, exist_ok=True)
+
+    print("=" * 64)
+    print("Droom Marketing Factory - Content Fetch & Prepare")
+    print(f"Brand: {args.brand}")
+    print(f"Source: s3://{S3_BUCKET}/clients/{args.brand}/content/{args.prefix}")
+    print(f"Output: {out_root}")
+    print("=" * 64)
+
+    s3 = s3_client(args.workers)
+    objects = list_content(s3, args.brand, args.prefix)[:args.limit]
+    total_bytes = sum(obj["size"] for obj in objects)
+    print(f"\n--- Fetching {len(objects)} object(s), {total_bytes / 1e6:.1f} MB "
+          f"({args.workers} ranged GETs in flight) ---")
+
+    manifest, errors = [], []
+    lock = threading.Lock()
+    started = time.perf_counter()
+
+    def prepared(obj, future):
+        try:
+            entry = future.result()
+        except Exception as e:
+            msg = f"  [FAIL] {obj['key']}: prepare: {e}"
+            with lock:
+                errors.append(msg)
+            print(msg)
+            return
+        with lock:
+            manifest.append(entry)
+        print(f"  [OK] {obj['key']} ({obj['size'] / 1e6:.1f} MB -> "
+              f"{len(entry['frames'])} frame(s), ~{entry['vision_tokens']} tokens)")
+
+    with ThreadPoolExecutor(max_workers=args.prepare_workers) as prepare_pool:
+        def downloaded(obj, path, error):
+            if error is not None:
+                msg = f"  [FAIL] {obj['key']}: download: {error}"
+                with lock:
+                    errors.append(msg)
+                print(msg)
+                path.unlink(missing_ok=True)
+                return
+            future = prepare_pool.submit(prepare, obj, path, out_root)
+            future.add_done_callback(lambda f, obj=obj: prepared(obj, f))
+
+        download_all(s3, objects, download_dir, downloaded, workers=args.workers)
+        fetched = time.perf_counter() - started
+    elapsed = time.perf_counter() - started
+    shutil.rmtree(download_dir, ignore_errors=True)
+
+    manifest.sort(key=lambda entry: entry["key"])
+    with open(out_root / "manifest.json", "w") as f:
+        json.dump({"brand_id": args.brand, "bucket": S3_BUCKET, "objects": manifest}, f, indent=2)
+
+    images = [e for e in manifest if e["media_type"] == "image"]
+    videos = [e for e in manifest if e["media_type"] == "video"]
+    print("\n" + "=" * 64)
+    print("FETCH SUMMARY")
+    print("=" * 64)
+    print(f"  Objects prepared:    {len(manifest)} of {len(objects)} "
+          f"({len(images)} images, {len(videos)} videos)")
+    print(f"  Downloaded:          {total_bytes / 1e6:.1f} MB in {fetched:.1f}s "
+          f"({total_bytes / 1e6 / fetched if fetched else 0:.1f} MB/s)")
+    print(f"  Video frames:        {sum(len(e['frames']) for e in videos)} "
+          f"(max {MAX_KEYFRAMES} per video)")
+    print(f"  Vision payload:      {sum(e['payload_bytes'] for e in manifest) / 1e6:.1f} MB "
+          f"(from {sum(e['bytes'] for e in manifest) / 1e6:.1f} MB of originals)")
+    print(f"  Image tokens (est.): {sum(e['vision_tokens'] for e in images)}")
+    print(f"  Video tokens (est.): {sum(e['vision_tokens'] for e in videos)}")
+    print(f"  Elapsed:             {elapsed:.1f}s")
+    print(f"  Manifest:            {out_root / 'manifest.json'}")
+
+    if errors:
+        print(f"\n  ERRORS ({len(errors)}):")
+        for err in errors:
+            print(f"    {err}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
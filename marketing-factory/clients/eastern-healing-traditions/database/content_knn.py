@@ -0,0 +1,484 @@
+"""
+Content kNN Graph for Eastern Healing Traditions
+Droom Marketing Factory
+
+Materializes each brand's content-essence neighbors as
+(:Droom:Content)-[:SIMILAR_TO {score, rank}]->(:Droom:Content) edges, so
+creative rotation picks replacement candidates with one indexed hop
+joined with status and performance filters instead of a live Pinecone
+query plus per-candidate Neo4j lookups.
+
+Vectors come from the brand's droom-content-essence-{brand_id} namespace.
+They are L2-normalized and the top-k cosine neighbors of every row are
+found with blocked matrix products (BLOCK_ROWS query rows at a time), so
+memory stays at one block x catalog score matrix. Archived content is
+neither a source nor a neighbor.
+
+The vectors and neighbor lists are cached under .cache/knn/, keyed by each
+content item's profile_date. A refresh only touches the affected
+neighborhoods:
+
+  - new or re-profiled content gets a full top-k row
+  - rows that pointed at archived, deleted or re-profiled content are
+    recomputed in full
+  - every other row is merged with its scores against the new vectors,
+    and is rewritten only if its neighbor list changed
+
+Each rewritten row replaces its outgoing SIMILAR_TO edges in one UNWIND
+batch; edges of removed content are deleted. --rebuild recomputes the
+whole brand.
+
+Usage:
+    python content_knn.py                       # incremental refresh
+    python content_knn.py --rebuild --top 20
+    python content_knn.py --all-brands --dry-run
+    python content_knn.py candidates eht-3f2a9c1b7d4e5f60
+
+    from content_knn import top_k_blocked
+    positions, scores = top_k_blocked(queries, matrix, k=20)
+
+Requires:
+    pip install neo4j numpy pinecone-client python-dotenv
+
+Environment variables (loaded from ../../.env or set directly):
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+    PINECONE_API_KEY (or DROOM_VECTOR_STORE=local)
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from init_neo4j import BRAND_ID, NEO4J_URI, connect, require_env
+from init_pinecone import (
+    INDEX_NAME,
+    PINECONE_API_KEY,
+    Pinecone,
+    client_namespaces,
+    require_env as require_pinecone_env,
+)
+from pinecone_backfill import batched
+from pinecone_snapshot import FETCH_BATCH_SIZE, iter_fetched
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+TOP_K = 20
+# Neighbors below this cosine are cached but not written as edges.
+MIN_SIMILARITY = 0.3
+BLOCK_ROWS = 1024
+WRITE_BATCH_SIZE = 500
+EXCLUDED_STATUSES = ["archived"]
+
+# Rotation defaults from the Creative Intelligence prompt.
+ROTATION_STATUSES = ["fresh", "resting"]
+ROTATION_MIN_SCORE = 0.7
+
+_script_dir = Path(__file__).resolve().parent
+CACHE_DIR = _script_dir / ".." / ".." / ".." / ".cache" / "knn"
+
+CONTENT_QUERY = (
+    "MATCH (c:Droom:Content {brand_id: $brand_id}) "
+    "WHERE NOT coalesce(c.status, '') IN $excluded "
+    "RETURN c.id AS id, toString(c.profile_date) AS profile_date"
+)
+
+BRANDS_QUERY = "MATCH (c:Droom:Content) RETURN DISTINCT c.brand_id AS brand_id"
+
+NEIGHBOR_UPDATE = (
+    "UNWIND $rows AS row "
+    "MATCH (c:Droom:Content {id: row.id}) "
+    "FOREACH (old IN [(c)-[s:SIMILAR_TO]->() | s] | DELETE old) "
+    "WITH c, row "
+    "UNWIND row.neighbors AS n "
+    "MATCH (o:Droom:Content {id: n.id}) "
+    "CREATE (c)-[s:SIMILAR_TO]->(o) "
+    "SET s.score = n.score, s.rank = n.rank, s.computed_at = datetime() "
+    "RETURN count(s) AS written"
+)
+
+NEIGHBOR_DELETE = (
+    "UNWIND $ids AS id "
+    "MATCH (:Droom:Content {id: id})-[s:SIMILAR_TO]-() "
+    "DELETE s "
+    "RETURN count(s) AS deleted"
+)
+
+ROTATION_QUERY = (
+    "MATCH (:Droom:Content {id: $content_id})-[s:SIMILAR_TO]->(c:Droom:Content) "
+    "WHERE c.status IN $statuses AND s.score >= $min_score "
+    "  AND ($min_roas IS NULL OR c.avg_roas >= $min_roas) "
+    "  AND coalesce(c.fatigue_level, 'healthy') IN ['healthy', 'insufficient-data'] "
+    "RETURN c.id AS id, c.status AS status, s.score AS score, s.rank AS rank, "
+    "  c.avg_roas AS avg_roas, c.total_impressions AS impressions "
+    "ORDER BY s.rank LIMIT $limit"
+)
+
+# ---------------------------------------------------------------------------
+# Neighbor search
+# ---------------------------------------------------------------------------
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def _select(positions, scores, k):
+    """Keep the k best (position, score) pairs per row, best first."""
+    if scores.shape[1] > k:
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        positions = np.take_along_axis(positions, best, axis=1)
+        scores = np.take_along_axis(scores, best, axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(positions, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+
+def _pad(positions, scores, k):
+    missing = k - positions.shape[1]
+    if missing <= 0:
+        return positions, scores
+    rows = len(positions)
+    return (np.hstack([positions, np.full((rows, missing), -1, dtype=positions.dtype)]),
+            np.hstack([scores, np.full((rows, missing), -np.inf, dtype=np.float32)]))
+
+
+def top_k_blocked(queries, matrix, k=TOP_K, self_positions=None, block=BLOCK_ROWS):
+    """Top-k rows of `matrix` by dot product for each query row.
+
+    Both inputs should be L2-normalized. self_positions[i] is the row of
+    `matrix` that query i must not match (itself), or -1. Returns int32
+    positions and float32 scores of shape (queries, k), best first and
+    padded with -1 / -inf when the matrix has fewer than k other rows.
+    """
+    count = len(queries)
+    positions = np.full((count, k), -1, dtype=np.int32)
+    scores = np.full((count, k), -np.inf, dtype=np.float32)
+    if count == 0 or len(matrix) == 0:
+        return positions, scores
+    columns = np.arange(len(matrix), dtype=np.int32)
+    for start in range(0, count, block):
+        stop = min(start + block, count)
+        block_scores = queries[start:stop] @ matrix.T
+        if self_positions is not None:
+            own = self_positions[start:stop]
+            rows = np.flatnonzero(own >= 0)
+            block_scores[rows, own[rows]] = -np.inf
+        block_positions = np.broadcast_to(columns, block_scores.shape)
+        top_positions, top_scores = _pad(*_select(block_positions, block_scores, k), k)
+        top_positions[np.isneginf(top_scores)] = -1
+        positions[start:stop], scores[start:stop] = top_positions, top_scores
+    return positions, scores
+
+
+def merge_new(positions, scores, queries, fresh_vectors, fresh_positions, k=TOP_K,
+              block=BLOCK_ROWS):
+    """Merge each row's neighbor list with its scores against new vectors.
+
+    Returns (positions, scores, changed) where changed flags the rows whose
+    neighbor list differs from the input.
+    """
+    changed = np.zeros(len(queries), dtype=bool)
+    if len(queries) == 0 or len(fresh_vectors) == 0:
+        return positions, scores, changed
+    positions, scores = positions.copy(), scores.copy()
+    for start in range(0, len(queries), block):
+        stop = min(start + block, len(queries))
+        fresh_scores = queries[start:stop] @ fresh_vectors.T
+        merged_positions, merged_scores = _select(
+            np.hstack([positions[start:stop], np.broadcast_to(fresh_positions, fresh_scores.shape)]),
+            np.hstack([scores[start:stop], fresh_scores]),
+            k,
+        )
+        merged_positions[np.isneginf(merged_scores)] = -1
+        changed[start:stop] = (merged_positions != positions[start:stop]).any(axis=1)
+        positions[start:stop], scores[start:stop] = merged_positions, merged_scores
+    return positions, scores, changed
+
+
+# ---------------------------------------------------------------------------
+# Graph
+# ---------------------------------------------------------------------------
+
+
+class ContentKnn:
+    """Cached vectors and top-k neighbor lists for one brand."""
+
+    def __init__(self, brand_id=BRAND_ID, k=TOP_K, ids=None, vectors=None,
+                 positions=None, scores=None, profile_dates=None):
+        self.brand_id = brand_id
+        self.k = k
+        self.ids = list(ids or [])
+        self.vectors = vectors if vectors is not None else np.zeros((0, 0), dtype=np.float32)
+        self.positions = positions if positions is not None else np.zeros((0, k), dtype=np.int32)
+        self.scores = scores if scores is not None else np.zeros((0, k), dtype=np.float32)
+        self.profile_dates = list(profile_dates or [None] * len(self.ids))
+
+    @property
+    def namespace(self):
+        return client_namespaces(self.brand_id)[0]["name"]
+
+    # --- persistence ---
+
+    @staticmethod
+    def paths(brand_id, cache_dir=CACHE_DIR):
+        return Path(cache_dir) / f"{brand_id}.npz", Path(cache_dir) / f"{brand_id}.json"
+
+    @classmethod
+    def load(cls, brand_id=BRAND_ID, k=TOP_K, cache_dir=CACHE_DIR):
+        """Load the cached graph, or an empty one if there is none or k changed."""
+        arrays_path, meta_path = cls.paths(brand_id, cache_dir)
+        if not arrays_path.exists() or not meta_path.exists():
+            return cls(brand_id, k)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("k") != k:
+            return cls(brand_id, k)
+        arrays = np.load(arrays_path)
+        return cls(brand_id, k, meta["ids"], arrays["vectors"], arrays["positions"],
+                   arrays["scores"], meta["profile_dates"])
+
+    def save(self, cache_dir=CACHE_DIR):
+        arrays_path, meta_path = self.paths(self.brand_id, cache_dir)
+        arrays_path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(arrays_path, vectors=self.vectors, positions=self.positions, scores=self.scores)
+        with open(meta_path, "w") as f:
+            json.dump({"ids": self.ids, "profile_dates": self.profile_dates, "k": self.k}, f)
+
+    # --- maintenance ---
+
+    def refresh(self, content, fetch_vectors, rebuild=False):
+        """Bring the graph in line with `content` (id -> profile_date).
+
+        fetch_vectors(ids) returns {id: values} for the ids that have a
+        vector. Returns (rows, removed): ids whose neighbor lists must be
+        rewritten, and ids whose edges must be deleted.
+        """
+        cached = {} if rebuild else {
+            cid: (i, date) for i, (cid, date) in enumerate(zip(self.ids, self.profile_dates))
+        }
+        keep = [i for cid, (i, date) in cached.items() if content.get(cid, 0) == date]
+        removed = [cid for cid in cached if cid not in content or content[cid] != cached[cid][1]]
+        wanted = [cid for cid in content if cid not in cached or content[cid] != cached[cid][1]]
+        fetched = fetch_vectors(wanted) if wanted else {}
+        fresh = [cid for cid in wanted if cid in fetched]
+
+        # New row order: kept rows first, then fresh rows.
+        remap = np.full(len(self.ids) + 1, -1, dtype=np.int32)  # slot -1 maps to -1
+        remap[keep] = np.arange(len(keep), dtype=np.int32)
+        kept_vectors = self.vectors[keep] if keep else None
+        fresh_vectors = normalize([fetched[cid] for cid in fresh]) if fresh else None
+        parts = [v for v in (kept_vectors, fresh_vectors) if v is not None]
+        if not parts:
+            self.ids, self.profile_dates = [], []
+            self.positions = self.positions[:0]
+            self.scores = self.scores[:0]
+            return [], removed
+        vectors = np.vstack(parts)
+        ids = [self.ids[i] for i in keep] + fresh
+        fresh_positions = np.arange(len(keep), len(ids), dtype=np.int32)
+
+        positions = np.full((len(ids), self.k), -1, dtype=np.int32)
+        scores = np.full((len(ids), self.k), -np.inf, dtype=np.float32)
+        dirty = np.zeros(len(ids), dtype=bool)
+        dirty[fresh_positions] = True
+        if keep:
+            old_positions = self.positions[keep]
+            positions[:len(keep)] = remap[old_positions]
+            scores[:len(keep)] = self.scores[keep]
+            # A neighbor that disappeared leaves a hole only a full row can fill.
+            dirty[:len(keep)] = ((old_positions >= 0) & (positions[:len(keep)] < 0)).any(axis=1)
+
+        full = np.flatnonzero(dirty)
+        positions[full], scores[full] = top_k_blocked(
+            vectors[full], vectors, self.k, self_positions=full.astype(np.int32)
+        )
+        clean = np.flatnonzero(~dirty)
+        changed = np.zeros(len(ids), dtype=bool)
+        if len(clean) and len(fresh_positions):
+            positions[clean], scores[clean], changed[clean] = merge_new(
+                positions[clean], scores[clean], vectors[clean],
+                vectors[fresh_positions], fresh_positions, self.k,
+            )
+
+        self.ids, self.vectors, self.positions, self.scores = ids, vectors, positions, scores
+        self.profile_dates = [content[cid] for cid in ids]
+        rows = [ids[i] for i in np.flatnonzero(dirty | changed)]
+        return rows, removed
+
+    def neighbor_rows(self, ids, min_similarity=MIN_SIMILARITY):
+        """UNWIND rows ({id, neighbors: [{id, score, rank}]}) for `ids`."""
+        index = {cid: i for i, cid in enumerate(self.ids)}
+        rows = []
+        for cid in ids:
+            i = index[cid]
+            neighbors = [
+                {"id": self.ids[p], "score": round(float(s), 4), "rank": rank}
+                for rank, (p, s) in enumerate(zip(self.positions[i], self.scores[i]), start=1)
+                if p >= 0 and s >= min_similarity
+            ]
+            rows.append({"id": cid, "neighbors": neighbors})
+        return rows
+
+
+def write_neighbors(driver, rows, removed, batch_size=WRITE_BATCH_SIZE):
+    """Replace SIMILAR_TO edges of `rows` and delete those of `removed`.
+
+    Returns (edges written, edges deleted).
+    """
+    def update(tx, batch):
+        return tx.run(NEIGHBOR_UPDATE, rows=batch).single()["written"]
+
+    def delete(tx, batch):
+        return tx.run(NEIGHBOR_DELETE, ids=batch).single()["deleted"]
+
+    written = deleted = 0
+    with driver.session() as session:
+        for batch in batched(removed, batch_size):
+            deleted += session.execute_write(delete, batch)
+        for batch in batched(rows, batch_size):
+            written += session.execute_write(update, batch)
+    return written, deleted
+
+
+def live_content(driver, brand_id):
+    """Map of id -> profile_date for the brand's non-archived content."""
+    with driver.session() as session:
+        records = session.run(CONTENT_QUERY, brand_id=brand_id, excluded=EXCLUDED_STATUSES)
+        return {record["id"]: record["profile_date"] for record in records}
+
+
+def vector_fetcher(index, namespace, full=False):
+    """fetch_vectors callable for ContentKnn.refresh.
+
+    With full=True the whole namespace is streamed once (cheaper than
+    fetching by id when most of the brand is wanted).
+    """
+    def fetch(ids):
+        wanted = set(ids)
+        if full:
+            return {vid: values for vid, values, _ in iter_fetched(index, namespace)
+                    if vid in wanted}
+        vectors = {}
+        for batch in batched(ids, FETCH_BATCH_SIZE):
+            response = index.fetch(ids=list(batch), namespace=namespace)
+            vectors.update({vid: v.values for vid, v in response.vectors.items()})
+        return vectors
+
+    return fetch
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Materialize content kNN as SIMILAR_TO edges.")
+    parser.add_argument("command", nargs="?", default="refresh", choices=["refresh", "candidates"])
+    parser.add_argument("content_id", nargs="?", help="Fatigued content (candidates only)")
+    parser.add_argument("--brand", default=BRAND_ID, help=f"Brand (default {BRAND_ID})")
+    parser.add_argument("--all-brands", action="store_true", help="Refresh every Droom brand")
+    parser.add_argument("--top", type=int, default=TOP_K, help="Neighbors per content item")
+    parser.add_argument("--min-similarity", type=float, default=MIN_SIMILARITY,
+                        help="Lowest cosine written as an edge")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute the whole brand")
+    parser.add_argument("--batch-size", type=int, default=WRITE_BATCH_SIZE,
+                        help="Source rows per write transaction")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Compute without writing edges or the cache")
+    parser.add_argument("--min-roas", type=float, default=None,
+                        help="Candidates: minimum avg_roas")
+    return parser.parse_args()
+
+
+def show_candidates(driver, content_id, min_roas, limit):
+    started = time.perf_counter()
+    with driver.session() as session:
+        records = session.run(ROTATION_QUERY, content_id=content_id, statuses=ROTATION_STATUSES,
+                              min_score=ROTATION_MIN_SCORE, min_roas=min_roas,
+                              limit=limit).data()
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"\n  {len(records)} rotation candidates for {content_id} ({elapsed:.1f} ms):")
+    for record in records:
+        roas = "-" if record["avg_roas"] is None else f"{record['avg_roas']:.2f}"
+        print(f"    #{record['rank']:<3} {record['score']:.3f}  {record['id']:<36} "
+              f"{record['status']:<8} ROAS {roas}")
+
+
+def main():
+    args = parse_args()
+    require_env()
+
+    print("=" * 64)
+    print("Droom Marketing Factory - Content kNN Graph")
+    print(f"Brand: {'all brands' if args.all_brands else args.brand}")
+    print(f"Target: {NEO4J_URI}")
+    print("=" * 64)
+
+    driver = connect()
+    try:
+        if args.command == "candidates":
+            if not args.content_id:
+                print("  [FAIL] candidates needs a content id")
+                sys.exit(1)
+            show_candidates(driver, args.content_id, args.min_roas, args.top)
+            return
+
+        require_pinecone_env()
+        index = Pinecone(api_key=PINECONE_API_KEY).Index(INDEX_NAME)
+        if args.all_brands:
+            with driver.session() as session:
+                brands = sorted(r["brand_id"] for r in session.run(BRANDS_QUERY) if r["brand_id"])
+        else:
+            brands = [args.brand]
+
+        errors = []
+        for brand in brands:
+            try:
+                started = time.perf_counter()
+                graph = ContentKnn.load(brand, args.top)
+                content = live_content(driver, brand)
+                full = args.rebuild or not graph.ids
+                rows, removed = graph.refresh(
+                    content, vector_fetcher(index, graph.namespace, full), rebuild=args.rebuild
+                )
+                computed = time.perf_counter()
+                print(f"\n  [OK] {brand}: {len(graph.ids)} vectors, {len(rows)} neighborhoods "
+                      f"to rewrite, {len(removed)} removed ({computed - started:.2f}s)")
+                missing = len(content) - len(graph.ids)
+                if missing:
+                    print(f"  [WARN] {brand}: {missing} content items have no vector in "
+                          f"{graph.namespace}")
+                if args.dry_run:
+                    print("  [--] Dry run: edges and cache not written")
+                    continue
+                written, deleted = write_neighbors(
+                    driver, graph.neighbor_rows(rows, args.min_similarity), removed,
+                    args.batch_size,
+                )
+                graph.save()
+                print(f"  [OK] {brand}: wrote {written} SIMILAR_TO edges, deleted {deleted} "
+                      f"({time.perf_counter() - computed:.2f}s)")
+            except Exception as e:
+                msg = f"{brand}: {e}"
+                print(f"  [FAIL] {msg}")
+                errors.append(msg)
+    finally:
+        driver.close()
+
+    if errors:
+        print(f"\n  ERRORS ({len(errors)}):")
+        for err in errors:
+            print(f"    {err}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
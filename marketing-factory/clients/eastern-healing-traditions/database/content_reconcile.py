@@ -0,0 +1,453 @@
+"""
+Neo4j / Pinecone Content Reconciler for Eastern Healing Traditions
+Droom Marketing Factory
+
+The profiling rules require both a :Droom:Content node and a vector in
+droom-content-essence-{brand_id} for every asset. This checker streams the
+sorted content ids of both stores and merge-joins them in constant memory:
+
+  Neo4j     keyset pages ordered by c.id (droom_content_id_unique index)
+  Pinecone  the namespace's paginated id listing, spilled to sorted runs
+            on disk and heap-merged, so the join does not depend on the
+            listing order and only RUN_SIZE ids are held at a time
+
+and reports
+
+  missing vectors   content nodes without a vector
+  orphan vectors    vectors without a content node
+  metadata drift    status / avg_roas in vector metadata != the node
+                    (--metadata; fetched in bounded parallel batches)
+
+Repairs are queued while streaming and flushed in batches: --repair
+re-embeds missing vectors from semantic_description (through the
+embedding cache) and overwrites drifted metadata from Neo4j, the source
+of truth; --delete-orphans deletes orphan vectors. Orphans can be a
+content item still being ingested, so deletion is a separate flag.
+--report writes every finding as JSON lines.
+
+Usage:
+    python content_reconcile.py
+    python content_reconcile.py --metadata --report drift.jsonl
+    python content_reconcile.py --all-brands --metadata --repair
+    python content_reconcile.py --delete-orphans
+
+Requires:
+    pip install neo4j numpy openai pinecone-client python-dotenv
+
+Environment variables (loaded from ../../.env or set directly):
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+    PINECONE_API_KEY (or DROOM_VECTOR_STORE=local)
+    OPENAI_API_KEY (only to re-embed missing vectors with --repair)
+"""
+
+import argparse
+import heapq
+import json
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from embedding_cache import EmbeddingCache
+from init_neo4j import BRAND_ID, NEO4J_URI, connect, require_env
+from init_pinecone import (
+    INDEX_NAME,
+    PINECONE_API_KEY,
+    Pinecone,
+    client_namespaces,
+    require_env as require_pinecone_env,
+)
+from pinecone_backfill import (
+    CONTENT_METADATA_FIELDS,
+    MAX_RETRIES,
+    clean_metadata,
+    upsert_with_retry,
+)
+from pinecone_snapshot import FETCH_BATCH_SIZE, FETCH_WORKERS, LIST_PAGE_SIZE, page_ids
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+NEO4J_PAGE_SIZE = 10000
+# Pinecone ids sorted in memory per spilled run.
+RUN_SIZE = 200000
+REPAIR_BATCH_SIZE = 100
+# Metadata fields compared with the node; floats within tolerance match.
+DRIFT_FIELDS = ["status", "avg_roas"]
+FLOAT_TOLERANCE = 1e-4
+EXAMPLES = 10
+
+ID_PAGE_QUERY = (
+    "MATCH (c:Droom:Content) "
+    "WHERE c.brand_id = $brand_id AND c.id > $after "
+    "RETURN c.id AS id, " + ", ".join(f"c.{f} AS {f}" for f in DRIFT_FIELDS) + " "
+    "ORDER BY c.id LIMIT $limit"
+)
+
+REPAIR_SOURCE_QUERY = (
+    "UNWIND $ids AS id "
+    "MATCH (c:Droom:Content {id: id}) "
+    "RETURN c.id AS id, c.semantic_description AS text, {"
+    + ", ".join(f"{f}: c.{f}" for f in CONTENT_METADATA_FIELDS)
+    + "} AS metadata"
+)
+
+BRANDS_QUERY = "MATCH (c:Droom:Content) RETURN DISTINCT c.brand_id AS brand_id"
+
+# ---------------------------------------------------------------------------
+# Sorted id streams
+# ---------------------------------------------------------------------------
+
+
+def neo4j_content(driver, brand_id, page_size=NEO4J_PAGE_SIZE):
+    """Yield (id, properties) for the brand's content in id order."""
+    after = ""
+    with driver.session() as session:
+        while True:
+            records = session.run(ID_PAGE_QUERY, brand_id=brand_id, after=after,
+                                  limit=page_size).data()
+            for record in records:
+                yield record["id"], record
+            if len(records) < page_size:
+                return
+            after = records[-1]["id"]
+
+
+def _spill(ids, directory, count):
+    path = Path(directory) / f"run-{count}.txt"
+    with open(path, "w") as f:
+        f.writelines(f"{vid}\n" for vid in sorted(ids))
+    return path
+
+
+def _read_run(path):
+    with open(path) as f:
+        for line in f:
+            yield line.rstrip("\n")
+
+
+def sorted_ids(ids, directory, run_size=RUN_SIZE):
+    """Yield `ids` in sorted order holding at most `run_size` in memory.
+
+    Ids are cut into sorted runs on disk and heap-merged; a single run is
+    sorted in memory without touching disk. Duplicates are dropped.
+    """
+    runs, chunk = [], []
+    for vid in ids:
+        chunk.append(vid)
+        if len(chunk) >= run_size:
+            runs.append(_spill(chunk, directory, len(runs)))
+            chunk = []
+    if runs:
+        if chunk:
+            runs.append(_spill(chunk, directory, len(runs)))
+        merged = heapq.merge(*(_read_run(path) for path in runs))
+    else:
+        merged = iter(sorted(chunk))
+    previous = None
+    for vid in merged:
+        if vid != previous:
+            yield vid
+        previous = vid
+
+
+def pinecone_ids(index, namespace):
+    for page in index.list(namespace=namespace, limit=LIST_PAGE_SIZE):
+        yield from page_ids(page)
+
+
+def merge_join(nodes, vectors):
+    """Full outer join of two id-sorted streams.
+
+    `nodes` yields (id, properties), `vectors` yields ids. Yields
+    (id, properties or None, in_vectors).
+    """
+    sentinel = object()
+    node = next(nodes, sentinel)
+    vid = next(vectors, sentinel)
+    while node is not sentinel or vid is not sentinel:
+        if vid is sentinel or (node is not sentinel and node[0] < vid):
+            yield node[0], node[1], False
+            node = next(nodes, sentinel)
+        elif node is sentinel or vid < node[0]:
+            yield vid, None, True
+            vid = next(vectors, sentinel)
+        else:
+            yield vid, node[1], True
+            node = next(nodes, sentinel)
+            vid = next(vectors, sentinel)
+
+
+# ---------------------------------------------------------------------------
+# Reconciliation
+# ---------------------------------------------------------------------------
+
+
+def drifted_fields(node, metadata):
+    """Names of DRIFT_FIELDS whose vector metadata differs from the node."""
+    fields = []
+    for field in DRIFT_FIELDS:
+        expected, actual = node.get(field), metadata.get(field)
+        if isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+            if abs(expected - actual) > FLOAT_TOLERANCE:
+                fields.append(field)
+        elif expected != actual and not (expected is None and actual is None):
+            fields.append(field)
+    return fields
+
+
+class Reconciler:
+    """Streams one brand's diff, checks metadata and queues repairs."""
+
+    def __init__(self, driver, index, brand_id, check_metadata=False, repair=False,
+                 delete_orphans=False, report=None, workers=FETCH_WORKERS):
+        self.driver = driver
+        self.index = index
+        self.brand_id = brand_id
+        self.namespace = client_namespaces(brand_id)[0]["name"]
+        self.check_metadata = check_metadata
+        self.repair = repair
+        self.delete_orphans = delete_orphans
+        self.report = report
+        self.workers = workers
+        self.counts = {"nodes": 0, "vectors": 0, "matched": 0, "missing_vectors": 0,
+                       "orphan_vectors": 0, "metadata_drift": 0, "re_embedded": 0,
+                       "metadata_fixed": 0, "orphans_deleted": 0}
+        self.examples = {"missing_vectors": [], "orphan_vectors": [], "metadata_drift": []}
+        self.errors = []
+        self._missing, self._orphans, self._fetch = [], [], []
+        self._pending = deque()
+        self._cache = None
+
+    def _record(self, kind, vid, **detail):
+        self.counts[kind] += 1
+        if len(self.examples[kind]) < EXAMPLES:
+            self.examples[kind].append(vid if not detail else f"{vid} ({detail['fields']})")
+        if self.report:
+            self.report.write(json.dumps({"brand_id": self.brand_id, "kind": kind,
+                                          "id": vid, **detail}) + "\n")
+
+    def run(self, pool):
+        started = time.perf_counter()
+        with tempfile.TemporaryDirectory(prefix="droom-reconcile-") as spill:
+            vectors = sorted_ids(self._counted(pinecone_ids(self.index, self.namespace)), spill)
+            for vid, node, in_vectors in merge_join(neo4j_content(self.driver, self.brand_id),
+                                                    vectors):
+                if node is not None:
+                    self.counts["nodes"] += 1
+                if node is None:
+                    self._record("orphan_vectors", vid)
+                    self._queue(self._orphans, vid, self._delete_orphans, self.delete_orphans)
+                elif not in_vectors:
+                    self._record("missing_vectors", vid)
+                    self._queue(self._missing, vid, self._re_embed, self.repair)
+                else:
+                    self.counts["matched"] += 1
+                    if self.check_metadata:
+                        self._fetch.append(node)
+                        if len(self._fetch) >= FETCH_BATCH_SIZE:
+                            self._submit(pool)
+        if self._fetch:
+            self._submit(pool)
+        while self._pending:
+            self._collect(*self._pending.popleft())
+        for batch, action, enabled in ((self._orphans, self._delete_orphans, self.delete_orphans),
+                                       (self._missing, self._re_embed, self.repair)):
+            if batch and enabled:
+                self._flush(action, batch)
+        return time.perf_counter() - started
+
+    def _counted(self, ids):
+        for vid in ids:
+            self.counts["vectors"] += 1
+            yield vid
+
+    def _queue(self, batch, vid, action, enabled):
+        if not enabled:
+            return
+        batch.append(vid)
+        if len(batch) >= REPAIR_BATCH_SIZE:
+            self._flush(action, batch)
+
+    def _flush(self, action, batch):
+        ids = list(batch)
+        batch.clear()
+        try:
+            action(ids)
+        except Exception as e:
+            self.errors.append(f"{self.brand_id}: {action.__name__.strip('_')} "
+                               f"{len(ids)} ids: {e}")
+
+    # --- metadata ---
+
+    def _submit(self, pool):
+        nodes, self._fetch = self._fetch, []
+        self._pending.append((nodes, pool.submit(
+            self.index.fetch, ids=[node["id"] for node in nodes], namespace=self.namespace
+        )))
+        # Bound the in-flight fetches so memory stays flat.
+        while len(self._pending) > self.workers:
+            self._collect(*self._pending.popleft())
+
+    def _collect(self, nodes, future):
+        try:
+            vectors = future.result().vectors
+        except Exception as e:
+            self.errors.append(f"{self.brand_id}: fetch {len(nodes)} ids: {e}")
+            return
+        fixes = []
+        for node in nodes:
+            vector = vectors.get(node["id"])
+            if vector is None:
+                continue  # deleted between list and fetch
+            fields = drifted_fields(node, dict(vector.metadata or {}))
+            if fields:
+                self._record("metadata_drift", node["id"], fields=",".join(fields))
+                fixes.append((node, vector))
+        if fixes and self.repair:
+            self._flush(self._fix_metadata, fixes)
+
+    # --- repairs ---
+
+    def _fix_metadata(self, fixes):
+        """Copy DRIFT_FIELDS from (node, fetched vector) pairs into metadata.
+
+        update() can only set keys, so a vector holding a field the node no
+        longer has is re-upserted with its fetched values and that key dropped.
+        """
+        rewrites = []
+        for node, vector in fixes:
+            changes = clean_metadata({f: node.get(f) for f in DRIFT_FIELDS})
+            metadata = dict(vector.metadata or {})
+            stale = [f for f in DRIFT_FIELDS if f not in changes and f in metadata]
+            if stale:
+                kept = {k: v for k, v in metadata.items() if k not in stale}
+                rewrites.append({"id": node["id"], "values": list(vector.values),
+                                 "metadata": {**kept, **changes}})
+                continue
+            self.index.update(id=node["id"], set_metadata=changes, namespace=self.namespace)
+            self.counts["metadata_fixed"] += 1
+        if rewrites:
+            upsert_with_retry(self.index, rewrites, self.namespace, MAX_RETRIES)
+            self.counts["metadata_fixed"] += len(rewrites)
+
+    def _delete_orphans(self, ids):
+        self.index.delete(ids=ids, namespace=self.namespace)
+        self.counts["orphans_deleted"] += len(ids)
+
+    def _re_embed(self, ids):
+        if self._cache is None:
+            self._cache = EmbeddingCache()
+        with self.driver.session() as session:
+            records = session.run(REPAIR_SOURCE_QUERY, ids=ids).data()
+        records = [r for r in records if r["text"]]
+        for missing in sorted(set(ids) - {r["id"] for r in records}):
+            self.errors.append(f"{self.brand_id}: {missing} has no semantic_description "
+                               f"to embed (re-run the profiling workflow)")
+        if not records:
+            return
+        embeddings = self._cache.embed([r["text"] for r in records])
+        vectors = [
+            {"id": r["id"], "values": emb.tolist(),
+             "metadata": clean_metadata({**r["metadata"], "content_id": r["id"]})}
+            for r, emb in zip(records, embeddings)
+        ]
+        upsert_with_retry(self.index, vectors, self.namespace, MAX_RETRIES)
+        self.counts["re_embedded"] += len(vectors)
+
+    def close(self):
+        if self._cache is not None:
+            self._cache.close()
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Reconcile Neo4j Content with Pinecone vectors.")
+    parser.add_argument("--brand", default=BRAND_ID, help=f"Brand (default {BRAND_ID})")
+    parser.add_argument("--all-brands", action="store_true", help="Check every Droom brand")
+    parser.add_argument("--metadata", action="store_true",
+                        help=f"Also compare {', '.join(DRIFT_FIELDS)} in vector metadata")
+    parser.add_argument("--repair", action="store_true",
+                        help="Re-embed missing vectors and fix drifted metadata")
+    parser.add_argument("--delete-orphans", action="store_true",
+                        help="Delete vectors that have no content node")
+    parser.add_argument("--report", type=Path, help="Write every finding as JSON lines")
+    parser.add_argument("--workers", type=int, default=FETCH_WORKERS,
+                        help="Metadata fetches in flight")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    require_env()
+    require_pinecone_env()
+
+    print("=" * 64)
+    print("Droom Marketing Factory - Content Store Reconciler")
+    print(f"Brand: {'all brands' if args.all_brands else args.brand}")
+    print(f"Neo4j: {NEO4J_URI}")
+    print(f"Pinecone: {INDEX_NAME}")
+    print(f"Mode: {'repair' if args.repair or args.delete_orphans else 'report only'}"
+          f"{', metadata' if args.metadata else ''}")
+    print("=" * 64)
+
+    index = Pinecone(api_key=PINECONE_API_KEY).Index(INDEX_NAME)
+    driver = connect()
+    report = open(args.report, "w") if args.report else None
+    errors, dirty = [], False
+    try:
+        if args.all_brands:
+            with driver.session() as session:
+                brands = sorted(r["brand_id"] for r in session.run(BRANDS_QUERY) if r["brand_id"])
+        else:
+            brands = [args.brand]
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            for brand in brands:
+                reconciler = Reconciler(driver, index, brand, args.metadata, args.repair,
+                                        args.delete_orphans, report, args.workers)
+                try:
+                    elapsed = reconciler.run(pool)
+                except Exception as e:
+                    print(f"\n  [FAIL] {brand}: {e}")
+                    errors.append(f"{brand}: {e}")
+                    continue
+                finally:
+                    reconciler.close()
+                c = reconciler.counts
+                found = c["missing_vectors"] + c["orphan_vectors"] + c["metadata_drift"]
+                dirty = dirty or found > 0
+                print(f"\n  [{'WARN' if found else 'OK'}] {brand}: {c['nodes']} nodes, "
+                      f"{c['vectors']} vectors, {c['matched']} matched ({elapsed:.2f}s)")
+                for kind, examples in reconciler.examples.items():
+                    if c[kind]:
+                        print(f"    {kind}: {c[kind]}  e.g. {', '.join(examples[:3])}")
+                repaired = [f"{c[k]} {k.replace('_', ' ')}" for k in
+                            ("re_embedded", "metadata_fixed", "orphans_deleted") if c[k]]
+                if repaired:
+                    print(f"    repaired: {', '.join(repaired)}")
+                errors.extend(reconciler.errors)
+    finally:
+        driver.close()
+        if report:
+            report.close()
+
+    if args.report:
+        print(f"\n  Report: {args.report}")
+    if errors:
+        print(f"\n  ERRORS ({len(errors)}):")
+        for err in errors[:20]:
+            print(f"    {err}")
+        sys.exit(1)
+    if dirty and not (args.repair or args.delete_orphans):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Creative Fatigue Scoring for Eastern Healing Traditions
+Droom Marketing Factory
+
+Scores every active :Droom:Content item for creative fatigue using the
+criteria from the Creative Intelligence agent prompt:
+
+  1. CTR decline >30% from peak over the trailing window (14 days)
+  2. At least 7 data points (days with >100 impressions)
+  3. Sustained: 5 of the last 7 data points more than 20% below peak
+  4. Not platform-wide: if the median decline of all content on a platform
+     crosses the threshold, its content is flagged `platform-decline`
+     for CSO review instead of `fatigued`
+
+A content item's daily series is the sum of the Performance nodes of the
+campaigns it ran in, fetched for the whole brand (or every brand) in one
+windowed query. The series are packed into content x day arrays and the
+rolling CTR, peak, decline ratio, regression slope and data-sufficiency
+masks are computed for all items in a single vectorized pass. Scores are
+written back in one UNWIND update as creative_fatigue_score, fatigue_level,
+ctr_decline, ctr_slope and fatigue_data_points; content status is left to
+the creative-rotation workflow.
+
+Usage:
+    python creative_fatigue.py
+    python creative_fatigue.py --all-brands
+    python creative_fatigue.py --as-of 2026-03-01 --dry-run
+
+    from creative_fatigue import score_fatigue
+    scores = score_fatigue(impressions, clicks)   # (content, days) arrays
+
+Requires:
+    pip install neo4j numpy python-dotenv
+
+Environment variables (loaded from ../../.env or set directly):
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+"""
+
+import argparse
+import datetime as dt
+import time
+
+import numpy as np
+
+from init_neo4j import BRAND_ID, NEO4J_URI, brand_predicate, connect, require_env
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+WINDOW_DAYS = 14
+MIN_DATA_POINTS = 7
+MIN_DAILY_IMPRESSIONS = 100
+# Days in the impression-weighted rolling CTR, so one good day is not a peak.
+ROLLING_DAYS = 3
+
+EARLY_WARNING_DECLINE = 0.20
+FATIGUE_DECLINE = 0.30
+SEVERE_DECLINE = 0.50
+# Criterion 3: SUSTAINED_POINTS of the last RECENT_POINTS below peak by >20%.
+RECENT_POINTS = 7
+SUSTAINED_POINTS = 5
+# Content needed on a platform before a platform-wide decline is called.
+MIN_PLATFORM_CONTENT = 3
+
+LEVELS = ["insufficient-data", "healthy", "early-warning", "fatigued",
+          "severely-fatigued", "platform-decline"]
+
+SERIES_QUERY = (
+    "MATCH (c:Droom:Content {{status: 'active'}})-[:RAN_IN]->(camp:Droom:Campaign)"
+    "-[:ACHIEVED]->(p:Droom:Performance) "
+    "WHERE {brand} "
+    "  AND p.date >= date($start) AND p.date <= date($end) "
+    "RETURN c.id AS content_id, c.brand_id AS brand_id, toString(p.date) AS date, "
+    "  sum(p.impressions) AS impressions, sum(p.clicks) AS clicks, "
+    "  collect(DISTINCT camp.platform) AS platforms"
+)
+
+SCORE_UPDATE = (
+    "UNWIND $rows AS row "
+    "MATCH (c:Droom:Content {id: row.id}) "
+    "SET c.creative_fatigue_score = row.score, "
+    "  c.fatigue_level = row.level, "
+    "  c.ctr_decline = row.decline, "
+    "  c.ctr_slope = row.slope, "
+    "  c.fatigue_data_points = row.data_points, "
+    "  c.fatigue_scored_at = datetime() "
+    "RETURN count(c) AS updated"
+)
+
+# ---------------------------------------------------------------------------
+# Series
+# ---------------------------------------------------------------------------
+
+
+def fetch_series(driver, start, end, brand_id=BRAND_ID):
+    """Return the windowed content-day rows for one brand (None = all brands)."""
+    with driver.session() as session:
+        result = session.run(SERIES_QUERY.format(brand=brand_predicate("c", brand_id)),
+                             brand_id=brand_id,
+                             start=start.isoformat(), end=end.isoformat())
+        return result.data()
+
+
+def pack_series(rows, start, days):
+    """Pack content-day rows into (ids, platforms, impressions, clicks).
+
+    impressions and clicks are float arrays of shape (content, days); day 0
+    is `start`. Days with no row are zero. platforms holds one set of
+    (brand_id, platform) pairs per content item, so platform-wide declines
+    are judged per client.
+    """
+    ids = sorted({row["content_id"] for row in rows})
+    position = {cid: i for i, cid in enumerate(ids)}
+    impressions = np.zeros((len(ids), days))
+    clicks = np.zeros((len(ids), days))
+    platforms = [set() for _ in ids]
+    if rows:
+        rows_idx = np.fromiter((position[row["content_id"]] for row in rows), dtype=np.int64)
+        dates = np.array([row["date"] for row in rows], dtype="datetime64[D]")
+        day_idx = (dates - np.datetime64(start, "D")).astype(np.int64)
+        np.add.at(impressions, (rows_idx, day_idx),
+                  np.fromiter((row["impressions"] or 0 for row in rows), dtype=float))
+        np.add.at(clicks, (rows_idx, day_idx),
+                  np.fromiter((row["clicks"] or 0 for row in rows), dtype=float))
+        for i, row in zip(rows_idx, rows):
+            platforms[i].update((row["brand_id"], p) for p in row["platforms"] if p)
+    return ids, platforms, impressions, clicks
+
+
+# ---------------------------------------------------------------------------
+# Scoring
+# ---------------------------------------------------------------------------
+
+
+def _rolling_sum(values, width):
+    """Trailing `width`-day sums along axis 1 (shorter at the start)."""
+    cumulative = np.cumsum(values, axis=1)
+    shifted = np.zeros_like(cumulative)
+    shifted[:, width:] = cumulative[:, :-width]
+    return cumulative - shifted
+
+
+def score_fatigue(impressions, clicks, platforms=None):
+    """Score every row of the (content, days) arrays in one pass.
+
+    Returns a dict of per-content arrays: score, decline, slope (CTR change
+    per day relative to peak), data_points, sustained and level (index
+    into LEVELS).
+    """
+    n, days = impressions.shape
+    valid = impressions > MIN_DAILY_IMPRESSIONS
+    data_points = valid.sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ctr = np.where(valid, clicks / impressions, np.nan)
+        v_impr = np.where(valid, impressions, 0.0)
+        v_clicks = np.where(valid, clicks, 0.0)
+        rolling = _rolling_sum(v_clicks, ROLLING_DAYS) / _rolling_sum(v_impr, ROLLING_DAYS)
+    rolling = np.where(valid, rolling, np.nan)
+
+    has_data = data_points > 0
+    peak = np.full(n, np.nan)
+    peak[has_data] = np.nanmax(rolling[has_data], axis=1)
+    # Current CTR: rolling value at each row's most recent data point.
+    last_day = days - 1 - np.argmax(valid[:, ::-1], axis=1)
+    current = rolling[np.arange(n), last_day]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        decline = np.where(has_data & (peak > 0), 1.0 - current / peak, np.nan)
+
+    # Criterion 3 over the last RECENT_POINTS data points of each row.
+    rank_from_end = np.cumsum(valid[:, ::-1], axis=1)[:, ::-1]
+    recent = valid & (rank_from_end <= RECENT_POINTS)
+    below = recent & (ctr < peak[:, None] * (1.0 - EARLY_WARNING_DECLINE))
+    sustained = below.sum(axis=1) >= SUSTAINED_POINTS
+
+    # Weighted least-squares slope of daily CTR over the valid days.
+    x = np.arange(days, dtype=float)
+    w = valid.astype(float)
+    y = np.nan_to_num(ctr)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_mean = (w * x).sum(axis=1) / data_points
+        y_mean = (w * y).sum(axis=1) / data_points
+        dx = (x[None, :] - x_mean[:, None]) * w
+        slope = (dx * (y - y_mean[:, None])).sum(axis=1) / (dx * dx).sum(axis=1)
+        slope = np.where(peak > 0, slope / peak, np.nan)
+
+    sufficient = data_points >= MIN_DATA_POINTS
+    level = np.full(n, LEVELS.index("healthy"))
+    level[decline > EARLY_WARNING_DECLINE] = LEVELS.index("early-warning")
+    level[(decline > FATIGUE_DECLINE) & sustained] = LEVELS.index("fatigued")
+    level[(decline > SEVERE_DECLINE) & sustained] = LEVELS.index("severely-fatigued")
+    level[~sufficient] = LEVELS.index("insufficient-data")
+
+    declining = declining_platforms(decline, sufficient, platforms or [])
+    if declining:
+        # Criterion 4: only every platform the content ran on declining.
+        platform_wide = np.fromiter(
+            (bool(p) and p <= declining for p in platforms), dtype=bool, count=n
+        )
+        flagged = platform_wide & (level >= LEVELS.index("fatigued"))
+        level[flagged] = LEVELS.index("platform-decline")
+
+    score = np.where(sufficient, np.clip(np.nan_to_num(decline), 0.0, 1.0), np.nan)
+    return {
+        "score": score,
+        "decline": decline,
+        "slope": slope,
+        "data_points": data_points,
+        "sustained": sustained,
+        "level": level,
+        "declining_platforms": declining,
+    }
+
+
+def declining_platforms(decline, sufficient, platforms):
+    """Platforms whose median content decline crosses the fatigue threshold."""
+    declining = set()
+    for platform in set().union(*platforms) if platforms else ():
+        members = np.fromiter((platform in p for p in platforms), dtype=bool)
+        scored = members & sufficient & ~np.isnan(decline)
+        if scored.sum() >= MIN_PLATFORM_CONTENT and \
+                np.median(decline[scored]) > FATIGUE_DECLINE:
+            declining.add(platform)
+    return declining
+
+
+def score_rows(ids, scores):
+    """UNWIND rows for the write-back (NaN becomes null)."""
+    def value(array, i, digits=4):
+        v = array[i]
+        return None if np.isnan(v) else round(float(v), digits)
+
+    return [
+        {
+            "id": cid,
+            "score": value(scores["score"], i),
+            "level": LEVELS[scores["level"][i]],
+            "decline": value(scores["decline"], i),
+            "slope": value(scores["slope"], i, 6),
+            "data_points": int(scores["data_points"][i]),
+        }
+        for i, cid in enumerate(ids)
+    ]
+
+
+def write_scores(driver, rows):
+    """Write all scores in one UNWIND update. Returns the nodes updated."""
+    def update(tx):
+        return tx.run(SCORE_UPDATE, rows=rows).single()["updated"]
+
+    with driver.session() as session:
+        return session.execute_write(update)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Score active content for creative fatigue.")
+    parser.add_argument("--brand", default=BRAND_ID, help=f"Brand to score (default {BRAND_ID})")
+    parser.add_argument("--all-brands", action="store_true", help="Score every Droom brand")
+    parser.add_argument(
+        "--as-of",
+        type=dt.date.fromisoformat,
+        default=dt.date.today() - dt.timedelta(days=1),
+        help="Last day of the window (default yesterday)",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Score without writing back")
+    parser.add_argument("--top", type=int, default=10, help="Most-declined items to list")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    require_env()
+    brand_id = None if args.all_brands else args.brand
+    start = args.as_of - dt.timedelta(days=WINDOW_DAYS - 1)
+
+    print("=" * 64)
+    print("Droom Marketing Factory - Creative Fatigue Scoring")
+    print(f"Brand: {brand_id or 'all brands'}")
+    print(f"Window: {start} .. {args.as_of} ({WINDOW_DAYS} days)")
+    print(f"Target: {NEO4J_URI}")
+    print("=" * 64)
+
+    driver = connect()
+    try:
+        started = time.perf_counter()
+        rows = fetch_series(driver, start, args.as_of, brand_id)
+        fetched = time.perf_counter()
+        ids, platforms, impressions, clicks = pack_series(rows, start, WINDOW_DAYS)
+        scores = score_fatigue(impressions, clicks, platforms)
+        scored = time.perf_counter()
+        print(f"\n  [OK] Fetched {len(rows)} content-days in {fetched - started:.2f}s")
+        print(f"  [OK] Scored {len(ids)} content items in {scored - fetched:.3f}s")
+
+        updates = score_rows(ids, scores)
+        if args.dry_run:
+            print("  [--] Dry run: scores not written")
+        elif updates:
+            updated = write_scores(driver, updates)
+            print(f"  [OK] Wrote scores to {updated} content nodes")
+    finally:
+        driver.close()
+
+    print("\n" + "=" * 64)
+    print("FATIGUE SUMMARY")
+    print("=" * 64)
+    for index, level in enumerate(LEVELS):
+        print(f"  {level + ':':<24}{int((scores['level'] == index).sum())}")
+    if scores["declining_platforms"]:
+        print(f"\n  [WARN] Platform-wide CTR decline (flag for CSO review): "
+              f"{', '.join(f'{b}/{p}' for b, p in sorted(scores['declining_platforms']))}")
+
+    ranked = sorted(
+        (row for row in updates if row["decline"] is not None and row["data_points"] >= MIN_DATA_POINTS),
+        key=lambda row: row["decline"],
+        reverse=True,
+    )[:args.top]
+    if ranked:
+        print(f"\n  {'Content':<36} {'Decline':>8} {'Slope/d':>8} {'Pts':>4}  Level")
+        for row in ranked:
+            print(f"  {row['id']:<36} {row['decline']:>8.1%} {row['slope'] or 0:>8.2%} "
+                  f"{row['data_points']:>4}  {row['level']}")
+
+
+if __name__ == "__main__":
+    main()
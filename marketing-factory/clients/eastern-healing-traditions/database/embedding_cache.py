@@ -0,0 +1,275 @@
+"""
+Embedding Cache for Eastern Healing Traditions
+Droom Marketing Factory
+
+Persistent cache in front of the OpenAI embeddings endpoint so unchanged
+text (semantic descriptions, scenario descriptions, learnings) is never
+embedded twice. Entries are keyed by (model, sha256(normalized text)) and
+stored as raw float32 blobs in a local SQLite file, with an in-memory LRU
+tier in front of it, hit/miss counters and a size cap enforced by evicting
+the least recently used rows.
+
+Usage:
+    from embedding_cache import EmbeddingCache
+
+    cache = EmbeddingCache()
+    vectors = cache.embed(["text one", "text two"])   # list of float32 arrays
+    print(cache.stats())
+
+    python embedding_cache.py            # print cache statistics
+    python embedding_cache.py --clear
+
+Requires:
+    pip install numpy openai python-dotenv
+
+Environment variables (loaded from ../../.env or set directly):
+    OPENAI_API_KEY (only needed on cache misses)
+    DROOM_EMBEDDING_CACHE (optional, path of the SQLite file)
+    DROOM_EMBEDDING_CACHE_MAX_ROWS (optional, default 500000)
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 1536
+
+# Load .env from marketing-factory root
+_script_dir = Path(__file__).resolve().parent
+_env_path = _script_dir / ".." / ".." / ".." / ".env"
+load_dotenv(dotenv_path=_env_path)
+
+CACHE_PATH = Path(
+    os.environ.get("DROOM_EMBEDDING_CACHE")
+    or _script_dir / ".." / ".." / ".." / ".cache" / "embeddings.sqlite3"
+)
+MAX_ROWS = int(os.environ.get("DROOM_EMBEDDING_CACHE_MAX_ROWS", "500000"))
+MEMORY_ROWS = 10000
+
+# Texts sent per embeddings API request on a miss.
+API_BATCH_SIZE = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    text_hash BLOB NOT NULL,
+    dimensions INTEGER NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, text_hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used);
+"""
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+
+def normalize_text(text):
+    """Collapse whitespace so formatting-only changes hit the same entry."""
+    return " ".join(text.split())
+
+
+def text_key(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).digest()
+
+
+def openai_embedder(model):
+    """Return a function embedding a list of texts with the OpenAI API."""
+    import openai
+
+    client = openai.OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+
+    def embed(texts):
+        response = client.embeddings.create(model=model, input=texts)
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+    return embed
+
+
+class EmbeddingCache:
+    """Two-tier (LRU memory + SQLite) embedding cache.
+
+    `embedder` takes a list of texts and returns one vector per text; it
+    defaults to the OpenAI embeddings API for `model` and is only called
+    for texts that are not cached.
+    """
+
+    def __init__(self, path=CACHE_PATH, model=EMBEDDING_MODEL, embedder=None,
+                 max_rows=MAX_ROWS, memory_rows=MEMORY_ROWS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.model = model
+        self.max_rows = max_rows
+        self.memory_rows = memory_rows
+        self._embedder = embedder
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = openai_embedder(self.model)
+        return self._embedder
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_rows:
+            self._memory.popitem(last=False)
+
+    def get_many(self, texts):
+        """Return cached vectors (or None) for each text, without embedding."""
+        keys = [text_key(text) for text in texts]
+        found = [None] * len(texts)
+        missing = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    found[i] = vector
+                else:
+                    missing.setdefault(key, []).append(i)
+
+            if missing:
+                lookup = list(missing)
+                rows = []
+                # SQLite caps bound parameters; stay well under the limit.
+                for start in range(0, len(lookup), 500):
+                    chunk = lookup[start:start + 500]
+                    rows.extend(self._db.execute(
+                        f"SELECT text_hash, vector FROM embeddings WHERE model = ? "
+                        f"AND text_hash IN ({','.join('?' * len(chunk))})",
+                        [self.model, *chunk],
+                    ))
+                now = time.time()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    self._remember(key, vector)
+                    for i in missing[key]:
+                        found[i] = vector
+                        self.counters["disk_hits"] += 1
+                if rows:
+                    self._db.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                        [(now, self.model, key) for key, _ in rows],
+                    )
+                    self._db.commit()
+        return found
+
+    def put_many(self, texts, vectors):
+        """Store vectors for texts and evict down to the size cap."""
+        now = time.time()
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                vector = np.asarray(vector, dtype=np.float32)
+                key = text_key(text)
+                self._remember(key, vector)
+                rows.append((self.model, key, len(vector), vector.tobytes(), now))
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings "
+                "(model, text_hash, dimensions, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        (count,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.max_rows
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM embeddings WHERE (model, text_hash) IN ("
+                "SELECT model, text_hash FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            self.counters["evictions"] += excess
+
+    def embed(self, texts):
+        """Return one float32 vector per text, calling the API only on misses."""
+        vectors = self.get_many(texts)
+        pending = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                pending.setdefault(normalize_text(texts[i]), []).append(i)
+
+        if pending:
+            unique = list(pending)
+            with self._lock:
+                self.counters["misses"] += len(unique)
+            for start in range(0, len(unique), API_BATCH_SIZE):
+                batch = unique[start:start + API_BATCH_SIZE]
+                embedded = self.embedder(batch)
+                self.put_many(batch, embedded)
+                for text, vector in zip(batch, embedded):
+                    vector = np.asarray(vector, dtype=np.float32)
+                    for i in pending[text]:
+                        vectors[i] = vector
+        return vectors
+
+    def embed_one(self, text):
+        return self.embed([text])[0]
+
+    def stats(self):
+        (rows,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        lookups = sum(self.counters[k] for k in ("memory_hits", "disk_hits", "misses"))
+        hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+        return {
+            **self.counters,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "disk_rows": rows,
+            "memory_rows": len(self._memory),
+            "file_bytes": self.path.stat().st_size if self.path.exists() else 0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM embeddings")
+            self._db.commit()
+            self._db.execute("VACUUM")
+
+    def close(self):
+        self._db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the embedding cache.")
+    parser.add_argument("--clear", action="store_true", help="Delete all cached vectors")
+    args = parser.parse_args()
+
+    cache = EmbeddingCache()
+    if args.clear:
+        cache.clear()
+        print(f"[OK] Cleared {cache.path}")
+    stats = cache.stats()
+    print(f"Embedding cache: {cache.path.resolve()}")
+    print(f"  Model:       {cache.model}")
+    print(f"  Rows:        {stats['disk_rows']} (cap {cache.max_rows})")
+    print(f"  File size:   {stats['file_bytes'] / 1e6:.1f} MB")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
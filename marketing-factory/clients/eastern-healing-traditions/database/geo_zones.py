@@ -0,0 +1,405 @@
+"""
+Lead Geo-Zone Assignment for Eastern Healing Traditions
+Droom Marketing Factory
+
+Assigns :Droom:Lead nodes to the concentric :Droom:Geographic rings seeded
+by init_neo4j.py (core 10mi, extended 20mi, metro 35mi around
+center_lat/center_lng) and reports performance by zone.
+
+Leads are located from their own `lat`/`lng` when present, otherwise from
+the centroid of their 5-digit `zip` (Census ZCTA gazetteer file, looked up
+with a sorted-array binary search). Distances from every lead to every zone
+center are computed in one vectorized haversine pass per brand and each
+lead gets the innermost ring that contains it:
+
+    (Lead)-[:IN_ZONE {distance_miles, located_by, assigned_at}]->(Geographic)
+
+Links are written in UNWIND batches that also drop a lead's previous zone,
+and every located lead is stamped with `geo_assigned_at`, so by default
+only new leads are processed (use --reassign after moving a zone). Leads
+that cannot be located (no coordinates, unknown ZIP) are left unstamped and
+retried on the next run.
+
+The report splits each campaign's spend, revenue and conversions across
+the zones it TARGETED_AREA in proportion to their budget_weight, then
+compares each zone's share of leads with its share of budget.
+
+Usage:
+    python geo_zones.py
+    python geo_zones.py --all-brands
+    python geo_zones.py --reassign --zip-centroids 2020_Gaz_zcta_national.txt
+    python geo_zones.py --report-only
+
+Requires:
+    pip install neo4j numpy python-dotenv
+
+Environment variables (loaded from ../../.env or set directly):
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+    DROOM_ZIP_CENTROIDS (optional, path of the Census ZCTA gazetteer file)
+    NEO4J_GEO_BATCH_SIZE (optional, default 5000)
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from init_neo4j import BRAND_ID, NEO4J_URI, brand_predicate, connect, require_env
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+_script_dir = Path(__file__).resolve().parent
+ZIP_CENTROIDS = Path(
+    os.environ.get("DROOM_ZIP_CENTROIDS")
+    or _script_dir / ".." / ".." / ".." / ".cache" / "zcta-centroids.txt"
+)
+
+# Lead-zone links per write transaction.
+GEO_BATCH_SIZE = int(os.environ.get("NEO4J_GEO_BATCH_SIZE", "5000"))
+
+EARTH_RADIUS_MILES = 3958.8
+
+ZONE_QUERY = (
+    "MATCH (g:Droom:Geographic) "
+    "WHERE {brand} "
+    "RETURN g.id AS id, g.brand_id AS brand_id, g.name AS name, "
+    "  g.radius_miles AS radius_miles, g.budget_weight AS budget_weight, "
+    "  g.center_lat AS center_lat, g.center_lng AS center_lng "
+    "ORDER BY g.brand_id, g.radius_miles"
+)
+
+LEAD_QUERY = (
+    "MATCH (l:Droom:Lead) "
+    "WHERE {brand} "
+    "  AND ($reassign OR l.geo_assigned_at IS NULL) "
+    "RETURN l.id AS id, l.brand_id AS brand_id, l.lat AS lat, l.lng AS lng, "
+    "  toString(l.zip) AS zip"
+)
+
+# A null zone_id (located, but outside every ring) only clears old links.
+ZONE_MERGE = (
+    "UNWIND $rows AS row "
+    "MATCH (l:Droom:Lead {id: row.lead_id}) "
+    "SET l.geo_assigned_at = datetime() "
+    "WITH l, row "
+    "OPTIONAL MATCH (l)-[old:IN_ZONE]->(prev:Droom:Geographic) "
+    "WHERE row.zone_id IS NULL OR prev.id <> row.zone_id "
+    "DELETE old "
+    "WITH DISTINCT l, row "
+    "OPTIONAL MATCH (g:Droom:Geographic {id: row.zone_id}) "
+    "FOREACH (_ IN CASE WHEN g IS NULL THEN [] ELSE [1] END | "
+    "  MERGE (l)-[r:IN_ZONE]->(g) "
+    "  SET r.distance_miles = row.distance_miles, "
+    "    r.located_by = row.located_by, "
+    "    r.assigned_at = datetime()) "
+    "RETURN count(l) AS written"
+)
+
+ZONE_LEADS_QUERY = (
+    "MATCH (l:Droom:Lead)-[:IN_ZONE]->(g:Droom:Geographic) "
+    "WHERE {brand} "
+    "RETURN g.id AS zone_id, count(l) AS leads"
+)
+
+# Campaigns targeting several zones are split by the zones' budget_weight.
+ZONE_PERFORMANCE_QUERY = (
+    "MATCH (c:Droom:Campaign)-[:TARGETED_AREA]->(g:Droom:Geographic) "
+    "WHERE {brand} "
+    "WITH c, collect(g) AS zones, sum(coalesce(g.budget_weight, 0.0)) AS total_weight "
+    "MATCH (c)-[:ACHIEVED]->(p:Droom:Performance) "
+    "WITH c, zones, total_weight, sum(p.spend) AS spend, sum(p.revenue) AS revenue, "
+    "  sum(p.conversions) AS conversions "
+    "UNWIND zones AS g "
+    "WITH g, spend, revenue, conversions, "
+    "  CASE WHEN total_weight > 0 THEN coalesce(g.budget_weight, 0.0) / total_weight "
+    "  ELSE 1.0 / size(zones) END AS share "
+    "RETURN g.id AS zone_id, count(*) AS campaigns, sum(spend * share) AS spend, "
+    "  sum(revenue * share) AS revenue, sum(conversions * share) AS conversions"
+)
+
+# ---------------------------------------------------------------------------
+# Locate & assign
+# ---------------------------------------------------------------------------
+
+
+def load_zip_centroids(path=ZIP_CENTROIDS):
+    """(sorted int ZIPs, lat, lng) from a Census ZCTA gazetteer file."""
+    zips, lats, lngs = [], [], []
+    with open(path, newline="") as f:
+        reader = csv.reader(f, delimiter="\t")
+        header = [column.strip() for column in next(reader)]
+        geoid, lat, lng = (header.index(c) for c in ("GEOID", "INTPTLAT", "INTPTLONG"))
+        for row in reader:
+            zips.append(int(row[geoid]))
+            lats.append(float(row[lat]))
+            lngs.append(float(row[lng]))
+    order = np.argsort(zips)
+    return (np.asarray(zips, dtype=np.int32)[order],
+            np.asarray(lats)[order], np.asarray(lngs)[order])
+
+
+def _zip_codes(values):
+    codes = np.full(len(values), -1, dtype=np.int32)
+    for i, value in enumerate(values):
+        digits = (value or "").strip()[:5]
+        if len(digits) == 5 and digits.isdigit():
+            codes[i] = int(digits)
+    return codes
+
+
+def locate(leads, centroids=None):
+    """Return (lat, lng, located_by) arrays; NaN / None where a lead can't be placed."""
+    lat = np.array([lead["lat"] if lead["lat"] is not None else np.nan for lead in leads],
+                   dtype=float)
+    lng = np.array([lead["lng"] if lead["lng"] is not None else np.nan for lead in leads],
+                   dtype=float)
+    unplaced = np.isnan(lat) | np.isnan(lng)
+    located_by = np.where(unplaced, None, "coordinates").astype(object)
+    missing = np.flatnonzero(unplaced)
+    if centroids is not None and missing.size:
+        zips, zip_lat, zip_lng = centroids
+        codes = _zip_codes([leads[i]["zip"] for i in missing])
+        pos = np.clip(np.searchsorted(zips, codes), 0, len(zips) - 1)
+        found = (codes >= 0) & (zips[pos] == codes)
+        hit = missing[found]
+        lat[hit], lng[hit] = zip_lat[pos[found]], zip_lng[pos[found]]
+        located_by[hit] = "zip"
+    return lat, lng, located_by
+
+
+def haversine_miles(lat1, lng1, lat2, lng2):
+    """Great-circle distance in miles; broadcasts over NumPy arrays."""
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def assign_zones(lat, lng, zones):
+    """Innermost containing zone per point.
+
+    Returns (zone index or -1, distance in miles to that zone's center, or
+    to the nearest center when outside every zone).
+    """
+    center_lat = np.array([zone["center_lat"] for zone in zones], dtype=float)
+    center_lng = np.array([zone["center_lng"] for zone in zones], dtype=float)
+    radius = np.array([zone["radius_miles"] for zone in zones], dtype=float)
+    distance = haversine_miles(lat[:, None], lng[:, None], center_lat, center_lng)
+    inside = distance <= radius
+    innermost = np.argmin(np.where(inside, radius, np.inf), axis=1)
+    within = inside.any(axis=1)
+    index = np.where(within, innermost, -1)
+    nearest = np.where(within, distance[np.arange(len(index)), innermost], distance.min(axis=1))
+    return index, nearest
+
+
+def assignment_rows(leads, zones_by_brand, centroids=None):
+    """Link rows for every locatable lead whose brand has zones.
+
+    Leads that cannot be located (or whose brand has no zones) get no row,
+    so len(leads) - len(rows) is the unassigned count.
+    """
+    lat, lng, located_by = locate(leads, centroids)
+    brands = np.array([lead["brand_id"] for lead in leads], dtype=object)
+    rows = []
+    for brand_id in np.unique(brands) if len(leads) else []:
+        zones = zones_by_brand.get(brand_id)
+        members = np.flatnonzero((brands == brand_id) & ~np.isnan(lat))
+        if not zones or not members.size:
+            continue
+        index, distance = assign_zones(lat[members], lng[members], zones)
+        rows.extend(
+            {
+                "lead_id": leads[i]["id"],
+                "zone_id": zones[z]["id"] if z >= 0 else None,
+                "distance_miles": round(float(d), 2),
+                "located_by": located_by[i],
+            }
+            for i, z, d in zip(members.tolist(), index.tolist(), distance.tolist())
+        )
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Execution
+# ---------------------------------------------------------------------------
+
+
+def _write_batch(tx, rows):
+    return tx.run(ZONE_MERGE, rows=rows).single()["written"]
+
+
+def write_assignments(driver, rows, batch_size=GEO_BATCH_SIZE):
+    """Write link rows in UNWIND batches; returns (written, errors)."""
+    written, errors = 0, []
+    with driver.session() as session:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            try:
+                written += session.execute_write(_write_batch, batch)
+            except Exception as e:
+                msg = f"  [FAIL] rows {start + 1}-{start + len(batch)}: {e}"
+                print(msg)
+                errors.append(msg)
+    return written, errors
+
+
+def fetch_zones(session, brand_id):
+    zones = {}
+    for record in session.run(ZONE_QUERY.format(brand=brand_predicate("g", brand_id)),
+                              brand_id=brand_id):
+        zones.setdefault(record["brand_id"], []).append(dict(record))
+    return zones
+
+
+def zone_report(driver, brand_id):
+    """Per-zone leads and budget-weighted performance, grouped by brand."""
+    with driver.session() as session:
+        zones = fetch_zones(session, brand_id)
+        leads_query = ZONE_LEADS_QUERY.format(brand=brand_predicate("g", brand_id))
+        performance_query = ZONE_PERFORMANCE_QUERY.format(brand=brand_predicate("c", brand_id))
+        leads = {r["zone_id"]: r["leads"] for r in session.run(leads_query, brand_id=brand_id)}
+        performance = {r["zone_id"]: dict(r)
+                       for r in session.run(performance_query, brand_id=brand_id)}
+    report = {}
+    for brand, brand_zones in zones.items():
+        total_leads = sum(leads.get(zone["id"], 0) for zone in brand_zones)
+        total_weight = sum(zone["budget_weight"] or 0.0 for zone in brand_zones)
+        entries = []
+        for zone in brand_zones:
+            perf = performance.get(zone["id"], {})
+            spend, revenue = perf.get("spend") or 0.0, perf.get("revenue") or 0.0
+            zone_leads = leads.get(zone["id"], 0)
+            weight = (zone["budget_weight"] or 0.0) / total_weight if total_weight else 0.0
+            lead_share = zone_leads / total_leads if total_leads else 0.0
+            entries.append({
+                "zone": zone["name"],
+                "radius_miles": zone["radius_miles"],
+                "budget_weight": zone["budget_weight"],
+                "leads": zone_leads,
+                "lead_share": lead_share,
+                "lead_index": lead_share / weight if weight else None,
+                "campaigns": perf.get("campaigns", 0),
+                "spend": spend,
+                "revenue": revenue,
+                "conversions": perf.get("conversions") or 0.0,
+                "roas": revenue / spend if spend else None,
+                "cost_per_lead": spend / zone_leads if zone_leads and spend else None,
+            })
+        weighted = [(e["budget_weight"] or 0.0, e["roas"]) for e in entries if e["roas"] is not None]
+        weight_sum = sum(w for w, _ in weighted)
+        report[brand] = {
+            "zones": entries,
+            "weighted_roas": sum(w * r for w, r in weighted) / weight_sum if weight_sum else None,
+        }
+    return report
+
+
+def print_report(report):
+    def fmt(value, spec):
+        return "-" if value is None else format(value, spec)
+
+    for brand, entry in report.items():
+        print(f"\n  {brand}")
+        print(f"    {'zone':<10} {'radius':>6} {'weight':>6} {'leads':>8} {'share':>6} "
+              f"{'index':>6} {'spend':>11} {'ROAS':>6} {'cost/lead':>9}")
+        for zone in entry["zones"]:
+            print(f"    {zone['zone']:<10} {zone['radius_miles']:>4}mi "
+                  f"{fmt(zone['budget_weight'], '.2f'):>6} {zone['leads']:>8} "
+                  f"{zone['lead_share']:>6.1%} {fmt(zone['lead_index'], '.2f'):>6} "
+                  f"{zone['spend']:>11,.2f} {fmt(zone['roas'], '.2f'):>6} "
+                  f"{fmt(zone['cost_per_lead'], ',.2f'):>9}")
+        print(f"    Budget-weighted ROAS: {fmt(entry['weighted_roas'], '.2f')}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Assign leads to geographic zones.")
+    parser.add_argument("--brand", default=BRAND_ID, help=f"Brand (default {BRAND_ID})")
+    parser.add_argument("--all-brands", action="store_true", help="Assign every Droom brand")
+    parser.add_argument("--reassign", action="store_true",
+                        help="Reprocess leads that already have a zone")
+    parser.add_argument("--zip-centroids", type=Path, default=ZIP_CENTROIDS,
+                        help="Census ZCTA gazetteer file for ZIP-only leads")
+    parser.add_argument("--batch-size", type=int, default=GEO_BATCH_SIZE,
+                        help=f"Links per UNWIND write transaction (default {GEO_BATCH_SIZE})")
+    parser.add_argument("--dry-run", action="store_true", help="Assign without writing")
+    parser.add_argument("--report-only", action="store_true", help="Skip assignment")
+    args = parser.parse_args()
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    return args
+
+
+def main():
+    args = parse_args()
+    require_env()
+    brand_id = None if args.all_brands else args.brand
+
+    print("=" * 64)
+    print("Droom Marketing Factory - Lead Geo-Zone Assignment")
+    print(f"Brand: {brand_id or 'all brands'}")
+    print(f"Mode: {'report only' if args.report_only else 'reassign all' if args.reassign else 'new leads'}"
+          f"{' (dry run)' if args.dry_run else ''}")
+    print(f"Target: {NEO4J_URI}")
+    print("=" * 64)
+
+    centroids = None
+    if not args.report_only:
+        if args.zip_centroids.exists():
+            centroids = load_zip_centroids(args.zip_centroids)
+            print(f"\n  [OK] {len(centroids[0])} ZIP centroids from {args.zip_centroids}")
+        else:
+            print(f"\n  [WARN] No ZIP centroid file at {args.zip_centroids}; "
+                  "ZIP-only leads will stay unassigned")
+
+    driver = connect()
+    errors = []
+    try:
+        if not args.report_only:
+            started = time.perf_counter()
+            with driver.session() as session:
+                zones = fetch_zones(session, brand_id)
+                leads = session.run(LEAD_QUERY.format(brand=brand_predicate("l", brand_id)),
+                                    brand_id=brand_id, reassign=args.reassign).data()
+            fetched = time.perf_counter()
+            rows = assignment_rows(leads, zones, centroids)
+            assigned = time.perf_counter()
+
+            counts = {}
+            for row in rows:
+                zone = row["zone_id"].rsplit("--", 1)[-1] if row["zone_id"] else "outside"
+                counts[zone] = counts.get(zone, 0) + 1
+            print(f"\n--- Assigned {len(rows)} of {len(leads)} lead(s) "
+                  f"({len(leads) - len(rows)} not locatable) ---")
+            for zone, count in sorted(counts.items()):
+                print(f"  {zone:<10} {count:>8}")
+            print(f"  Fetch {fetched - started:.2f}s, assign {(assigned - fetched) * 1000:.0f} ms")
+
+            if not args.dry_run and rows:
+                written, errors = write_assignments(driver, rows, args.batch_size)
+                status = "OK" if written == len(rows) else "FAIL"
+                print(f"  [{status}] {written}/{len(rows)} leads written in "
+                      f"{time.perf_counter() - assigned:.2f}s")
+
+        print("\n" + "=" * 64)
+        print("PERFORMANCE BY ZONE")
+        print("=" * 64)
+        print_report(zone_report(driver, brand_id))
+    finally:
+        driver.close()
+
+    if errors:
+        print(f"\n  ERRORS ({len(errors)}):")
+        for err in errors:
+            print(f"    {err}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Batched Content Ingestion for Eastern Healing Traditions
+Droom Marketing Factory
+
+Writes Claude Vision content profiles to Neo4j in bulk: :Droom:Content
+nodes (labelled :Video or :Image) plus their HAS_TONE, HAS_AESTHETIC,
+HAS_COLOR_PALETTE, HAS_COMPOSITION and SHOWS relationships to the shared
+attribute nodes seeded by init_neo4j.py.
+
+Each batch is one write transaction of seven UNWIND statements (content
+nodes, stale-edge cleanup, one per relationship type), so a back catalog
+of a thousand assets is a handful of round trips instead of one workflow
+execution per asset. Re-ingesting a profile replaces its attribute edges.
+
+A profile is either the flat vision analysis merged with the content
+fields, or the content-ingestion workflow's shape with an `analysis` key:
+
+    {"id": "eht-...", "s3_key": "raw/video/clinic-tour.mp4",
+     "media_type": "video", "semantic_description": "...",
+     "tones": [{"name": "calm", "confidence": 0.9}],
+     "aesthetics": [{"name": "warm", "confidence": 0.7}],
+     "color_palette": "earth-tones", "composition": "wide-shot",
+     "narrative_elements": ["shows_physical_space"], "quality_score": 82}
+
+Attribute values that are not seeded shared nodes are skipped and reported.
+
+Usage:
+    python ingest_content.py profiles.jsonl
+    python ingest_content.py catalog.json --batch-size 250
+
+    from ingest_content import ingest_profiles
+    summary = ingest_profiles(driver, profiles)
+
+Requires:
+    pip install neo4j python-dotenv
+
+Environment variables (loaded from ../../.env or set directly):
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+    NEO4J_INGEST_BATCH_SIZE (optional, default 500)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from init_neo4j import BRAND_ID, NEO4J_URI, SHARED_ATTRIBUTES, connect, require_env
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Content profiles per write transaction.
+INGEST_BATCH_SIZE = int(os.environ.get("NEO4J_INGEST_BATCH_SIZE", "500"))
+
+# Prefix of generated content ids, as in the content-ingestion workflow.
+CONTENT_ID_PREFIX = "eht"
+
+S3_BASE_URL = "https://droom.s3.us-east-1.amazonaws.com"
+VIDEO_FORMATS = {"mp4", "mov", "avi", "webm"}
+
+# Relationship type -> (attribute label, profile field, weighted by confidence).
+RELATIONSHIPS = {
+    "HAS_TONE": ("Tone", "tones", True),
+    "HAS_AESTHETIC": ("Aesthetic", "aesthetics", True),
+    "HAS_COLOR_PALETTE": ("ColorPalette", "color_palette", False),
+    "HAS_COMPOSITION": ("Composition", "composition", False),
+    "SHOWS": ("NarrativeElement", "narrative_elements", False),
+}
+
+CONTENT_MERGE = (
+    "UNWIND $rows AS row "
+    "MERGE (c:Droom:Content {id: row.id}) "
+    "ON CREATE SET "
+    "  c.brand_id = row.brand_id, "
+    "  c.upload_date = datetime(), "
+    "  c.status = 'active', "
+    "  c.total_impressions = 0, "
+    "  c.total_spend = 0.0, "
+    "  c.avg_roas = 0.0 "
+    "SET "
+    "  c.s3_key = row.s3_key, "
+    "  c.s3_url = row.s3_url, "
+    "  c.filename = row.filename, "
+    "  c.media_type = row.media_type, "
+    "  c.format = row.format, "
+    "  c.resolution = coalesce(row.resolution, c.resolution), "
+    "  c.duration_seconds = coalesce(row.duration_seconds, c.duration_seconds), "
+    "  c.semantic_description = row.semantic_description, "
+    "  c.quality_score = row.quality_score, "
+    "  c.profile_date = datetime() "
+    "FOREACH (_ IN CASE WHEN row.media_type = 'video' THEN [1] ELSE [] END | SET c:Video) "
+    "FOREACH (_ IN CASE WHEN row.media_type = 'image' THEN [1] ELSE [] END | SET c:Image) "
+    "RETURN row.id AS id"
+)
+
+# Drop a re-profiled item's previous attribute edges before writing new ones.
+CONTENT_EDGES_DELETE = (
+    "UNWIND $ids AS id "
+    "MATCH (c:Droom:Content {id: id})-[r:" + "|".join(RELATIONSHIPS) + "]->() "
+    "DELETE r"
+)
+
+EDGE_MERGE = (
+    "UNWIND $rows AS row "
+    "MATCH (c:Droom:Content {{id: row.id}}) "
+    "MATCH (a:Droom:{label} {{name: row.name}}) "
+    "MERGE (c)-[r:{rel}]->(a) "
+    "{set_confidence}"
+    "RETURN count(r) AS written"
+)
+
+# ---------------------------------------------------------------------------
+# Profile normalization
+# ---------------------------------------------------------------------------
+
+
+def content_id(s3_key):
+    """Deterministic id for profiles without one, so re-imports are idempotent."""
+    digest = hashlib.sha1(s3_key.encode("utf-8")).hexdigest()[:16]
+    return f"{CONTENT_ID_PREFIX}-{digest}"
+
+
+def _attribute_name(value):
+    return str(value).strip().lower()
+
+
+def content_row(profile, brand_id=BRAND_ID):
+    """Build the :Droom:Content row for one profile."""
+    analysis = profile.get("analysis", profile)
+    s3_key = profile.get("s3_key")
+    if not (profile.get("id") or profile.get("content_id") or s3_key):
+        raise ValueError("profile needs an id, content_id or s3_key")
+    filename = profile.get("filename") or (s3_key or "").rsplit("/", 1)[-1]
+    fmt = (profile.get("format") or filename.rsplit(".", 1)[-1]).lower()
+    media_type = profile.get("media_type") or ("video" if fmt in VIDEO_FORMATS else "image")
+    return {
+        "id": profile.get("id") or profile.get("content_id") or content_id(s3_key),
+        "brand_id": profile.get("brand_id", brand_id),
+        "s3_key": s3_key,
+        "s3_url": profile.get("s3_url") or (f"{S3_BASE_URL}/{s3_key}" if s3_key else None),
+        "filename": filename,
+        "media_type": media_type,
+        "format": fmt,
+        "resolution": profile.get("resolution"),
+        "duration_seconds": profile.get("duration_seconds"),
+        "semantic_description": analysis.get("semantic_description"),
+        "quality_score": analysis.get("quality_score"),
+    }
+
+
+def edge_rows(content, profile, skipped):
+    """Split one profile into per-relationship edge rows.
+
+    Values with no matching shared attribute node are counted in `skipped`
+    as `{"Label:value": count}` instead of silently matching nothing.
+    """
+    analysis = profile.get("analysis", profile)
+    rows = {rel: [] for rel in RELATIONSHIPS}
+    for rel, (label, field, weighted) in RELATIONSHIPS.items():
+        values = analysis.get(field) or []
+        if not isinstance(values, list):
+            values = [values]
+        for value in values:
+            if weighted and isinstance(value, dict):
+                name, confidence = value.get("name"), value.get("confidence")
+            else:
+                name, confidence = value, None
+            name = _attribute_name(name)
+            if name not in SHARED_ATTRIBUTES[label]:
+                key = f"{label}:{name}"
+                skipped[key] = skipped.get(key, 0) + 1
+                continue
+            row = {"id": content["id"], "name": name}
+            if weighted:
+                row["confidence"] = confidence
+            rows[rel].append(row)
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Execution
+# ---------------------------------------------------------------------------
+
+
+def _ingest_batch(tx, contents, edges):
+    """Write one batch: content nodes, then every relationship type."""
+    written = {record["id"] for record in tx.run(CONTENT_MERGE, rows=contents)}
+    tx.run(CONTENT_EDGES_DELETE, ids=[row["id"] for row in contents]).consume()
+    counts = {}
+    for rel, (label, _, weighted) in RELATIONSHIPS.items():
+        if not edges[rel]:
+            counts[rel] = 0
+            continue
+        cypher = EDGE_MERGE.format(
+            label=label,
+            rel=rel,
+            set_confidence="SET r.confidence = row.confidence " if weighted else "",
+        )
+        counts[rel] = tx.run(cypher, rows=edges[rel]).single()["written"]
+    return written, counts
+
+
+def new_summary():
+    return {
+        "content_nodes": 0,
+        "edges": {rel: 0 for rel in RELATIONSHIPS},
+        "skipped_attributes": {},
+        "errors": [],
+    }
+
+
+def ingest_profiles(driver, profiles, brand_id=BRAND_ID, batch_size=INGEST_BATCH_SIZE,
+                    summary=None, echo=True):
+    """Write `profiles` in batches of `batch_size`, one transaction each.
+
+    A failed batch rolls back as a whole and is recorded in
+    `summary["errors"]`; later batches still run. Returns the summary.
+    """
+    summary = summary or new_summary()
+    with driver.session() as session:
+        for start in range(0, len(profiles), batch_size):
+            batch = profiles[start:start + batch_size]
+            contents = []
+            edges = {rel: [] for rel in RELATIONSHIPS}
+            for offset, profile in enumerate(batch):
+                try:
+                    content = content_row(profile, brand_id)
+                except ValueError as e:
+                    summary["errors"].append(f"  [FAIL] profile #{start + offset}: {e}")
+                    continue
+                contents.append(content)
+                for rel, rows in edge_rows(content, profile, summary["skipped_attributes"]).items():
+                    edges[rel].extend(rows)
+            if not contents:
+                continue
+
+            label = f"profiles {start + 1}-{start + len(batch)}"
+            try:
+                written, counts = session.execute_write(_ingest_batch, contents, edges)
+            except Exception as e:
+                msg = f"  [FAIL] {label}: {e}"
+                if echo:
+                    print(msg)
+                summary["errors"].append(msg)
+                continue
+
+            summary["content_nodes"] += len(written)
+            for rel, count in counts.items():
+                summary["edges"][rel] += count
+            if echo:
+                print(f"  [OK] {label}: {len(written)} content, "
+                      f"{sum(counts.values())} relationships")
+    return summary
+
+
+def load_profiles(path):
+    """Read profiles from a JSON array or a JSON Lines file."""
+    with open(path) as f:
+        if Path(path).suffix == ".json":
+            data = json.load(f)
+            return data if isinstance(data, list) else [data]
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bulk-ingest content profiles into Neo4j.")
+    parser.add_argument("profiles", type=Path, help="JSON array or JSONL of vision profiles")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=INGEST_BATCH_SIZE,
+        help=f"Profiles per write transaction (default {INGEST_BATCH_SIZE})",
+    )
+    args = parser.parse_args()
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    return args
+
+
+def main():
+    args = parse_args()
+    require_env()
+    profiles = load_profiles(args.profiles)
+
+    print("=" * 64)
+    print("Droom Marketing Factory - Content Ingestion")
+    print(f"Client: {BRAND_ID}")
+    print(f"Profiles: {len(profiles)} from {args.profiles} (batch size {args.batch_size})")
+    print(f"Target: {NEO4J_URI}")
+    print("=" * 64)
+
+    driver = connect()
+    started = time.perf_counter()
+    try:
+        summary = ingest_profiles(driver, profiles, batch_size=args.batch_size)
+    finally:
+        driver.close()
+    elapsed = time.perf_counter() - started
+
+    print("\n" + "=" * 64)
+    print("INGESTION SUMMARY")
+    print("=" * 64)
+    print(f"  Content nodes written:        {summary['content_nodes']}")
+    for rel, count in summary["edges"].items():
+        print(f"  {rel + ' relationships:':<30}{count}")
+    print(f"  Elapsed:                      {elapsed:.1f}s")
+    if summary["skipped_attributes"]:
+        print("\n  [WARN] Unknown attribute values (not linked):")
+        for key, count in sorted(summary["skipped_attributes"].items()):
+            print(f"    {key} x{count}")
+
+    if summary["errors"]:
+        print(f"\n  ERRORS ({len(summary['errors'])}):")
+        for err in summary["errors"]:
+            print(f"    {err}")
+        sys.exit(1)
+    else:
+        print("\n  All profiles ingested successfully.")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,18 +6,40 @@ Creates constraints, indexes, shared attribute nodes, and client-specific
 seed data. Safe to run multiple times (idempotent). Never modifies or
 deletes data outside the :Droom label scope.
 
+Only constraints and indexes missing from the live schema are created;
+`--plan` prints that diff (including same-name definition drift) without
+changing anything.
+
+Every statement is timed (wall clock plus the server's
+result_available_after / result_consumed_after) and its update counters
+are kept; the final summary lists the slowest statements. `--profile`
+runs the seed MERGEs under PROFILE to add db hits and plan operators,
+flagging any that fall back to a label or all-nodes scan. `--trace`
+writes the spans as OpenTelemetry (OTLP/JSON) trace data.
+
 Usage:
     python init_neo4j.py
+    python init_neo4j.py --plan
+    python init_neo4j.py --batch-size 1000
+    python init_neo4j.py --profile --trace init-trace.json
 
 Requires:
     pip install neo4j python-dotenv
 
 Environment variables (loaded from ../../.env or set directly):
     NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+    NEO4J_SEED_BATCH_SIZE (optional, default 500)
+    NEO4J_INDEX_TIMEOUT (optional, seconds, default 300)
 """
 
+import argparse
+import json
 import os
+import re
 import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -41,11 +63,23 @@ NEO4J_URI = os.environ.get("NEO4J_URI")
 NEO4J_USER = os.environ.get("NEO4J_USER")
 NEO4J_PASSWORD = os.environ.get("NEO4J_PASSWORD")
 
-if not all([NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD]):
-    print("ERROR: Missing required environment variables.")
-    print("  Set NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD in your environment")
-    print(f"  or in {_env_path}")
-    sys.exit(1)
+# Rows per UNWIND write transaction when seeding nodes.
+SEED_BATCH_SIZE = int(os.environ.get("NEO4J_SEED_BATCH_SIZE", "500"))
+
+# Query tracing: counters kept per statement, plan operators that mean a
+# statement read without an index, and rows in the slowest-statements table.
+TRACE_COUNTERS = (
+    "nodes_created",
+    "nodes_deleted",
+    "relationships_created",
+    "relationships_deleted",
+    "properties_set",
+    "labels_added",
+    "indexes_added",
+    "constraints_added",
+)
+SCAN_OPERATORS = {"AllNodesScan", "NodeByLabelScan"}
+SLOWEST_STATEMENTS = 10
 
 # ---------------------------------------------------------------------------
 # Schema definitions
@@ -157,6 +191,15 @@ INDEXES = [
     ),
 ]
 
+# Schema object types reported by SHOW CONSTRAINTS / SHOW INDEXES that match
+# the DDL above (names differ between Neo4j 4.4 and 5.x).
+UNIQUE_CONSTRAINT_TYPES = {"UNIQUENESS", "NODE_PROPERTY_UNIQUENESS"}
+RANGE_INDEX_TYPES = {"RANGE", "BTREE"}
+
+# How long to wait for newly created indexes to finish populating.
+INDEX_ONLINE_TIMEOUT = int(os.environ.get("NEO4J_INDEX_TIMEOUT", "300"))
+INDEX_POLL_INTERVAL = 2
+
 # Shared attribute nodes — universal across all Droom clients.
 # These use MERGE so they are created only once, even if multiple clients
 # run their init scripts.
@@ -189,222 +232,658 @@ SHARED_ATTRIBUTES = {
     ],
 }
 
-# Client-specific demographic segments.
-DEMOGRAPHICS = [
-    {
-        "id": f"{BRAND_ID}--chronic-pain-seekers-40-65",
-        "brand_id": BRAND_ID,
-        "name": "chronic-pain-seekers-40-65",
-        "display_name": "Pain Relief Seekers",
-        "age_range": "40-65",
-        "gender": "all",
-        "description": (
-            "Established adults managing chronic pain conditions. "
-            "Middle-to-upper income ($75K-150K). Research-heavy purchase "
-            "journey — searches conditions, reads reviews, needs trust "
-            "signals before booking."
-        ),
-    },
-    {
-        "id": f"{BRAND_ID}--autoimmune-wellness-women-30-55",
-        "brand_id": BRAND_ID,
-        "name": "autoimmune-wellness-women-30-55",
-        "display_name": "Autoimmune Warriors",
-        "age_range": "30-55",
-        "gender": "female-skew",
-        "description": (
-            "Women managing ongoing autoimmune conditions, balancing health "
-            "with career and family. Middle-to-upper income ($65K-130K). "
-            "Community-influenced — trusts recommendations from support "
-            "groups and fellow patients."
-        ),
-    },
-    {
-        "id": f"{BRAND_ID}--proactive-wellness-adults-28-50",
-        "brand_id": BRAND_ID,
-        "name": "proactive-wellness-adults-28-50",
-        "display_name": "Wellness Optimizers",
-        "age_range": "28-50",
-        "gender": "all",
-        "description": (
-            "Health-conscious adults interested in preventative care and "
-            "optimization. Upper-middle income ($90K-200K). Education-first "
-            "purchase journey — wants to understand TCM before committing."
-        ),
-    },
-]
+# Client seed rows come from brand-config.json. init_all_clients.py builds
+# every client's rows with these same functions, so either script leaves
+# the nodes identical.
+BRAND_CONFIG_PATH = _script_dir / ".." / "brand-config.json"
+
+# brand-config.json demographic tiers, in seeding order.
+DEMOGRAPHIC_TIERS = ["primary", "secondary", "tertiary"]
+
+
+def load_brand_config(path=BRAND_CONFIG_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def demographic_rows(config):
+    """Build :Droom:Demographic seed rows from a brand config.
+
+    Uses each tier's `description`, or composes one from its life stage,
+    income level and purchase journey when the config has none.
+    """
+    brand_id = config["brand_id"]
+    rows = []
+    demographics = config.get("demographics", {})
+    for tier in DEMOGRAPHIC_TIERS:
+        demo = demographics.get(tier)
+        if not demo:
+            continue
+        description = demo.get("description")
+        if not description:
+            parts = [
+                demo.get("life_stage"),
+                f"Income: {demo['income_level']}" if demo.get("income_level") else None,
+                demo.get("purchase_journey"),
+            ]
+            description = " ".join(p.rstrip(".") + "." for p in parts if p)
+        rows.append({
+            "id": f"{brand_id}--{demo['name']}",
+            "brand_id": brand_id,
+            "name": demo["name"],
+            "display_name": demo.get("display_name", demo["name"]),
+            "age_range": demo.get("age_range", ""),
+            "gender": demo.get("gender", "all"),
+            "description": description,
+        })
+    return rows
+
+
+def geographic_rows(config):
+    """Build :Droom:Geographic seed rows from a brand config's radius zones."""
+    brand_id = config["brand_id"]
+    strategy = config.get("geographic_strategy", {})
+    coordinates = config.get("contact", {}).get("coordinates", {})
+    rows = []
+    for zone in strategy.get("zones", []):
+        rows.append({
+            "id": f"{brand_id}--{zone['name']}",
+            "brand_id": brand_id,
+            "name": zone["name"],
+            "radius_miles": zone.get("radius_miles"),
+            "budget_weight": zone.get("budget_weight"),
+            "center_lat": coordinates.get("lat"),
+            "center_lng": coordinates.get("lng"),
+            "center_address": strategy.get("center", ""),
+            "areas": zone.get("areas", ""),
+        })
+    return rows
+
+
+# Client-specific demographic segments and geographic zones.
+BRAND_CONFIG = load_brand_config()
+DEMOGRAPHICS = demographic_rows(BRAND_CONFIG)
+GEOGRAPHIC_ZONES = geographic_rows(BRAND_CONFIG)
+
+# Seed statements. Each writes a whole batch of rows in one round trip and
+# returns the key of every row it merged so results can be reported per row.
+SHARED_ATTRIBUTE_MERGE = (
+    "UNWIND $rows AS row "
+    "MERGE (n:Droom:{label} {{name: row.name}}) "
+    "ON CREATE SET n.created_at = datetime() "
+    "RETURN row.name AS name"
+)
+
+DEMOGRAPHIC_MERGE = (
+    "UNWIND $rows AS row "
+    "MERGE (n:Droom:Demographic {id: row.id}) "
+    "ON CREATE SET "
+    "  n.brand_id = row.brand_id, "
+    "  n.name = row.name, "
+    "  n.display_name = row.display_name, "
+    "  n.age_range = row.age_range, "
+    "  n.gender = row.gender, "
+    "  n.description = row.description, "
+    "  n.created_at = datetime() "
+    "ON MATCH SET "
+    "  n.display_name = row.display_name, "
+    "  n.age_range = row.age_range, "
+    "  n.gender = row.gender, "
+    "  n.description = row.description "
+    "RETURN row.id AS id"
+)
+
+GEOGRAPHIC_MERGE = (
+    "UNWIND $rows AS row "
+    "MERGE (n:Droom:Geographic {id: row.id}) "
+    "ON CREATE SET "
+    "  n.brand_id = row.brand_id, "
+    "  n.name = row.name, "
+    "  n.radius_miles = row.radius_miles, "
+    "  n.budget_weight = row.budget_weight, "
+    "  n.center_lat = row.center_lat, "
+    "  n.center_lng = row.center_lng, "
+    "  n.center_address = row.center_address, "
+    "  n.areas = row.areas, "
+    "  n.created_at = datetime() "
+    "ON MATCH SET "
+    "  n.radius_miles = row.radius_miles, "
+    "  n.budget_weight = row.budget_weight, "
+    "  n.areas = row.areas "
+    "RETURN row.id AS id"
+)
+
+# ---------------------------------------------------------------------------
+# Query tracing
+# ---------------------------------------------------------------------------
+
+
+def _plan_operators(plan):
+    """Flatten a PROFILE plan into (operator types, total db hits)."""
+    operators, db_hits, stack = [], 0, [plan]
+    while stack:
+        node = stack.pop()
+        # Newer servers suffix the runtime, e.g. "NodeByLabelScan@neo4j".
+        operators.append(node.get("operatorType", "").split("@")[0])
+        db_hits += node.get("dbHits") or node.get("args", {}).get("DbHits") or 0
+        stack.extend(reversed(node.get("children") or []))
+    return operators, db_hits
+
+
+def _statement_name(cypher):
+    """Short span name for a statement, e.g. 'MERGE :Droom:Tone'."""
+    match = re.search(r"MERGE \(\w+:([\w:]+)", cypher)
+    return f"MERGE :{match.group(1)}" if match else " ".join(cypher.split()[:2])
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, list):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+class QueryTrace:
+    """Per-statement timings, counters and (optionally) PROFILE plans.
+
+    Pass one to run_queries() and the phases it calls; spans are recorded
+    thread-safely, so a trace can be shared by concurrent seeders.
+    """
+
+    def __init__(self, profile=False):
+        self.profile = profile
+        self.trace_id = os.urandom(16).hex()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def statement(self, cypher):
+        """`cypher` as it should be sent: under PROFILE when profiling."""
+        return f"PROFILE {cypher}" if self.profile else cypher
+
+    @contextmanager
+    def span(self, name, cypher):
+        """Time the block; set `span["summary"]` to the ResultSummary inside it."""
+        entry = {"summary": None}
+        start_ns, started = time.time_ns(), time.perf_counter()
+        error = None
+        try:
+            yield entry
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.record(name, cypher, start_ns, time.perf_counter() - started,
+                        entry["summary"], error)
+
+    def record(self, name, cypher, start_ns, seconds, result_summary=None, error=None):
+        span = {
+            "name": name,
+            "statement": cypher,
+            "start_ns": start_ns,
+            "wall_ms": seconds * 1000,
+            "available_after_ms": None,
+            "consumed_after_ms": None,
+            "counters": {},
+            "db_hits": None,
+            "operators": [],
+            "error": str(error) if error else None,
+        }
+        if result_summary is not None:
+            span["available_after_ms"] = result_summary.result_available_after
+            span["consumed_after_ms"] = result_summary.result_consumed_after
+            counters = result_summary.counters
+            span["counters"] = {
+                field: getattr(counters, field, 0)
+                for field in TRACE_COUNTERS if getattr(counters, field, 0)
+            }
+            if result_summary.profile:
+                span["operators"], span["db_hits"] = _plan_operators(result_summary.profile)
+        with self._lock:
+            self.spans.append(span)
+
+    def slowest(self, limit=SLOWEST_STATEMENTS):
+        return sorted(self.spans, key=lambda span: span["wall_ms"], reverse=True)[:limit]
+
+    def print_slowest(self, limit=SLOWEST_STATEMENTS):
+        """Print the slowest statements, flagging label/all-nodes scans."""
+        spans = self.slowest(limit)
+        if not spans:
+            return
+        total = sum(span["wall_ms"] for span in self.spans)
+        print(f"\n  SLOWEST STATEMENTS ({len(spans)} of {len(self.spans)}, "
+              f"{total / 1000:.2f}s total):")
+        print(f"    {'wall ms':>9} {'server ms':>9} {'db hits':>9}  statement")
+        for span in spans:
+            server = (span["available_after_ms"] or 0) + (span["consumed_after_ms"] or 0)
+            hits = "-" if span["db_hits"] is None else span["db_hits"]
+            line = f"    {span['wall_ms']:>9.1f} {server:>9} {hits:>9}  {span['name']}"
+            if span["counters"]:
+                line += " (" + ", ".join(f"{k}={v}" for k, v in span["counters"].items()) + ")"
+            scans = SCAN_OPERATORS.intersection(span["operators"])
+            if scans:
+                line += f" [SCAN: {', '.join(sorted(scans))}]"
+            if span["error"]:
+                line += " [FAIL]"
+            print(line)
+
+    def to_otlp(self):
+        """The spans as an OTLP/JSON ExportTraceServiceRequest."""
+        spans = []
+        for span in self.spans:
+            attributes = {
+                "db.system": "neo4j",
+                "db.statement": span["statement"],
+                "db.neo4j.wall_ms": round(span["wall_ms"], 3),
+            }
+            if span["available_after_ms"] is not None:
+                attributes["db.neo4j.result_available_after_ms"] = span["available_after_ms"]
+                attributes["db.neo4j.result_consumed_after_ms"] = span["consumed_after_ms"]
+            for field, value in span["counters"].items():
+                attributes[f"db.neo4j.counters.{field}"] = value
+            if span["db_hits"] is not None:
+                attributes["db.neo4j.profile.db_hits"] = span["db_hits"]
+                attributes["db.neo4j.profile.operators"] = span["operators"]
+            status = {"code": 1}
+            if span["error"]:
+                status = {"code": 2, "message": span["error"]}
+            spans.append({
+                "traceId": self.trace_id,
+                "spanId": os.urandom(8).hex(),
+                "name": span["name"],
+                "kind": 3,  # SPAN_KIND_CLIENT
+                "startTimeUnixNano": str(span["start_ns"]),
+                "endTimeUnixNano": str(span["start_ns"] + int(span["wall_ms"] * 1e6)),
+                "attributes": [
+                    {"key": key, "value": _otlp_value(value)}
+                    for key, value in attributes.items()
+                ],
+                "status": status,
+            })
+        return {"resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": "droom-init-neo4j"}},
+                {"key": "droom.brand_id", "value": {"stringValue": BRAND_ID}},
+            ]},
+            "scopeSpans": [{"scope": {"name": "init_neo4j"}, "spans": spans}],
+        }]}
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_otlp(), f, indent=2)
+
+
+def _span(trace, name, cypher):
+    return trace.span(name, cypher) if trace else nullcontext({})
 
-# Client-specific geographic zones.
-GEOGRAPHIC_ZONES = [
-    {
-        "id": f"{BRAND_ID}--core",
-        "brand_id": BRAND_ID,
-        "name": "core",
-        "radius_miles": 10,
-        "budget_weight": 0.50,
-        "center_lat": 42.3447,
-        "center_lng": -87.9967,
-        "center_address": "34121 US-45, Grayslake, IL 60030",
-        "areas": "Grayslake, Round Lake, Mundelein, Libertyville, Gurnee, Waukegan",
-    },
-    {
-        "id": f"{BRAND_ID}--extended",
-        "brand_id": BRAND_ID,
-        "name": "extended",
-        "radius_miles": 20,
-        "budget_weight": 0.35,
-        "center_lat": 42.3447,
-        "center_lng": -87.9967,
-        "center_address": "34121 US-45, Grayslake, IL 60030",
-        "areas": "Vernon Hills, Lake Forest, Highland Park, Antioch, Crystal Lake, McHenry",
-    },
-    {
-        "id": f"{BRAND_ID}--metro",
-        "brand_id": BRAND_ID,
-        "name": "metro",
-        "radius_miles": 35,
-        "budget_weight": 0.15,
-        "center_lat": 42.3447,
-        "center_lng": -87.9967,
-        "center_address": "34121 US-45, Grayslake, IL 60030",
-        "areas": "Northern Chicago suburbs, Evanston, Schaumburg, Elgin",
-    },
-]
 
 # ---------------------------------------------------------------------------
 # Execution
 # ---------------------------------------------------------------------------
 
 
-def run_queries(driver):
-    """Execute all schema and seed data queries."""
-    summary = {
+def _write_batch(tx, cypher, rows, key):
+    """Run one UNWIND statement; return the keys it wrote and its summary."""
+    result = tx.run(cypher, rows=rows)
+    written = {record[key] for record in result}
+    return written, result.consume()
+
+
+def seed_rows(
+    driver,
+    cypher,
+    rows,
+    key,
+    describe,
+    errors,
+    batch_size=SEED_BATCH_SIZE,
+    echo=True,
+    trace=None,
+):
+    """MERGE `rows` in batches of `batch_size`, one write transaction each.
+
+    `cypher` must UNWIND `$rows AS row` and RETURN `row.<key> AS <key>`.
+    Every row is still reported individually: rows in a batch whose
+    transaction fails are all marked FAIL, since the whole batch rolls back.
+    Each batch is recorded as one span in `trace`, if given.
+    Returns the number of rows written.
+    """
+    written_count = 0
+    name = _statement_name(cypher)
+    statement = trace.statement(cypher) if trace else cypher
+    with driver.session() as session:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            try:
+                with _span(trace, f"{name} rows {start + 1}-{start + len(batch)}",
+                           statement) as span:
+                    written, span["summary"] = session.execute_write(
+                        _write_batch, statement, batch, key
+                    )
+            except Exception as e:
+                for row in batch:
+                    msg = f"  [FAIL] {describe(row)}: {e}"
+                    if echo:
+                        print(msg)
+                    errors.append(msg)
+                continue
+
+            for row in batch:
+                if row[key] in written:
+                    written_count += 1
+                    if echo:
+                        print(f"  [OK] {describe(row)}")
+                else:
+                    msg = f"  [FAIL] {describe(row)}: not returned by MERGE"
+                    if echo:
+                        print(msg)
+                    errors.append(msg)
+    return written_count
+
+
+def new_summary():
+    """Return an empty summary dict for the phases below to fill in."""
+    return {
         "constraints_created": 0,
         "indexes_created": 0,
+        "schema_statements": 0,
         "shared_attribute_nodes": 0,
         "demographic_nodes": 0,
         "geographic_nodes": 0,
         "errors": [],
     }
 
-    # --- Constraints ---
-    print("\n--- Creating constraints (IF NOT EXISTS) ---")
-    with driver.session() as session:
-        for name, cypher in CONSTRAINTS:
-            try:
-                session.run(cypher)
-                summary["constraints_created"] += 1
-                print(f"  [OK] {name}")
-            except Exception as e:
-                msg = f"  [FAIL] {name}: {e}"
-                print(msg)
-                summary["errors"].append(msg)
 
-    # --- Indexes ---
-    print("\n--- Creating indexes (IF NOT EXISTS) ---")
-    with driver.session() as session:
-        for name, cypher in INDEXES:
-            try:
-                session.run(cypher)
-                summary["indexes_created"] += 1
-                print(f"  [OK] {name}")
-            except Exception as e:
-                msg = f"  [FAIL] {name}: {e}"
-                print(msg)
-                summary["errors"].append(msg)
+def parse_schema_definition(kind, cypher):
+    """Extract the comparable definition (type, labels, properties) from DDL."""
+    labels = re.search(r"FOR \(\w+((?::\w+)+)\)", cypher).group(1).strip(":").split(":")
+    target = re.split(r"\b(?:REQUIRE|ON)\b", cypher, maxsplit=1)[1]
+    properties = re.findall(r"\b\w+\.(\w+)", target)
+    if kind == "constraint":
+        types = UNIQUE_CONSTRAINT_TYPES if "IS UNIQUE" in cypher else set()
+    else:
+        types = RANGE_INDEX_TYPES
+    return {"types": types, "labels": labels, "properties": properties}
 
-    # --- Shared attribute nodes ---
-    print("\n--- Merging shared attribute nodes ---")
+
+SCHEMA_STATE_QUERIES = {
+    "constraint": "SHOW CONSTRAINTS YIELD name, type, labelsOrTypes, properties",
+    "index": (
+        "SHOW INDEXES YIELD name, type, labelsOrTypes, properties, "
+        "state, populationPercent, owningConstraint"
+    ),
+}
+
+
+def read_schema_state(driver, trace=None):
+    """Read the existing constraints and indexes with one query each."""
+    state = {"constraint": {}, "index": {}}
     with driver.session() as session:
-        for label, values in SHARED_ATTRIBUTES.items():
-            for value in values:
-                try:
-                    cypher = (
-                        f"MERGE (n:Droom:{label} {{name: $name}}) "
-                        f"ON CREATE SET n.created_at = datetime()"
+        for kind, cypher in SCHEMA_STATE_QUERIES.items():
+            with _span(trace, " ".join(cypher.split()[:2]), cypher) as span:
+                result = session.run(cypher)
+                for record in result:
+                    state[kind][record["name"]] = dict(record)
+                span["summary"] = result.consume()
+    return state
+
+
+def _matches(expected, actual):
+    # Schema objects are reported against the entity label only, so the
+    # :Droom qualifier in our DDL may not appear in labelsOrTypes. The entity
+    # label (last in the DDL) must, or a bare :Droom(brand_id) index would
+    # stand in for every droom_<label>_brand_id index.
+    labels = actual["labelsOrTypes"] or []
+    return (
+        actual["type"] in expected["types"]
+        and expected["labels"][-1] in labels
+        and set(labels) <= set(expected["labels"])
+        and list(actual["properties"] or []) == expected["properties"]
+    )
+
+
+def plan_schema(state):
+    """Diff CONSTRAINTS and INDEXES against the live schema state.
+
+    Each plan entry carries an action:
+      create     — missing; the DDL will be sent
+      exists     — present under the same name with the same definition
+      equivalent — same definition already present under another name
+      drift      — same name, different definition (never altered here)
+    """
+    plan = []
+    for kind, definitions in (("constraint", CONSTRAINTS), ("index", INDEXES)):
+        existing = state[kind]
+        for name, cypher in definitions:
+            expected = parse_schema_definition(kind, cypher)
+            entry = {"kind": kind, "name": name, "cypher": cypher, "detail": ""}
+            if name in existing:
+                actual = existing[name]
+                if _matches(expected, actual):
+                    entry["action"] = "exists"
+                else:
+                    entry["action"] = "drift"
+                    entry["detail"] = (
+                        f"expected {expected['labels']}{expected['properties']}, "
+                        f"found {actual['type']} "
+                        f"{actual['labelsOrTypes']}{actual['properties']}"
                     )
-                    session.run(cypher, name=value)
-                    summary["shared_attribute_nodes"] += 1
-                    print(f"  [OK] :Droom:{label} {{name: '{value}'}}")
-                except Exception as e:
-                    msg = f"  [FAIL] :Droom:{label} {{name: '{value}'}}: {e}"
+            else:
+                twin = next(
+                    (other for other, actual in existing.items()
+                     if _matches(expected, actual)
+                     and not actual.get("owningConstraint")),
+                    None,
+                )
+                if twin:
+                    entry["action"] = "equivalent"
+                    entry["detail"] = f"satisfied by '{twin}'"
+                else:
+                    entry["action"] = "create"
+            plan.append(entry)
+    return plan
+
+
+def print_plan(plan):
+    """Print the schema diff, one line per constraint/index."""
+    print("\n--- Schema plan ---")
+    for entry in plan:
+        line = f"  [{entry['action'].upper()}] {entry['kind']} {entry['name']}"
+        if entry["detail"]:
+            line += f" ({entry['detail']})"
+        print(line)
+    pending = sum(1 for entry in plan if entry["action"] == "create")
+    drifted = sum(1 for entry in plan if entry["action"] == "drift")
+    print(f"\n  {pending} statement(s) to send, {drifted} drifted, "
+          f"{len(plan) - pending - drifted} already satisfied")
+
+
+def wait_for_indexes(driver, names, summary, timeout=INDEX_ONLINE_TIMEOUT):
+    """Block until the named indexes (and constraint-backing indexes) are ONLINE.
+
+    Seeding MERGEs against a POPULATING index fall back to label scans, so
+    this runs between DDL and seeding. Progress is printed on each poll.
+    """
+    if not names:
+        return
+    print(f"\n--- Waiting for {len(names)} new schema object(s) to come ONLINE ---")
+    deadline = time.monotonic() + timeout
+    pending = set(names)
+    with driver.session() as session:
+        while pending:
+            records = list(session.run(
+                "SHOW INDEXES YIELD name, state, populationPercent, owningConstraint "
+                "WHERE name IN $names OR owningConstraint IN $names "
+                "RETURN name, state, populationPercent, owningConstraint",
+                names=sorted(pending),
+            ))
+            for record in records:
+                owner = record["owningConstraint"] or record["name"]
+                if record["state"] == "ONLINE":
+                    if owner in pending:
+                        pending.discard(owner)
+                        print(f"  [OK] {owner} ONLINE")
+                elif record["state"] == "FAILED":
+                    pending.discard(owner)
+                    msg = f"  [FAIL] {owner}: index population FAILED"
                     print(msg)
                     summary["errors"].append(msg)
+                else:
+                    print(f"  [..] {owner} {record['state']} "
+                          f"{record['populationPercent'] or 0:.1f}%")
+            if not pending:
+                break
+            if time.monotonic() > deadline:
+                for name in sorted(pending):
+                    msg = f"  [FAIL] {name}: not ONLINE after {timeout}s"
+                    print(msg)
+                    summary["errors"].append(msg)
+                break
+            time.sleep(INDEX_POLL_INTERVAL)
 
-    # --- Client-specific demographic nodes ---
-    print("\n--- Merging demographic nodes ---")
-    with driver.session() as session:
-        for demo in DEMOGRAPHICS:
-            try:
-                cypher = (
-                    "MERGE (n:Droom:Demographic {id: $id}) "
-                    "ON CREATE SET "
-                    "  n.brand_id = $brand_id, "
-                    "  n.name = $name, "
-                    "  n.display_name = $display_name, "
-                    "  n.age_range = $age_range, "
-                    "  n.gender = $gender, "
-                    "  n.description = $description, "
-                    "  n.created_at = datetime() "
-                    "ON MATCH SET "
-                    "  n.display_name = $display_name, "
-                    "  n.age_range = $age_range, "
-                    "  n.gender = $gender, "
-                    "  n.description = $description"
-                )
-                session.run(cypher, **demo)
-                summary["demographic_nodes"] += 1
-                print(f"  [OK] :Droom:Demographic {{name: '{demo['name']}'}}")
-            except Exception as e:
-                msg = f"  [FAIL] :Droom:Demographic {{name: '{demo['name']}'}}: {e}"
-                print(msg)
-                summary["errors"].append(msg)
 
-    # --- Client-specific geographic nodes ---
-    print("\n--- Merging geographic nodes ---")
+def create_schema(driver, summary, plan=None, trace=None):
+    """Send only the constraint/index DDL that is actually missing.
+
+    Reads the live schema once, prints the diff, executes the `create`
+    entries and waits for the new objects to come ONLINE. Drifted
+    definitions are reported as errors but never altered. DDL is never
+    profiled; it is only timed into `trace`.
+    """
+    if plan is None:
+        plan = plan_schema(read_schema_state(driver, trace=trace))
+    print_plan(plan)
+
+    counters = {"constraint": "constraints_created", "index": "indexes_created"}
+    created = []
+    print("\n--- Creating missing constraints and indexes ---")
     with driver.session() as session:
-        for geo in GEOGRAPHIC_ZONES:
+        for entry in plan:
+            name = entry["name"]
+            if entry["action"] in ("exists", "equivalent"):
+                summary[counters[entry["kind"]]] += 1
+                continue
+            if entry["action"] == "drift":
+                msg = f"  [DRIFT] {entry['kind']} {name}: {entry['detail']}"
+                summary["errors"].append(msg)
+                continue
             try:
-                cypher = (
-                    "MERGE (n:Droom:Geographic {id: $id}) "
-                    "ON CREATE SET "
-                    "  n.brand_id = $brand_id, "
-                    "  n.name = $name, "
-                    "  n.radius_miles = $radius_miles, "
-                    "  n.budget_weight = $budget_weight, "
-                    "  n.center_lat = $center_lat, "
-                    "  n.center_lng = $center_lng, "
-                    "  n.center_address = $center_address, "
-                    "  n.areas = $areas, "
-                    "  n.created_at = datetime() "
-                    "ON MATCH SET "
-                    "  n.radius_miles = $radius_miles, "
-                    "  n.budget_weight = $budget_weight, "
-                    "  n.areas = $areas"
-                )
-                session.run(cypher, **geo)
-                summary["geographic_nodes"] += 1
-                print(f"  [OK] :Droom:Geographic {{name: '{geo['name']}'}}")
+                with _span(trace, f"CREATE {entry['kind'].upper()} {name}",
+                           entry["cypher"]) as span:
+                    span["summary"] = session.run(entry["cypher"]).consume()
+                summary[counters[entry["kind"]]] += 1
+                summary["schema_statements"] += 1
+                created.append(name)
+                print(f"  [OK] {name}")
             except Exception as e:
-                msg = f"  [FAIL] :Droom:Geographic {{name: '{geo['name']}'}}: {e}"
+                msg = f"  [FAIL] {name}: {e}"
                 print(msg)
                 summary["errors"].append(msg)
-
+    if not created:
+        print("  (nothing to create)")
+
+    wait_for_indexes(driver, created, summary)
+
+
+def seed_shared_attributes(driver, summary, batch_size=SEED_BATCH_SIZE, trace=None):
+    """MERGE the shared attribute nodes used by every Droom client."""
+    print(f"\n--- Merging shared attribute nodes (batch size {batch_size}) ---")
+    for label, values in SHARED_ATTRIBUTES.items():
+        summary["shared_attribute_nodes"] += seed_rows(
+            driver,
+            SHARED_ATTRIBUTE_MERGE.format(label=label),
+            [{"name": value} for value in values],
+            key="name",
+            describe=lambda row, label=label: f":Droom:{label} {{name: '{row['name']}'}}",
+            errors=summary["errors"],
+            batch_size=batch_size,
+            trace=trace,
+        )
+
+
+def seed_client_nodes(
+    driver,
+    summary,
+    demographics=DEMOGRAPHICS,
+    geographic_zones=GEOGRAPHIC_ZONES,
+    batch_size=SEED_BATCH_SIZE,
+    echo=True,
+    trace=None,
+):
+    """MERGE one client's demographic and geographic nodes.
+
+    Pass `echo=False` to suppress the per-row lines (failures are still
+    collected in `summary["errors"]`), e.g. when seeding several clients
+    concurrently.
+    """
+    if echo:
+        print(f"\n--- Merging demographic nodes (batch size {batch_size}) ---")
+    summary["demographic_nodes"] += seed_rows(
+        driver,
+        DEMOGRAPHIC_MERGE,
+        demographics,
+        key="id",
+        describe=lambda row: f":Droom:Demographic {{name: '{row['name']}'}}",
+        errors=summary["errors"],
+        batch_size=batch_size,
+        echo=echo,
+        trace=trace,
+    )
+
+    if echo:
+        print(f"\n--- Merging geographic nodes (batch size {batch_size}) ---")
+    summary["geographic_nodes"] += seed_rows(
+        driver,
+        GEOGRAPHIC_MERGE,
+        geographic_zones,
+        key="id",
+        describe=lambda row: f":Droom:Geographic {{name: '{row['name']}'}}",
+        errors=summary["errors"],
+        batch_size=batch_size,
+        echo=echo,
+        trace=trace,
+    )
+
+
+def run_queries(driver, batch_size=SEED_BATCH_SIZE, trace=None):
+    """Execute all schema and seed data queries, recording spans in `trace`."""
+    summary = new_summary()
+    create_schema(driver, summary, trace=trace)
+    seed_shared_attributes(driver, summary, batch_size=batch_size, trace=trace)
+    seed_client_nodes(driver, summary, batch_size=batch_size, trace=trace)
     return summary
 
 
-def main():
-    print("=" * 64)
-    print("Droom Marketing Factory - Neo4j Schema Initialization")
-    print(f"Client: {BRAND_NAME} ({BRAND_ID})")
-    print(f"Business model: {BUSINESS_MODEL}")
-    print(f"  -> Lead/WebsiteForm nodes: ENABLED")
-    print(f"  -> Customer/Purchase nodes: SKIPPED (not e-commerce)")
-    print(f"Target: {NEO4J_URI}")
-    print("=" * 64)
+def brand_predicate(alias, brand_id):
+    """Cypher predicate scoping `alias` to one brand, or `true` for all (None).
+
+    Queries fill a {brand} placeholder with this rather than testing
+    `$brand_id IS NULL OR alias.brand_id = $brand_id`, which the planner
+    cannot turn into a brand_id index seek.
+    """
+    return "true" if brand_id is None else f"{alias}.brand_id = $brand_id"
+
+
+def require_env():
+    """Exit with instructions if the NEO4J_* connection variables are unset."""
+    if not all([NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD]):
+        print("ERROR: Missing required environment variables.")
+        print("  Set NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD in your environment")
+        print(f"  or in {_env_path}")
+        sys.exit(1)
 
+
+def connect(**driver_options):
+    """Open and verify a driver from the NEO4J_* environment, or exit."""
+    require_env()
     try:
-        driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+        driver = GraphDatabase.driver(
+            NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD), **driver_options
+        )
         driver.verify_connectivity()
         print("\nConnected to Neo4j successfully.")
     except AuthError:
@@ -417,11 +896,68 @@ def main():
     except Exception as e:
         print(f"\nERROR: Failed to connect to Neo4j: {e}")
         sys.exit(1)
+    return driver
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Initialize the Droom Neo4j schema.")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=SEED_BATCH_SIZE,
+        help=f"Rows per UNWIND write transaction (default {SEED_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Print the constraint/index diff and exit without changes",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Run seed statements under PROFILE to record db hits and plan operators",
+    )
+    parser.add_argument(
+        "--trace",
+        type=Path,
+        metavar="PATH",
+        help="Write per-statement spans as OpenTelemetry JSON to PATH",
+    )
+    args = parser.parse_args()
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    return args
+
+
+def main():
+    args = parse_args()
+    require_env()
+
+    print("=" * 64)
+    print("Droom Marketing Factory - Neo4j Schema Initialization")
+    print(f"Client: {BRAND_NAME} ({BRAND_ID})")
+    print(f"Business model: {BUSINESS_MODEL}")
+    print(f"  -> Lead/WebsiteForm nodes: ENABLED")
+    print(f"  -> Customer/Purchase nodes: SKIPPED (not e-commerce)")
+    print(f"Target: {NEO4J_URI}")
+    print("=" * 64)
+
+    driver = connect()
+
+    if args.plan:
+        try:
+            print_plan(plan_schema(read_schema_state(driver)))
+        finally:
+            driver.close()
+        return
 
+    trace = QueryTrace(profile=args.profile)
     try:
-        summary = run_queries(driver)
+        summary = run_queries(driver, batch_size=args.batch_size, trace=trace)
     finally:
         driver.close()
+        if args.trace:
+            trace.write(args.trace)
 
     # --- Print summary ---
     print("\n" + "=" * 64)
@@ -429,9 +965,13 @@ def main():
     print("=" * 64)
     print(f"  Constraints created/verified: {summary['constraints_created']}")
     print(f"  Indexes created/verified:     {summary['indexes_created']}")
+    print(f"  Schema DDL statements sent:   {summary['schema_statements']}")
     print(f"  Shared attribute nodes:       {summary['shared_attribute_nodes']}")
     print(f"  Demographic nodes:            {summary['demographic_nodes']}")
     print(f"  Geographic nodes:             {summary['geographic_nodes']}")
+    trace.print_slowest()
+    if args.trace:
+        print(f"\n  Trace written to {args.trace}")
 
     if summary["errors"]:
         print(f"\n  ERRORS ({len(summary['errors'])}):")
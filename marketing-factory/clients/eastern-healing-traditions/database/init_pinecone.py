@@ -14,6 +14,8 @@ Requires:
 
 Environment variables (loaded from ../../.env or set directly):
     PINECONE_API_KEY
+    DROOM_VECTOR_STORE=local (optional; verify the local_vector_store.py
+        stand-in instead of the live index, no API key needed)
 """
 
 import os
@@ -22,13 +24,6 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 
-try:
-    from pinecone import Pinecone
-except ImportError:
-    print("ERROR: pinecone-client is not installed.")
-    print("  Run: pip install pinecone-client")
-    sys.exit(1)
-
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
@@ -40,44 +35,50 @@ EXPECTED_DIMENSIONS = 1536
 EXPECTED_METRIC = "cosine"
 EMBEDDING_MODEL = "text-embedding-3-small"
 
+
+def client_namespaces(brand_id):
+    """Namespaces a client uses (created implicitly on first upsert)."""
+    return [
+        {
+            "name": f"droom-content-essence-{brand_id}",
+            "description": (
+                "Semantic profiles of creative assets (videos/images). "
+                "Embedded from Claude Vision's 150-200 word narrative "
+                "descriptions. Used for similarity search: 'find content "
+                "similar to this,' 'what unused content matches this campaign?'"
+            ),
+        },
+        {
+            "name": f"droom-scenario-outcomes-{brand_id}",
+            "description": (
+                "Historical campaign situations and outcomes. Embedded from "
+                "rich scenario descriptions (content type, tones, demographics, "
+                "platform, budget, outcome metrics). Used for: 'what happened "
+                "in a situation like this?'"
+            ),
+        },
+        {
+            "name": f"droom-audience-psychographics-{brand_id}",
+            "description": (
+                "Behavioral patterns and audience insights. Embedded from "
+                "Cultural Anthropologist agent observations. Used for: "
+                "'why does this audience behave this way?' 'what messaging "
+                "themes resonate?'"
+            ),
+        },
+        {
+            "name": f"droom-narrative-patterns-{brand_id}",
+            "description": (
+                "Storytelling approaches and content strategies. Embedded from "
+                "Creative Intelligence agent analysis. Used for: 'what "
+                "narrative styles have worked?' 'what creative gaps exist?'"
+            ),
+        },
+    ]
+
+
 # Namespaces this client will use (created implicitly on first upsert).
-CLIENT_NAMESPACES = [
-    {
-        "name": f"droom-content-essence-{BRAND_ID}",
-        "description": (
-            "Semantic profiles of creative assets (videos/images). "
-            "Embedded from Claude Vision's 150-200 word narrative "
-            "descriptions. Used for similarity search: 'find content "
-            "similar to this,' 'what unused content matches this campaign?'"
-        ),
-    },
-    {
-        "name": f"droom-scenario-outcomes-{BRAND_ID}",
-        "description": (
-            "Historical campaign situations and outcomes. Embedded from "
-            "rich scenario descriptions (content type, tones, demographics, "
-            "platform, budget, outcome metrics). Used for: 'what happened "
-            "in a situation like this?'"
-        ),
-    },
-    {
-        "name": f"droom-audience-psychographics-{BRAND_ID}",
-        "description": (
-            "Behavioral patterns and audience insights. Embedded from "
-            "Cultural Anthropologist agent observations. Used for: "
-            "'why does this audience behave this way?' 'what messaging "
-            "themes resonate?'"
-        ),
-    },
-    {
-        "name": f"droom-narrative-patterns-{BRAND_ID}",
-        "description": (
-            "Storytelling approaches and content strategies. Embedded from "
-            "Creative Intelligence agent analysis. Used for: 'what "
-            "narrative styles have worked?' 'what creative gaps exist?'"
-        ),
-    },
-]
+CLIENT_NAMESPACES = client_namespaces(BRAND_ID)
 
 SHARED_NAMESPACE = {
     "name": "droom-cross-campaign-learnings",
@@ -96,21 +97,41 @@ load_dotenv(dotenv_path=_env_path)
 
 PINECONE_API_KEY = os.environ.get("PINECONE_API_KEY")
 
-if not PINECONE_API_KEY:
-    print("ERROR: PINECONE_API_KEY environment variable is not set.")
-    print(f"  Set it in your environment or in {_env_path}")
-    sys.exit(1)
+# DROOM_VECTOR_STORE=local swaps in the NumPy stand-in (local_vector_store.py).
+LOCAL_VECTOR_STORE = os.environ.get("DROOM_VECTOR_STORE", "").lower() == "local"
+
+if LOCAL_VECTOR_STORE:
+    from local_vector_store import LocalPinecone as Pinecone
+else:
+    try:
+        from pinecone import Pinecone
+    except ImportError:
+        print("ERROR: pinecone-client is not installed.")
+        print("  Run: pip install pinecone-client")
+        sys.exit(1)
 
 # ---------------------------------------------------------------------------
 # Verification
 # ---------------------------------------------------------------------------
 
 
+def require_env():
+    """Exit with instructions if PINECONE_API_KEY is unset (live index only)."""
+    if not PINECONE_API_KEY and not LOCAL_VECTOR_STORE:
+        print("ERROR: PINECONE_API_KEY environment variable is not set.")
+        print(f"  Set it in your environment or in {_env_path}")
+        sys.exit(1)
+
+
 def main():
+    require_env()
+
     print("=" * 64)
     print("Droom Marketing Factory - Pinecone Index Verification")
     print(f"Client: {BRAND_NAME} ({BRAND_ID})")
     print(f"Target index: {INDEX_NAME}")
+    if LOCAL_VECTOR_STORE:
+        print("Backend: local stand-in (DROOM_VECTOR_STORE=local)")
     print(f"Expected dimensions: {EXPECTED_DIMENSIONS}")
     print(f"Embedding model: {EMBEDDING_MODEL}")
     print("=" * 64)
@@ -0,0 +1,211 @@
+"""
+Incremental Learning Weights for Eastern Healing Traditions
+Droom Marketing Factory
+
+Maintains the learned demographic weights
+
+    (Demographic)-[:RESPONDS_TO {avg_roas, sample_size, roas_variance}]->(Tone)
+    (Demographic)-[:PREFERS_AESTHETIC {avg_roas, sample_size, roas_variance}]->(Aesthetic)
+
+from one day of :Droom:Performance data at a time instead of recomputing
+them from the full history. An observation is one campaign-day ROAS for a
+campaign TARGETED at the demographic whose content has the tone/aesthetic.
+The day's observations are reduced to (count, mean, M2) per pair and
+merged into the stored running statistics with the parallel form of
+Welford's algorithm, in one UNWIND write per relationship type, so nightly
+cost grows with new data only.
+
+Each relationship records the last day applied (`applied_through`); a day
+at or before it is skipped, so re-running a night is harmless and days
+must be applied in order (use --since to catch up).
+
+Usage:
+    python learning_weights.py                       # yesterday
+    python learning_weights.py --date 2026-03-01
+    python learning_weights.py --since 2026-02-01    # catch up day by day
+    python learning_weights.py --all-brands
+
+Requires:
+    pip install neo4j numpy python-dotenv
+
+Environment variables (loaded from ../../.env or set directly):
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+"""
+
+import argparse
+import datetime as dt
+import sys
+import time
+
+import numpy as np
+
+from init_neo4j import BRAND_ID, NEO4J_URI, brand_predicate, connect, require_env
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Learned relationship -> (attribute label, content relationship).
+LEARNED_RELATIONSHIPS = {
+    "RESPONDS_TO": ("Tone", "HAS_TONE"),
+    "PREFERS_AESTHETIC": ("Aesthetic", "HAS_AESTHETIC"),
+}
+
+# A campaign-day counts once per pair even if several of its content items
+# share the attribute.
+OBSERVATION_QUERY = (
+    "MATCH (camp:Droom:Campaign)-[:ACHIEVED]->(p:Droom:Performance) "
+    "WHERE p.date = date($date) AND p.roas IS NOT NULL "
+    "  AND {brand} "
+    "MATCH (camp)-[:TARGETED]->(d:Droom:Demographic) "
+    "MATCH (c:Droom:Content)-[:RAN_IN]->(camp) "
+    "MATCH (c)-[:{content_rel}]->(a:Droom:{label}) "
+    "WITH DISTINCT d, a, p "
+    "RETURN d.id AS demographic_id, a.name AS name, collect(p.roas) AS values"
+)
+
+# Chan et al. pairwise merge of (n, mean, M2) with the stored statistics;
+# stored M2 is recovered from the variance as variance * (n - 1).
+WEIGHT_MERGE = (
+    "UNWIND $rows AS row "
+    "MATCH (d:Droom:Demographic {{id: row.demographic_id}}) "
+    "MATCH (a:Droom:{label} {{name: row.name}}) "
+    "MERGE (d)-[r:{rel}]->(a) "
+    "WITH r, row WHERE r.applied_through IS NULL OR r.applied_through < date(row.date) "
+    "WITH r, row, "
+    "  toFloat(coalesce(r.sample_size, 0)) AS n_a, "
+    "  coalesce(r.avg_roas, 0.0) AS mean_a, "
+    "  coalesce(r.roas_variance, 0.0) * (coalesce(r.sample_size, 1) - 1) AS m2_a "
+    "WITH r, row, n_a, mean_a, m2_a, n_a + row.n AS n, row.mean - mean_a AS delta "
+    "WITH r, row, n, mean_a + delta * row.n / n AS mean, "
+    "  m2_a + row.m2 + delta * delta * n_a * row.n / n AS m2 "
+    "SET r.sample_size = toInteger(n), "
+    "  r.avg_roas = mean, "
+    "  r.roas_variance = CASE WHEN n > 1 THEN m2 / (n - 1) ELSE 0.0 END, "
+    "  r.applied_through = date(row.date), "
+    "  r.updated_at = datetime() "
+    "RETURN count(r) AS applied"
+)
+
+# ---------------------------------------------------------------------------
+# Execution
+# ---------------------------------------------------------------------------
+
+
+def day_deltas(observations, date):
+    """Reduce one day's observations to (n, mean, M2) rows per pair."""
+    rows = []
+    for obs in observations:
+        values = np.asarray(obs["values"], dtype=float)
+        if values.size == 0:
+            continue
+        mean = values.mean()
+        rows.append({
+            "demographic_id": obs["demographic_id"],
+            "name": obs["name"],
+            "date": date.isoformat(),
+            "n": float(values.size),
+            "mean": float(mean),
+            "m2": float(((values - mean) ** 2).sum()),
+        })
+    return rows
+
+
+def _apply(tx, cypher, rows):
+    return tx.run(cypher, rows=rows).single()["applied"]
+
+
+def apply_day(driver, date, brand_id=BRAND_ID):
+    """Fold one day into every learned relationship type.
+
+    Returns {rel: (pairs_in_day, pairs_applied, observations)}.
+    """
+    results = {}
+    with driver.session() as session:
+        for rel, (label, content_rel) in LEARNED_RELATIONSHIPS.items():
+            observations = session.run(
+                OBSERVATION_QUERY.format(content_rel=content_rel, label=label,
+                                         brand=brand_predicate("camp", brand_id)),
+                date=date.isoformat(),
+                brand_id=brand_id,
+            ).data()
+            rows = day_deltas(observations, date)
+            applied = 0
+            if rows:
+                applied = session.execute_write(
+                    _apply, WEIGHT_MERGE.format(label=label, rel=rel), rows
+                )
+            results[rel] = (len(rows), applied, int(sum(row["n"] for row in rows)))
+    return results
+
+
+def parse_args():
+    yesterday = dt.date.today() - dt.timedelta(days=1)
+    parser = argparse.ArgumentParser(description="Apply daily deltas to learned weights.")
+    parser.add_argument("--date", type=dt.date.fromisoformat, default=yesterday,
+                        help="Day to apply (default yesterday)")
+    parser.add_argument("--since", type=dt.date.fromisoformat,
+                        help="Apply every day from this date through --date, in order")
+    parser.add_argument("--brand", default=BRAND_ID, help=f"Brand (default {BRAND_ID})")
+    parser.add_argument("--all-brands", action="store_true", help="Update every Droom brand")
+    args = parser.parse_args()
+    if args.since and args.since > args.date:
+        parser.error("--since must not be after --date")
+    return args
+
+
+def main():
+    args = parse_args()
+    require_env()
+    brand_id = None if args.all_brands else args.brand
+    first = args.since or args.date
+    days = [first + dt.timedelta(days=i) for i in range((args.date - first).days + 1)]
+
+    print("=" * 64)
+    print("Droom Marketing Factory - Learning Weight Update")
+    print(f"Brand: {brand_id or 'all brands'}")
+    print(f"Days: {days[0]} .. {days[-1]} ({len(days)})")
+    print(f"Target: {NEO4J_URI}")
+    print("=" * 64)
+
+    driver = connect()
+    totals = {rel: [0, 0, 0] for rel in LEARNED_RELATIONSHIPS}
+    errors = []
+    started = time.perf_counter()
+    try:
+        for day in days:
+            try:
+                results = apply_day(driver, day, brand_id)
+            except Exception as e:
+                msg = f"  [FAIL] {day}: {e}"
+                print(msg)
+                errors.append(msg)
+                # Later days would be folded in ahead of this one.
+                break
+            parts = []
+            for rel, (pairs, applied, observations) in results.items():
+                totals[rel][0] += pairs
+                totals[rel][1] += applied
+                totals[rel][2] += observations
+                parts.append(f"{rel} {applied}/{pairs}")
+            print(f"  [OK] {day}: " + ", ".join(parts))
+    finally:
+        driver.close()
+
+    print("\n" + "=" * 64)
+    print("LEARNING SUMMARY")
+    print("=" * 64)
+    for rel, (pairs, applied, observations) in totals.items():
+        print(f"  {rel + ':':<20} {applied} pair updates from {observations} observations"
+              f" ({pairs - applied} already applied)")
+    print(f"  Elapsed:             {time.perf_counter() - started:.1f}s")
+
+    if errors:
+        print(f"\n  ERRORS ({len(errors)}):")
+        for err in errors:
+            print(f"    {err}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
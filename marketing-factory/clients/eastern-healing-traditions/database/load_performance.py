@@ -0,0 +1,382 @@
+"""
+Daily Performance Loader for Eastern Healing Traditions
+Droom Marketing Factory
+
+Bulk-loads ad-platform exports (CSV or JSONL, Google Ads or Meta column
+names) into :Droom:Performance nodes linked to their campaigns with
+(Campaign)-[:ACHIEVED]->(Performance).
+
+All files are read into NumPy columns first: rows for the same campaign
+and day are summed (exports often split a campaign by ad group or ad set),
+then ctr, cpm, cpc, roas, conversion_rate and cost_per_conversion are
+computed for every row at once. Rows are written in date-partitioned
+UNWIND batches (one write transaction per batch, never mixing partitions),
+so a year of history for a client is a few hundred round trips. Ids are
+`{brand_id}--{campaign_id}--{date}`, so reloading a file updates in place.
+
+Undefined ratios (e.g. cpc with zero clicks) are left unset. Rows whose
+campaign has no :Droom:Campaign node are still written and reported as
+unlinked.
+
+Usage:
+    python load_performance.py exports/google-2025.csv exports/meta-2025.csv
+    python load_performance.py exports/*.jsonl --partition day --batch-size 2000
+    python load_performance.py exports/google-2025.csv --dry-run
+
+Requires:
+    pip install neo4j numpy python-dotenv
+
+Environment variables (loaded from ../../.env or set directly):
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+    NEO4J_PERFORMANCE_BATCH_SIZE (optional, default 1000)
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from init_neo4j import BRAND_ID, NEO4J_URI, connect, require_env
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Performance rows per write transaction.
+PERFORMANCE_BATCH_SIZE = int(os.environ.get("NEO4J_PERFORMANCE_BATCH_SIZE", "1000"))
+
+# Normalized export header -> Performance field. Headers are lowercased and
+# stripped of punctuation before lookup, so "Impr." matches "impr".
+COLUMN_ALIASES = {
+    "campaign_id": "campaign_id",
+    "campaign id": "campaign_id",
+    "date": "date",
+    "day": "date",
+    "reporting starts": "date",
+    "impressions": "impressions",
+    "impr": "impressions",
+    "clicks": "clicks",
+    "link clicks": "clicks",
+    "conversions": "conversions",
+    "conv": "conversions",
+    "results": "conversions",
+    "spend": "spend",
+    "cost": "spend",
+    "amount spent usd": "spend",
+    "revenue": "revenue",
+    "conv value": "revenue",
+    "conversion value": "revenue",
+    "purchase conversion value": "revenue",
+}
+
+COUNT_FIELDS = ["impressions", "clicks", "conversions"]
+MONEY_FIELDS = ["spend", "revenue"]
+DERIVED_FIELDS = ["ctr", "cpm", "cpc", "roas", "conversion_rate", "cost_per_conversion"]
+
+PERFORMANCE_MERGE = (
+    "UNWIND $rows AS row "
+    "MERGE (p:Droom:Performance {id: row.id}) "
+    "ON CREATE SET p.brand_id = row.brand_id, p.created_at = datetime() "
+    "SET "
+    "  p.date = date(row.date), "
+    "  p.campaign_id = row.campaign_id, "
+    "  p.impressions = row.impressions, "
+    "  p.clicks = row.clicks, "
+    "  p.conversions = row.conversions, "
+    "  p.spend = row.spend, "
+    "  p.revenue = row.revenue, "
+    "  p.ctr = row.ctr, "
+    "  p.cpm = row.cpm, "
+    "  p.cpc = row.cpc, "
+    "  p.roas = row.roas, "
+    "  p.conversion_rate = row.conversion_rate, "
+    "  p.cost_per_conversion = row.cost_per_conversion, "
+    "  p.updated_at = datetime() "
+    "WITH p, row "
+    "OPTIONAL MATCH (c:Droom:Campaign {id: row.campaign_id, brand_id: row.brand_id}) "
+    "FOREACH (_ IN CASE WHEN c IS NULL THEN [] ELSE [1] END | "
+    "  MERGE (c)-[:ACHIEVED]->(p)) "
+    "RETURN row.id AS id, c IS NOT NULL AS linked"
+)
+
+# ---------------------------------------------------------------------------
+# Reading exports
+# ---------------------------------------------------------------------------
+
+
+def _normalize_header(header):
+    return re.sub(r"[^a-z0-9_ ]", "", header.strip().lower()).strip()
+
+
+def _number(value):
+    """Parse export numbers such as "1,234.50", "$12.00" or "--"."""
+    if value is None or isinstance(value, (int, float)):
+        return value or 0
+    cleaned = value.replace(",", "").replace("$", "").strip()
+    if cleaned in ("", "-", "--"):
+        return 0
+    return float(cleaned)
+
+
+def _date(value):
+    """ISO date (YYYY-MM-DD) from an export date or datetime string."""
+    value = str(value).strip()
+    match = re.match(r"(\d{4})-(\d{2})-(\d{2})", value)
+    if match:
+        return match.group(0)
+    match = re.match(r"(\d{1,2})/(\d{1,2})/(\d{4})", value)
+    if not match:
+        raise ValueError(f"unrecognized date {value!r} (expected YYYY-MM-DD or M/D/YYYY)")
+    month, day, year = match.groups()
+    return f"{year}-{int(month):02d}-{int(day):02d}"
+
+
+def read_export(path):
+    """Yield (line number, row) with Performance field names from a CSV or JSONL export."""
+    with open(path, newline="") as f:
+        if Path(path).suffix == ".jsonl":
+            records = ((n, json.loads(line)) for n, line in enumerate(f, 1) if line.strip())
+        else:
+            reader = csv.DictReader(f)
+            records = ((reader.line_num, record) for record in reader)
+        for line, record in records:
+            row = {}
+            for header, value in record.items():
+                field = COLUMN_ALIASES.get(_normalize_header(header or ""))
+                if field:
+                    row[field] = value
+            if row.get("campaign_id") and row.get("date"):
+                yield line, row
+
+
+def load_columns(paths):
+    """Read every export into NumPy columns, one element per input row.
+
+    Raises ValueError naming the file and line of an unparseable date or number.
+    """
+    campaign_ids, dates = [], []
+    values = {field: [] for field in COUNT_FIELDS + MONEY_FIELDS}
+    for path in paths:
+        for line, row in read_export(path):
+            try:
+                date = _date(row["date"])
+                numbers = [_number(row.get(field)) for field in values]
+            except ValueError as e:
+                raise ValueError(f"{path} line {line}: {e}") from None
+            campaign_ids.append(str(row["campaign_id"]).strip())
+            dates.append(date)
+            for field, number in zip(values, numbers):
+                values[field].append(number)
+    columns = {field: np.asarray(data, dtype=np.float64) for field, data in values.items()}
+    columns["campaign_id"] = np.asarray(campaign_ids, dtype=object)
+    columns["date"] = np.asarray(dates, dtype="datetime64[D]")
+    return columns
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+
+def aggregate_daily(columns):
+    """Sum rows sharing (campaign_id, date); output is sorted by date."""
+    n = len(columns["date"])
+    if n == 0:
+        return columns
+    campaigns, campaign_index = np.unique(columns["campaign_id"].astype(str), return_inverse=True)
+    day_numbers = columns["date"].astype(np.int64)
+    keys = day_numbers * len(campaigns) + campaign_index
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+
+    daily = {
+        field: np.bincount(inverse, weights=columns[field], minlength=len(unique_keys))
+        for field in COUNT_FIELDS + MONEY_FIELDS
+    }
+    daily["campaign_id"] = campaigns[unique_keys % len(campaigns)].astype(object)
+    daily["date"] = (unique_keys // len(campaigns)).astype("datetime64[D]")
+    return daily
+
+
+def _ratio(numerator, denominator, scale=1.0):
+    out = np.full(numerator.shape, np.nan)
+    np.divide(numerator * scale, denominator, out=out, where=denominator > 0)
+    return out
+
+
+def derive_metrics(daily):
+    """Add the derived rate/cost columns (decimals and USD, per the spec)."""
+    daily["ctr"] = _ratio(daily["clicks"], daily["impressions"])
+    daily["cpm"] = _ratio(daily["spend"], daily["impressions"], scale=1000.0)
+    daily["cpc"] = _ratio(daily["spend"], daily["clicks"])
+    daily["roas"] = _ratio(daily["revenue"], daily["spend"])
+    daily["conversion_rate"] = _ratio(daily["conversions"], daily["clicks"])
+    daily["cost_per_conversion"] = _ratio(daily["spend"], daily["conversions"])
+    return daily
+
+
+def performance_rows(daily, brand_id=BRAND_ID):
+    """Convert columns into UNWIND rows (NaN ratios become null)."""
+    rows = []
+    dates = daily["date"].astype(str).tolist()
+    rounded = {field: np.round(daily[field], 6) for field in DERIVED_FIELDS}
+    for i in range(len(dates)):
+        row = {
+            "id": f"{brand_id}--{daily['campaign_id'][i]}--{dates[i]}",
+            "brand_id": brand_id,
+            "campaign_id": daily["campaign_id"][i],
+            "date": dates[i],
+        }
+        for field in COUNT_FIELDS:
+            row[field] = int(round(daily[field][i]))
+        for field in MONEY_FIELDS:
+            row[field] = round(float(daily[field][i]), 2)
+        for field in DERIVED_FIELDS:
+            value = rounded[field][i]
+            row[field] = None if np.isnan(value) else float(value)
+        rows.append(row)
+    return rows
+
+
+def partition_rows(rows, partition="month"):
+    """Group date-sorted rows by day ("YYYY-MM-DD") or month ("YYYY-MM")."""
+    width = 10 if partition == "day" else 7
+    partitions = {}
+    for row in rows:
+        partitions.setdefault(row["date"][:width], []).append(row)
+    return partitions
+
+
+# ---------------------------------------------------------------------------
+# Execution
+# ---------------------------------------------------------------------------
+
+
+def _write_batch(tx, rows):
+    return {record["id"]: record["linked"] for record in tx.run(PERFORMANCE_MERGE, rows=rows)}
+
+
+def load_performance(driver, rows, partition="month", batch_size=PERFORMANCE_BATCH_SIZE):
+    """Write rows partition by partition. Returns a summary dict."""
+    summary = {"performance_nodes": 0, "linked": 0, "unlinked_campaigns": set(),
+               "partitions": 0, "errors": []}
+    with driver.session() as session:
+        for key, part in partition_rows(rows, partition).items():
+            written = {}
+            for start in range(0, len(part), batch_size):
+                batch = part[start:start + batch_size]
+                try:
+                    written.update(session.execute_write(_write_batch, batch))
+                except Exception as e:
+                    msg = f"  [FAIL] {key} rows {start + 1}-{start + len(batch)}: {e}"
+                    print(msg)
+                    summary["errors"].append(msg)
+            linked = sum(written.values())
+            for row in part:
+                if row["id"] in written and not written[row["id"]]:
+                    summary["unlinked_campaigns"].add(row["campaign_id"])
+            summary["performance_nodes"] += len(written)
+            summary["linked"] += linked
+            summary["partitions"] += 1
+            status = "OK" if len(written) == len(part) else "FAIL"
+            print(f"  [{status}] {key}: {len(written)}/{len(part)} rows, {linked} linked")
+    return summary
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bulk-load daily Performance nodes.")
+    parser.add_argument("exports", nargs="+", type=Path, help="CSV or JSONL export files")
+    parser.add_argument(
+        "--partition",
+        choices=["day", "month"],
+        default="month",
+        help="Date partition written per group of transactions (default month)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=PERFORMANCE_BATCH_SIZE,
+        help=f"Rows per UNWIND write transaction (default {PERFORMANCE_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Parse and compute metrics without writing to Neo4j",
+    )
+    args = parser.parse_args()
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    return args
+
+
+def main():
+    args = parse_args()
+    if not args.dry_run:
+        require_env()
+
+    print("=" * 64)
+    print("Droom Marketing Factory - Performance Loader")
+    print(f"Client: {BRAND_ID}")
+    print(f"Exports: {len(args.exports)} file(s), {args.partition} partitions")
+    print(f"Target: {'dry run' if args.dry_run else NEO4J_URI}")
+    print("=" * 64)
+
+    started = time.perf_counter()
+    try:
+        columns = load_columns(args.exports)
+    except ValueError as e:
+        print(f"\n  [FAIL] {e}")
+        sys.exit(1)
+    daily = derive_metrics(aggregate_daily(columns))
+    rows = performance_rows(daily)
+    print(f"\n  [OK] {len(columns['date'])} export rows -> {len(rows)} campaign-days "
+          f"({time.perf_counter() - started:.1f}s)")
+    if not rows:
+        print("  [WARN] No rows with a campaign id and date found.")
+        return
+    print(f"  Range: {rows[0]['date']} .. {rows[-1]['date']}, "
+          f"{len(set(daily['campaign_id']))} campaigns")
+
+    if args.dry_run:
+        spend = daily["spend"].sum()
+        revenue = daily["revenue"].sum()
+        print(f"  Spend: ${spend:,.2f}  Revenue: ${revenue:,.2f}  "
+              f"ROAS: {revenue / spend if spend else 0:.2f}")
+        return
+
+    print(f"\n--- Writing Performance nodes (batch size {args.batch_size}) ---")
+    driver = connect()
+    try:
+        summary = load_performance(driver, rows, args.partition, args.batch_size)
+    finally:
+        driver.close()
+
+    print("\n" + "=" * 64)
+    print("LOAD SUMMARY")
+    print("=" * 64)
+    print(f"  Partitions written:           {summary['partitions']}")
+    print(f"  Performance nodes:            {summary['performance_nodes']}")
+    print(f"  Linked to campaigns:          {summary['linked']}")
+    print(f"  Elapsed:                      {time.perf_counter() - started:.1f}s")
+    if summary["unlinked_campaigns"]:
+        print(f"\n  [WARN] No :Droom:Campaign node for "
+              f"{len(summary['unlinked_campaigns'])} campaign id(s):")
+        for campaign_id in sorted(summary["unlinked_campaigns"])[:20]:
+            print(f"    {campaign_id}")
+
+    if summary["errors"]:
+        print(f"\n  ERRORS ({len(summary['errors'])}):")
+        for err in summary["errors"]:
+            print(f"    {err}")
+        sys.exit(1)
+    else:
+        print("\n  All performance rows loaded successfully.")
+
+
+if __name__ == "__main__":
+    main()
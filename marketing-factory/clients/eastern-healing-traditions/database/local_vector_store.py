@@ -0,0 +1,565 @@
+"""
+Local Vector Store for Eastern Healing Traditions
+Droom Marketing Factory
+
+In-process, NumPy-backed stand-in for the shared Pinecone index. Implements
+the subset of the Pinecone client API the Droom scripts use:
+
+    pc = LocalPinecone()
+    pc.list_indexes()                  -> [{name, dimension, metric}]
+    index = pc.Index("graphelion-deux")
+    index.describe_index_stats()       -> {dimension, namespaces, total_vector_count}
+    index.upsert(vectors=[...], namespace=...)
+    index.query(vector=..., top_k=..., namespace=..., filter={...},
+                include_metadata=True, include_values=False)
+    index.list(namespace=...)          -> pages of ids
+    index.fetch(ids=[...], namespace=...)
+    index.update(id=..., set_metadata={...}, namespace=...)
+    index.update_metadata({id: {...}}, namespace=...)   local-only batch update
+    index.delete(ids=[...], namespace=...)
+    index.close()                      compact pending journal writes
+
+Each namespace is persisted as a float32 matrix in `<namespace>.npy`
+(opened memory-mapped) plus `<namespace>.json` holding ids and metadata;
+writes append to `<namespace>.journal` and are folded into those files by
+index.close() or once the journal outgrows them.
+Queries are cosine top-k over blocked matrix products; `query_many` scores a
+whole batch of query vectors at once.
+
+Select it instead of the live service by setting DROOM_VECTOR_STORE=local;
+init_pinecone.py (and every script importing Pinecone from it) and
+integration/test-suite.py then use it unchanged. get_pinecone() makes the
+same choice for other callers. Also usable directly for offline analysis.
+
+Requires:
+    pip install numpy
+
+Environment variables:
+    DROOM_VECTOR_STORE      set to "local" to use this store
+    DROOM_VECTOR_STORE_DIR  storage root (default marketing-factory/.vector-store)
+"""
+
+import json
+import os
+import struct
+import threading
+from pathlib import Path
+
+import numpy as np
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+_script_dir = Path(__file__).resolve().parent
+
+DEFAULT_ROOT = _script_dir / ".." / ".." / ".." / ".vector-store"
+DEFAULT_INDEX_NAME = "graphelion-deux"
+DEFAULT_DIMENSION = 1536
+DEFAULT_METRIC = "cosine"
+
+# Stored vectors scored per matrix product in query_many.
+QUERY_BLOCK_SIZE = 65536
+
+# A namespace's journal is folded into its base files once it is larger
+# than COMPACT_RATIO x the base matrix (and at least COMPACT_MIN_BYTES).
+COMPACT_RATIO = 1.0
+COMPACT_MIN_BYTES = 64 * 1024 * 1024
+_JOURNAL_HEADER = struct.Struct("<I")
+
+
+def use_local_store():
+    """True when DROOM_VECTOR_STORE selects the local stand-in."""
+    return os.environ.get("DROOM_VECTOR_STORE", "").lower() == "local"
+
+
+def get_pinecone(api_key=None):
+    """Return a LocalPinecone or a real Pinecone client per DROOM_VECTOR_STORE."""
+    if use_local_store():
+        return LocalPinecone()
+    from pinecone import Pinecone
+
+    return Pinecone(api_key=api_key)
+
+
+# ---------------------------------------------------------------------------
+# Response objects
+# ---------------------------------------------------------------------------
+
+
+class Record(dict):
+    """dict with attribute access, like Pinecone's response models.
+
+    Keys win over dict methods, so `vector.values` is the vector.
+    """
+
+    def __getattribute__(self, name):
+        if dict.__contains__(self, name):
+            return dict.__getitem__(self, name)
+        return dict.__getattribute__(self, name)
+
+
+# ---------------------------------------------------------------------------
+# Metadata filters
+# ---------------------------------------------------------------------------
+
+_OPERATORS = {
+    "$eq": lambda value, arg: value == arg,
+    "$ne": lambda value, arg: value != arg,
+    "$gt": lambda value, arg: value is not None and value > arg,
+    "$gte": lambda value, arg: value is not None and value >= arg,
+    "$lt": lambda value, arg: value is not None and value < arg,
+    "$lte": lambda value, arg: value is not None and value <= arg,
+    "$in": lambda value, arg: value in arg,
+    "$nin": lambda value, arg: value not in arg,
+    "$exists": lambda value, arg: (value is not None) == arg,
+}
+
+
+def matches_filter(metadata, flt):
+    """Evaluate a Pinecone metadata filter against one metadata dict."""
+    for key, condition in flt.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, sub) for sub in condition):
+                return False
+        else:
+            value = metadata.get(key)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, arg in condition.items():
+                if op not in _OPERATORS:
+                    raise ValueError(f"Unsupported filter operator: {op}")
+                if isinstance(value, list) and op in ("$eq", "$in"):
+                    # List-valued metadata matches if any element matches.
+                    if not any(_OPERATORS[op](v, arg) for v in value):
+                        return False
+                elif not _OPERATORS[op](value, arg):
+                    return False
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+
+
+class _Namespace:
+    """One namespace: a float32 matrix plus ids and metadata.
+
+    The base is `<name>.npy` (opened memory-mapped) and `<name>.json`.
+    Writes append to `<name>.journal` instead of rewriting the base: one
+    length-prefixed JSON header per batch, followed by the raw float32
+    rows of an upsert. Loading replays the journal over the base;
+    compact() folds it into a new base, on close() and whenever the
+    journal outgrows the base, so a bulk load costs O(rows written)
+    rather than one full rewrite per batch.
+    """
+
+    def __init__(self, directory, name, dimension):
+        self.matrix_path = directory / f"{name}.npy"
+        self.meta_path = directory / f"{name}.json"
+        self.journal_path = directory / f"{name}.journal"
+        self.dimension = dimension
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if self.matrix_path.exists():
+            self.vectors = np.load(self.matrix_path, mmap_mode="r")
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            self.ids = meta["ids"]
+            self.metadata = meta["metadata"]
+        else:
+            self.vectors = np.empty((0, self.dimension), dtype=np.float32)
+            self.ids = []
+            self.metadata = []
+        self.positions = {vid: i for i, vid in enumerate(self.ids)}
+        norms = np.linalg.norm(self.vectors, axis=1) if len(self.ids) else np.empty(0)
+        self.norms = np.where(norms == 0, 1.0, norms).astype(np.float32)
+        # Writable copies, made on the first write and grown by doubling.
+        self._rows = self._row_norms = None
+        self.base_bytes = self.vectors.nbytes
+        self.journal_bytes = 0
+        if self.journal_path.exists():
+            self._replay()
+
+    # --- in-memory changes (shared by live writes and journal replay) ---
+
+    def _reserve(self, extra):
+        needed = len(self.ids) + extra
+        if self._rows is not None and len(self._rows) >= needed:
+            return
+        capacity = max(needed, 1024, 2 * (len(self._rows) if self._rows is not None else 0))
+        rows = np.empty((capacity, self.dimension), dtype=np.float32)
+        row_norms = np.empty(capacity, dtype=np.float32)
+        count = len(self.vectors)
+        rows[:count] = self.vectors
+        row_norms[:count] = self.norms
+        self._rows, self._row_norms = rows, row_norms
+        self._publish(count)
+
+    def _publish(self, count):
+        self.vectors = self._rows[:count]
+        self.norms = self._row_norms[:count]
+
+    def _apply_upsert(self, ids, rows, metadata):
+        self._reserve(len(ids))
+        norms = np.linalg.norm(rows, axis=1)
+        norms[norms == 0] = 1.0
+        positions = np.empty(len(ids), dtype=np.int64)
+        for i, (vid, meta) in enumerate(zip(ids, metadata)):
+            pos = self.positions.get(vid)
+            if pos is None:
+                pos = self.positions[vid] = len(self.ids)
+                self.ids.append(vid)
+                self.metadata.append(meta)
+            else:
+                self.metadata[pos] = meta
+            positions[i] = pos
+        self._rows[positions] = rows
+        self._row_norms[positions] = norms
+        self._publish(len(self.ids))
+
+    def _apply_metadata(self, ids, changes):
+        updated = 0
+        for vid, change in zip(ids, changes):
+            pos = self.positions.get(vid)
+            if pos is not None:
+                self.metadata[pos] = {**self.metadata[pos], **change}
+                updated += 1
+        return updated
+
+    def _apply_delete(self, ids):
+        """Swap-remove: the last row fills each hole, so a delete costs O(ids)."""
+        self._reserve(0)
+        removed = 0
+        for vid in ids:
+            pos = self.positions.pop(vid, None)
+            if pos is None:
+                continue
+            last = len(self.ids) - 1
+            if pos != last:
+                moved = self.ids[last]
+                self._rows[pos] = self._rows[last]
+                self._row_norms[pos] = self._row_norms[last]
+                self.ids[pos], self.metadata[pos] = moved, self.metadata[last]
+                self.positions[moved] = pos
+            self.ids.pop()
+            self.metadata.pop()
+            removed += 1
+        self._publish(len(self.ids))
+        return removed
+
+    # --- journal ---
+
+    def _append(self, header, rows=None):
+        data = json.dumps(header).encode("utf-8")
+        with open(self.journal_path, "ab") as f:
+            f.write(_JOURNAL_HEADER.pack(len(data)))
+            f.write(data)
+            if rows is not None:
+                f.write(rows.tobytes())
+        self.journal_bytes += _JOURNAL_HEADER.size + len(data) + (rows.nbytes if rows is not None else 0)
+        if self.journal_bytes > max(COMPACT_MIN_BYTES, self.base_bytes * COMPACT_RATIO):
+            self._compact()
+
+    def _replay(self):
+        data = self.journal_path.read_bytes()
+        offset, row_bytes = 0, self.dimension * 4
+        while offset + _JOURNAL_HEADER.size <= len(data):
+            (size,) = _JOURNAL_HEADER.unpack_from(data, offset)
+            body = offset + _JOURNAL_HEADER.size
+            try:
+                header = json.loads(data[body:body + size])
+            except ValueError:
+                break  # torn write at the tail
+            end = body + size
+            if header["op"] == "upsert":
+                end += len(header["ids"]) * row_bytes
+                if end > len(data):
+                    break
+                rows = np.frombuffer(data, dtype=np.float32, count=len(header["ids"]) * self.dimension,
+                                     offset=body + size).reshape(-1, self.dimension)
+                self._apply_upsert(header["ids"], rows, header["metadata"])
+            elif header["op"] == "metadata":
+                self._apply_metadata(header["ids"], header["changes"])
+            elif header["op"] == "delete":
+                self._apply_delete(header["ids"])
+            offset = end
+        if offset < len(data):
+            # Cut the torn tail off so later appends are not stranded behind it.
+            os.truncate(self.journal_path, offset)
+        self.journal_bytes = offset
+
+    def _compact(self):
+        tmp_matrix = self.matrix_path.with_suffix(".npy.tmp")
+        tmp_meta = self.meta_path.with_suffix(".json.tmp")
+        with open(tmp_matrix, "wb") as f:
+            np.save(f, np.ascontiguousarray(self.vectors, dtype=np.float32))
+        with open(tmp_meta, "w") as f:
+            json.dump({"ids": self.ids, "metadata": self.metadata}, f)
+        os.replace(tmp_matrix, self.matrix_path)
+        os.replace(tmp_meta, self.meta_path)
+        self.journal_path.unlink(missing_ok=True)
+        self.base_bytes = self.vectors.nbytes
+        self.journal_bytes = 0
+
+    def compact(self):
+        """Fold the journal into the base files (no-op when there is none)."""
+        with self.lock:
+            if self.journal_bytes:
+                self._compact()
+
+    # --- writes ---
+
+    def upsert(self, ids, values, metadata):
+        rows = np.ascontiguousarray(values, dtype=np.float32).reshape(len(ids), self.dimension)
+        with self.lock:
+            self._apply_upsert(ids, rows, metadata)
+            self._append({"op": "upsert", "ids": ids, "metadata": metadata}, rows)
+
+    def update_metadata(self, ids, changes):
+        """Merge changes[i] into ids[i]'s metadata as one journal entry.
+
+        Unknown ids are skipped. Returns the number of vectors updated.
+        """
+        with self.lock:
+            known = [(vid, change) for vid, change in zip(ids, changes)
+                     if vid in self.positions]
+            if not known:
+                return 0
+            ids, changes = [vid for vid, _ in known], [change for _, change in known]
+            self._apply_metadata(ids, changes)
+            self._append({"op": "metadata", "ids": ids, "changes": changes})
+            return len(ids)
+
+    def delete(self, ids):
+        """Drop vectors by id (unknown ids are ignored). Returns the count removed.
+
+        The last rows move into the freed positions, so list() order is
+        storage order rather than insertion order after a delete.
+        """
+        with self.lock:
+            ids = [vid for vid in dict.fromkeys(ids) if vid in self.positions]
+            if not ids:
+                return 0
+            removed = self._apply_delete(ids)
+            self._append({"op": "delete", "ids": ids})
+            return removed
+
+    def mask(self, flt):
+        if not flt:
+            return None
+        return np.fromiter(
+            (matches_filter(meta, flt) for meta in self.metadata),
+            dtype=bool,
+            count=len(self.metadata),
+        )
+
+
+class LocalIndex:
+    """Pinecone Index stand-in backed by per-namespace .npy files."""
+
+    def __init__(self, directory, dimension, metric):
+        if metric != "cosine":
+            raise ValueError(f"Local store only supports cosine, not {metric}")
+        self.directory = directory
+        self.dimension = dimension
+        self.metric = metric
+        self._namespaces = {}
+        self._lock = threading.Lock()
+
+    def _namespace(self, name):
+        with self._lock:
+            if name not in self._namespaces:
+                self._namespaces[name] = _Namespace(self.directory, name, self.dimension)
+            return self._namespaces[name]
+
+    def _namespace_names(self):
+        # Not Path.stem: the default namespace "" is stored as ".npy"/".journal".
+        names = {p.name.removesuffix(".npy") for p in self.directory.glob("*.npy")}
+        names.update(p.name.removesuffix(".journal") for p in self.directory.glob("*.journal"))
+        return sorted(names)
+
+    def close(self):
+        """Compact every namespace this index has written to."""
+        with self._lock:
+            namespaces = list(self._namespaces.values())
+        for ns in namespaces:
+            ns.compact()
+
+    def describe_index_stats(self, filter=None):
+        namespaces = {}
+        for name in self._namespace_names():
+            ns = self._namespace(name)
+            mask = ns.mask(filter)
+            count = len(ns.ids) if mask is None else int(mask.sum())
+            if count:
+                namespaces[name] = Record(vector_count=count)
+        return Record(
+            dimension=self.dimension,
+            namespaces=namespaces,
+            total_vector_count=sum(ns.vector_count for ns in namespaces.values()),
+        )
+
+    def upsert(self, vectors, namespace=""):
+        """Insert or overwrite vectors given as dicts or (id, values[, metadata])."""
+        ids, values, metadata = [], [], []
+        for vector in vectors:
+            if isinstance(vector, dict):
+                vid, vals, meta = vector["id"], vector["values"], vector.get("metadata")
+            else:
+                vid, vals, meta = (tuple(vector) + (None,))[:3]
+            if len(vals) != self.dimension:
+                raise ValueError(
+                    f"Vector {vid} has dimension {len(vals)}, expected {self.dimension}"
+                )
+            ids.append(vid)
+            values.append(vals)
+            metadata.append(meta or {})
+        self._namespace(namespace).upsert(ids, values, metadata)
+        return Record(upserted_count=len(ids))
+
+    def update(self, id, values=None, set_metadata=None, namespace=""):
+        """Overwrite values and/or merge metadata of an existing vector (no-op if absent)."""
+        ns = self._namespace(namespace)
+        if values is not None and id in ns.positions:
+            meta = ns.metadata[ns.positions[id]]
+            ns.upsert([id], [values], [{**meta, **(set_metadata or {})}])
+        elif set_metadata:
+            ns.update_metadata([id], [set_metadata])
+        return Record()
+
+    def update_metadata(self, updates, namespace=""):
+        """Merge {id: set_metadata} into existing vectors in one write.
+
+        Local-only batch form of update(); unknown ids are skipped.
+        """
+        ns = self._namespace(namespace)
+        count = ns.update_metadata(list(updates), list(updates.values()))
+        return Record(updated_count=count)
+
+    def delete(self, ids=None, delete_all=False, namespace=""):
+        ns = self._namespace(namespace)
+        ns.delete(list(ns.ids) if delete_all else ids or [])
+        return Record()
+
+    def list(self, prefix=None, limit=None, namespace=""):
+        """Yield pages (lists) of vector ids in storage order."""
+        ns = self._namespace(namespace)
+        ids = [vid for vid in ns.ids if not prefix or vid.startswith(prefix)]
+        page = limit or 100
+        for start in range(0, len(ids), page):
+            yield ids[start:start + page]
+
+    def fetch(self, ids, namespace=""):
+        ns = self._namespace(namespace)
+        vectors = {}
+        for vid in ids:
+            pos = ns.positions.get(vid)
+            if pos is not None:
+                vectors[vid] = Record(
+                    id=vid,
+                    values=ns.vectors[pos].tolist(),
+                    metadata=ns.metadata[pos],
+                )
+        return Record(vectors=vectors, namespace=namespace)
+
+    def query_many(self, vectors, top_k=10, namespace="", filter=None,
+                   include_metadata=False, include_values=False):
+        """Cosine top-k for a batch of query vectors; one result per query."""
+        ns = self._namespace(namespace)
+        queries = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        q_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(q_norms == 0, 1.0, q_norms)
+
+        count = len(ns.ids)
+        scores = np.empty((len(queries), count), dtype=np.float32)
+        for start in range(0, count, QUERY_BLOCK_SIZE):
+            stop = min(start + QUERY_BLOCK_SIZE, count)
+            block = np.asarray(ns.vectors[start:stop], dtype=np.float32)
+            scores[:, start:stop] = (queries @ block.T) / ns.norms[start:stop]
+
+        mask = ns.mask(filter)
+        if mask is not None:
+            scores[:, ~mask] = -np.inf
+            count = int(mask.sum())
+
+        k = min(top_k, count)
+        results = []
+        for row in scores:
+            if k == 0:
+                results.append(Record(matches=[], namespace=namespace))
+                continue
+            top = np.argpartition(-row, k - 1)[:k]
+            top = top[np.argsort(-row[top])]
+            matches = []
+            for pos in top:
+                match = Record(id=ns.ids[pos], score=float(row[pos]))
+                if include_metadata:
+                    match["metadata"] = ns.metadata[pos]
+                if include_values:
+                    match["values"] = ns.vectors[pos].tolist()
+                matches.append(match)
+            results.append(Record(matches=matches, namespace=namespace))
+        return results
+
+    def query(self, vector=None, id=None, top_k=10, namespace="", filter=None,
+              include_metadata=False, include_values=False):
+        if vector is None:
+            ns = self._namespace(namespace)
+            vector = ns.vectors[ns.positions[id]]
+        return self.query_many(
+            [vector], top_k=top_k, namespace=namespace, filter=filter,
+            include_metadata=include_metadata, include_values=include_values,
+        )[0]
+
+
+class LocalPinecone:
+    """Pinecone client stand-in. Always provides the shared graphelion-deux index."""
+
+    def __init__(self, api_key=None, root=None):
+        self.root = Path(root or os.environ.get("DROOM_VECTOR_STORE_DIR") or DEFAULT_ROOT)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._indexes = {}
+        self._lock = threading.Lock()
+        if not (self.root / DEFAULT_INDEX_NAME / "index.json").exists():
+            self.create_index(DEFAULT_INDEX_NAME, DEFAULT_DIMENSION, DEFAULT_METRIC)
+
+    def create_index(self, name, dimension, metric=DEFAULT_METRIC, **_):
+        directory = self.root / name
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / "index.json", "w") as f:
+            json.dump({"dimension": dimension, "metric": metric}, f)
+
+    def list_indexes(self):
+        indexes = []
+        for config_path in sorted(self.root.glob("*/index.json")):
+            with open(config_path) as f:
+                config = json.load(f)
+            indexes.append(Record(name=config_path.parent.name, **config))
+        return indexes
+
+    def close(self):
+        """Compact the journals of every index opened through this client."""
+        with self._lock:
+            indexes = list(self._indexes.values())
+        for index in indexes:
+            index.close()
+
+    def Index(self, name):
+        with self._lock:
+            if name not in self._indexes:
+                config_path = self.root / name / "index.json"
+                if not config_path.exists():
+                    raise KeyError(f"Local index '{name}' does not exist")
+                with open(config_path) as f:
+                    config = json.load(f)
+                self._indexes[name] = LocalIndex(
+                    self.root / name, config["dimension"], config["metric"]
+                )
+            return self._indexes[name]
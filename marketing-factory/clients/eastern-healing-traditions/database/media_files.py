@@ -0,0 +1,31 @@
+"""
+Media File Helpers for Eastern Healing Traditions
+Droom Marketing Factory
+
+Standard-library helpers shared by content_dedup.py and content_fetch.py,
+kept apart so fetching content does not need the fingerprinting stack
+(numpy, scipy).
+
+Requires:
+    ffprobe on PATH (video_duration only)
+"""
+
+import subprocess
+from pathlib import Path
+
+# Same extension split as the workflow's Set Content Variables node.
+VIDEO_EXTENSIONS = {"mp4", "mov", "avi", "webm"}
+
+
+def media_type_for(path):
+    ext = Path(path).suffix.lstrip(".").lower()
+    return "video" if ext in VIDEO_EXTENSIONS else "image"
+
+
+def video_duration(path):
+    output = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+         "-of", "default=noprint_wrappers=1:nokey=1", str(path)],
+        capture_output=True, text=True, check=True,
+    ).stdout.strip()
+    return float(output)
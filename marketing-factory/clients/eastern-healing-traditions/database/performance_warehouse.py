@@ -0,0 +1,520 @@
+"""
+Columnar Performance Warehouse for Eastern Healing Traditions
+Droom Marketing Factory
+
+Keeps a Parquet copy of each brand's :Droom:Performance rows plus Campaign
+and Content snapshots on local disk, so the dashboard's Level 3 metrics,
+CSV exports and 7/14/30/90-day period comparisons scan columns instead of
+pulling months of daily nodes out of Neo4j per page view. Neo4j stays the
+source of truth; the warehouse is a rebuildable read replica.
+
+Layout (hive partitioning, one file per partition):
+
+    performance/brand_id=<brand>/month=<YYYY-MM>/part-0.parquet
+    campaigns/brand_id=<brand>/part-0.parquet
+    content/brand_id=<brand>/part-0.parquet
+    _state.json            per-brand Performance.updated_at watermark
+
+Sync is incremental: only months containing Performance nodes updated
+since the brand's watermark are re-exported (a whole month per query, on
+the droom_performance_date index) and their partition file is replaced
+atomically. Campaign and Content snapshots are small and rewritten on
+every sync. Deleted Performance nodes are only dropped by --rebuild.
+
+The watermark relies on every Performance writer setting
+`p.updated_at = datetime()` (load_performance.py does). datetime() is the
+write transaction's start time, so a load that commits after a sync can
+carry an updated_at older than that sync's watermark; each sync therefore
+looks back WATERMARK_LAG_SECONDS past it. Nodes with no updated_at are
+treated as changed on every sync and reported with a [WARN]; stamp them
+(or fix their writer) to stop the re-exports.
+
+Queries read through pyarrow.dataset with brand/month partition pruning
+and a date filter, sum counts and money per group, join campaign
+attributes (platform, objective, targets) from the campaigns snapshot and
+derive ctr, cpm, cpc, roas, conversion_rate and cost_per_conversion from
+the sums with load_performance.derive_metrics, so ratios are never
+averaged.
+
+Usage:
+    python performance_warehouse.py sync
+    python performance_warehouse.py sync --all-brands --rebuild
+    python performance_warehouse.py query --days 30 --group-by platform --compare
+    python performance_warehouse.py query --start 2026-01-01 --end 2026-03-31 \\
+        --group-by date --platform facebook --csv facebook-q1.csv
+
+    from performance_warehouse import PerformanceWarehouse
+    warehouse = PerformanceWarehouse()
+    table = warehouse.metrics(BRAND_ID, start, end, group_by=["platform"])
+    table = warehouse.compare_periods(BRAND_ID, days=7, group_by=["platform"])
+
+Requires:
+    pip install neo4j numpy pyarrow python-dotenv
+
+Environment variables (loaded from ../../.env or set directly):
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD (sync only)
+    DROOM_WAREHOUSE (optional, warehouse root directory)
+"""
+
+import argparse
+import datetime as dt
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from init_neo4j import BRAND_ID, NEO4J_URI, connect, require_env
+from load_performance import COUNT_FIELDS, DERIVED_FIELDS, MONEY_FIELDS, derive_metrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    print("ERROR: pyarrow is not installed.")
+    print("  Run: pip install pyarrow")
+    sys.exit(1)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+_script_dir = Path(__file__).resolve().parent
+WAREHOUSE_DIR = Path(
+    os.environ.get("DROOM_WAREHOUSE")
+    or _script_dir / ".." / ".." / ".." / ".warehouse"
+)
+
+# Dashboard period options; the default range is the first.
+PERIOD_DAYS = [7, 14, 30, 90]
+
+# Campaign attributes that can be grouped or filtered on.
+CAMPAIGN_FIELDS = ["name", "platform", "objective", "status",
+                   "demographic_target", "geographic_target"]
+
+PERFORMANCE_SCHEMA = pa.schema(
+    [("id", pa.string()), ("campaign_id", pa.string()), ("date", pa.date32())]
+    + [(field, pa.int64()) for field in COUNT_FIELDS]
+    + [(field, pa.float64()) for field in MONEY_FIELDS]
+)
+
+CAMPAIGN_SCHEMA = pa.schema(
+    [("campaign_id", pa.string())]
+    + [(field, pa.string()) for field in CAMPAIGN_FIELDS]
+    + [("budget_per_day", pa.float64()), ("start_date", pa.string())]
+)
+
+CONTENT_SCHEMA = pa.schema([
+    ("content_id", pa.string()),
+    ("media_type", pa.string()),
+    ("format", pa.string()),
+    ("status", pa.string()),
+    ("fatigue_level", pa.string()),
+    ("campaigns", pa.int64()),
+    ("total_impressions", pa.int64()),
+    ("total_spend", pa.float64()),
+    ("avg_roas", pa.float64()),
+    ("creative_fatigue_score", pa.float64()),
+    ("profile_date", pa.string()),
+])
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("brand_id", pa.string()), ("month", pa.string())]), flavor="hive"
+)
+
+# How far each sync looks back past the watermark; longer than any
+# Performance write transaction stays open.
+WATERMARK_LAG_SECONDS = 600
+
+# Months to re-export, nodes lacking updated_at, and the new watermark. The
+# watermark is the later of the old one and the newest updated_at seen,
+# compared as datetimes.
+CHANGED_MONTHS_QUERY = (
+    "MATCH (p:Droom:Performance {brand_id: $brand_id}) "
+    "WHERE $since IS NULL OR p.updated_at IS NULL "
+    "   OR p.updated_at > datetime($since) - duration({seconds: $lag}) "
+    "WITH substring(toString(p.date), 0, 7) AS month, max(p.updated_at) AS newest, "
+    "  count(*) - count(p.updated_at) AS unstamped "
+    "WITH collect(month) AS months, max(newest) AS newest, sum(unstamped) AS unstamped "
+    "RETURN months, unstamped, "
+    "  CASE WHEN $since IS NULL OR newest > datetime($since) "
+    "    THEN toString(newest) ELSE $since END AS watermark"
+)
+
+MONTH_QUERY = (
+    "MATCH (p:Droom:Performance {brand_id: $brand_id}) "
+    "WHERE p.date >= date($start) AND p.date < date($end) "
+    "RETURN p.id AS id, p.campaign_id AS campaign_id, toString(p.date) AS date, "
+    + ", ".join(f"p.{field} AS {field}" for field in COUNT_FIELDS + MONEY_FIELDS)
+)
+
+CAMPAIGN_QUERY = (
+    "MATCH (c:Droom:Campaign {brand_id: $brand_id}) "
+    "RETURN c.id AS campaign_id, "
+    + ", ".join(f"c.{field} AS {field}" for field in CAMPAIGN_FIELDS)
+    + ", toFloat(c.budget_per_day) AS budget_per_day, toString(c.start_date) AS start_date"
+)
+
+CONTENT_QUERY = (
+    "MATCH (c:Droom:Content {brand_id: $brand_id}) "
+    "RETURN c.id AS content_id, "
+    "  CASE WHEN c:Video THEN 'video' WHEN c:Image THEN 'image' END AS media_type, "
+    "  c.format AS format, c.status AS status, c.fatigue_level AS fatigue_level, "
+    "  size([(c)-[:RAN_IN]->(:Droom:Campaign) | 1]) AS campaigns, "
+    "  toInteger(c.total_impressions) AS total_impressions, "
+    "  toFloat(c.total_spend) AS total_spend, toFloat(c.avg_roas) AS avg_roas, "
+    "  toFloat(c.creative_fatigue_score) AS creative_fatigue_score, "
+    "  toString(c.profile_date) AS profile_date"
+)
+
+BRANDS_QUERY = "MATCH (c:Droom:Campaign) RETURN DISTINCT c.brand_id AS brand_id"
+
+# ---------------------------------------------------------------------------
+# Files
+# ---------------------------------------------------------------------------
+
+
+def _write_atomic(table, path):
+    """Write a Parquet file next to `path` and rename it into place.
+
+    The temp name starts with "." so dataset discovery skips it, whether a
+    scan runs mid-write or a crash leaves it behind.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+
+
+def _month_range(month):
+    """[first day, first day of next month) for "YYYY-MM"."""
+    start = dt.date.fromisoformat(f"{month}-01")
+    end = (start + dt.timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def _months_between(start, end):
+    months, day = [], start.replace(day=1)
+    while day <= end:
+        months.append(day.strftime("%Y-%m"))
+        day = (day + dt.timedelta(days=32)).replace(day=1)
+    return months
+
+
+def _table(records, schema):
+    columns = {name: [r.get(name) for r in records] for name in schema.names}
+    if "date" in columns:
+        columns["date"] = [dt.date.fromisoformat(d) for d in columns["date"]]
+    return pa.table(columns, schema=schema)
+
+
+# ---------------------------------------------------------------------------
+# Warehouse
+# ---------------------------------------------------------------------------
+
+
+class PerformanceWarehouse:
+    """Parquet performance warehouse rooted at `root`."""
+
+    def __init__(self, root=WAREHOUSE_DIR):
+        self.root = Path(root)
+        self.state_path = self.root / "_state.json"
+
+    def _partition(self, table, brand_id, month=None):
+        path = self.root / table / f"brand_id={brand_id}"
+        if month:
+            path = path / f"month={month}"
+        return path / "part-0.parquet"
+
+    def load_state(self):
+        if not self.state_path.exists():
+            return {"brands": {}}
+        with open(self.state_path) as f:
+            return json.load(f)
+
+    def save_state(self, state):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, self.state_path)
+
+    # --- sync ---
+
+    def sync(self, driver, brand_id, rebuild=False):
+        """Export one brand from Neo4j. Returns a summary dict."""
+        state = self.load_state()
+        brand_state = {} if rebuild else state["brands"].get(brand_id, {})
+        since = brand_state.get("performance_watermark")
+        if rebuild:
+            shutil.rmtree(self.root / "performance" / f"brand_id={brand_id}", ignore_errors=True)
+
+        summary = {"months": 0, "rows": 0}
+        with driver.session() as session:
+            changed = session.run(CHANGED_MONTHS_QUERY, brand_id=brand_id, since=since,
+                                  lag=WATERMARK_LAG_SECONDS).single()
+            for month in sorted(changed["months"]):
+                start, end = _month_range(month)
+                rows = session.run(MONTH_QUERY, brand_id=brand_id, start=start.isoformat(),
+                                   end=end.isoformat()).data()
+                path = self._partition("performance", brand_id, month)
+                if rows:
+                    rows.sort(key=lambda r: (r["date"], r["campaign_id"] or ""))
+                    _write_atomic(_table(rows, PERFORMANCE_SCHEMA), path)
+                elif path.exists():
+                    path.unlink()
+                summary["months"] += 1
+                summary["rows"] += len(rows)
+            since = changed["watermark"]
+            summary["unstamped"] = changed["unstamped"]
+
+            campaigns = session.run(CAMPAIGN_QUERY, brand_id=brand_id).data()
+            _write_atomic(_table(campaigns, CAMPAIGN_SCHEMA),
+                          self._partition("campaigns", brand_id))
+            content = session.run(CONTENT_QUERY, brand_id=brand_id).data()
+            _write_atomic(_table(content, CONTENT_SCHEMA), self._partition("content", brand_id))
+        summary["campaigns"], summary["content"] = len(campaigns), len(content)
+
+        state["brands"][brand_id] = {
+            "performance_watermark": since,
+            "synced_at": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+        }
+        self.save_state(state)
+        return summary
+
+    # --- reads ---
+
+    def campaigns(self, brand_id):
+        path = self._partition("campaigns", brand_id)
+        return pq.read_table(path) if path.exists() else CAMPAIGN_SCHEMA.empty_table()
+
+    def content(self, brand_id):
+        path = self._partition("content", brand_id)
+        return pq.read_table(path) if path.exists() else CONTENT_SCHEMA.empty_table()
+
+    def scan(self, brand_id, start, end, platforms=None, campaign_ids=None):
+        """Daily campaign rows for [start, end] with campaign attributes joined."""
+        base = self.root / "performance"
+        brand_dir = base / f"brand_id={brand_id}"
+        months = [m for m in _months_between(start, end)
+                  if (brand_dir / f"month={m}").exists()]
+        if not months:
+            table = PERFORMANCE_SCHEMA.empty_table()
+        else:
+            dataset = ds.dataset(base, format="parquet", partitioning=PARTITIONING)
+            predicate = (
+                (ds.field("brand_id") == brand_id)
+                & ds.field("month").isin(months)
+                & (ds.field("date") >= pa.scalar(start, pa.date32()))
+                & (ds.field("date") <= pa.scalar(end, pa.date32()))
+            )
+            if campaign_ids:
+                predicate &= ds.field("campaign_id").isin(list(campaign_ids))
+            table = dataset.to_table(columns=PERFORMANCE_SCHEMA.names, filter=predicate)
+        table = table.join(self.campaigns(brand_id), "campaign_id", join_type="left outer")
+        if platforms:
+            table = table.filter(pc.is_in(table["platform"], pa.array(list(platforms))))
+        return table
+
+    def metrics(self, brand_id, start, end, group_by=(), platforms=None, campaign_ids=None):
+        """Summed counts/money and derived ratios per group, sorted by the keys."""
+        return aggregate(self.scan(brand_id, start, end, platforms, campaign_ids), group_by)
+
+    def compare_periods(self, brand_id, days=PERIOD_DAYS[0], end=None, group_by=(),
+                        platforms=None, campaign_ids=None):
+        """Current `days` ending at `end` vs the equal period before it.
+
+        One scan covers both periods. Every metric gets `<metric>`,
+        `<metric>_previous` and `<metric>_change` (relative, null when the
+        previous value is zero or undefined) columns.
+        """
+        end = end or dt.date.today() - dt.timedelta(days=1)
+        current_start = end - dt.timedelta(days=days - 1)
+        previous_start = current_start - dt.timedelta(days=days)
+        table = self.scan(brand_id, previous_start, end, platforms, campaign_ids)
+        in_current = pc.greater_equal(table["date"], pa.scalar(current_start, pa.date32()))
+        current = aggregate(table.filter(in_current), group_by)
+        previous = aggregate(table.filter(pc.invert(in_current)), group_by)
+        return compare(current, previous, list(group_by))
+
+
+def aggregate(table, group_by=()):
+    """Sum COUNT_FIELDS and MONEY_FIELDS per group and derive the ratios."""
+    keys = list(group_by)
+    sums = COUNT_FIELDS + MONEY_FIELDS
+    if keys:
+        grouped = table.group_by(keys).aggregate([(field, "sum") for field in sums])
+        grouped = grouped.rename_columns(
+            [name[:-4] if name.endswith("_sum") else name for name in grouped.column_names]
+        ).sort_by([(key, "ascending") for key in keys])
+        columns = {key: grouped[key] for key in keys}
+        values = {field: grouped[field].to_numpy(zero_copy_only=False).astype(float)
+                  for field in sums}
+    else:
+        columns = {}
+        values = {field: np.array([pc.sum(table[field]).as_py() or 0], dtype=float)
+                  for field in sums}
+    values = derive_metrics({field: np.nan_to_num(v) for field, v in values.items()})
+    for field in COUNT_FIELDS:
+        columns[field] = pa.array(values[field].astype(np.int64))
+    for field in MONEY_FIELDS:
+        columns[field] = pa.array(np.round(values[field], 2))
+    for field in DERIVED_FIELDS:
+        columns[field] = pa.array(np.round(values[field], 6), from_pandas=True)
+    return pa.table(columns)
+
+
+def compare(current, previous, keys):
+    """Join two aggregate tables on `keys` into period-over-period columns."""
+    metrics = COUNT_FIELDS + MONEY_FIELDS + DERIVED_FIELDS
+    if keys:
+        previous = previous.rename_columns(
+            [name if name in keys else f"{name}_previous" for name in previous.column_names]
+        )
+        joined = current.join(previous, keys, join_type="full outer")
+        joined = joined.sort_by([(key, "ascending") for key in keys])
+    else:
+        joined = current
+        for name in metrics:
+            joined = joined.append_column(f"{name}_previous", previous[name])
+    columns = {key: joined[key] for key in keys}
+    for name in metrics:
+        now = joined[name].to_numpy(zero_copy_only=False).astype(float)
+        before = joined[f"{name}_previous"].to_numpy(zero_copy_only=False).astype(float)
+        change = np.full(len(now), np.nan)
+        np.divide(now - before, np.abs(before), out=change,
+                  where=~np.isnan(before) & (before != 0) & ~np.isnan(now))
+        columns[name] = joined[name]
+        columns[f"{name}_previous"] = joined[f"{name}_previous"]
+        columns[f"{name}_change"] = pa.array(np.round(change, 4), from_pandas=True)
+    return pa.table(columns)
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Columnar performance warehouse.")
+    parser.add_argument("--root", type=Path, default=WAREHOUSE_DIR,
+                        help="Warehouse directory (default .warehouse/)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sync = sub.add_parser("sync", help="Export changed data from Neo4j")
+    sync.add_argument("--brand", default=BRAND_ID, help=f"Brand (default {BRAND_ID})")
+    sync.add_argument("--all-brands", action="store_true", help="Sync every Droom brand")
+    sync.add_argument("--rebuild", action="store_true",
+                      help="Re-export all Performance months (drops deleted rows)")
+
+    query = sub.add_parser("query", help="Aggregate metrics from the warehouse")
+    query.add_argument("--brand", default=BRAND_ID, help=f"Brand (default {BRAND_ID})")
+    query.add_argument("--days", type=int, default=PERIOD_DAYS[0],
+                       help="Range ending yesterday (ignored with --start)")
+    query.add_argument("--start", type=dt.date.fromisoformat)
+    query.add_argument("--end", type=dt.date.fromisoformat)
+    query.add_argument("--group-by", action="append", default=[],
+                       choices=["date", "campaign_id"] + CAMPAIGN_FIELDS)
+    query.add_argument("--platform", action="append", help="Filter (repeatable)")
+    query.add_argument("--campaign", action="append", help="Filter by campaign id (repeatable)")
+    query.add_argument("--compare", action="store_true",
+                       help="Add previous-period values and relative change")
+    query.add_argument("--csv", type=Path, help="Write the result as CSV")
+    return parser.parse_args()
+
+
+def print_table(table, limit=40):
+    names = table.column_names
+    print("  " + "  ".join(f"{name[:14]:>14}" for name in names))
+    for row in table.slice(0, limit).to_pylist():
+        cells = []
+        for name in names:
+            value = row[name]
+            if isinstance(value, float):
+                value = f"{value:.4f}" if abs(value) < 10 else f"{value:,.2f}"
+            cells.append(f"{'-' if value is None else str(value)[:14]:>14}")
+        print("  " + "  ".join(cells))
+    if table.num_rows > limit:
+        print(f"  ... {table.num_rows - limit} more rows")
+
+
+def run_sync(args, warehouse):
+    require_env()
+    print("=" * 64)
+    print("Droom Marketing Factory - Performance Warehouse Sync")
+    print(f"Brand: {'all brands' if args.all_brands else args.brand}")
+    print(f"Source: {NEO4J_URI}")
+    print(f"Warehouse: {warehouse.root}")
+    print("=" * 64)
+
+    errors = []
+    driver = connect()
+    try:
+        if args.all_brands:
+            with driver.session() as session:
+                brands = sorted(r["brand_id"] for r in session.run(BRANDS_QUERY) if r["brand_id"])
+        else:
+            brands = [args.brand]
+        for brand in brands:
+            started = time.perf_counter()
+            try:
+                summary = warehouse.sync(driver, brand, rebuild=args.rebuild)
+            except Exception as e:
+                print(f"  [FAIL] {brand}: {e}")
+                errors.append(f"{brand}: {e}")
+                continue
+            print(f"  [OK] {brand}: {summary['months']} month partition(s), "
+                  f"{summary['rows']} performance rows, {summary['campaigns']} campaigns, "
+                  f"{summary['content']} content ({time.perf_counter() - started:.2f}s)")
+            if summary["unstamped"]:
+                print(f"  [WARN] {brand}: {summary['unstamped']} Performance node(s) have no "
+                      f"updated_at and are re-exported on every sync")
+    finally:
+        driver.close()
+
+    if errors:
+        print(f"\n  ERRORS ({len(errors)}):")
+        for err in errors:
+            print(f"    {err}")
+        sys.exit(1)
+
+
+def run_query(args, warehouse):
+    end = args.end or dt.date.today() - dt.timedelta(days=1)
+    started = time.perf_counter()
+    if args.compare:
+        days = (end - args.start).days + 1 if args.start else args.days
+        table = warehouse.compare_periods(args.brand, days, end, args.group_by,
+                                          args.platform, args.campaign)
+        label = f"{days} days to {end} vs previous {days} days"
+    else:
+        start = args.start or end - dt.timedelta(days=args.days - 1)
+        table = warehouse.metrics(args.brand, start, end, args.group_by,
+                                  args.platform, args.campaign)
+        label = f"{start} .. {end}"
+    elapsed = (time.perf_counter() - started) * 1000
+
+    print(f"{args.brand}: {label}, {table.num_rows} row(s) in {elapsed:.1f} ms\n")
+    print_table(table)
+    if args.csv:
+        pa_csv.write_csv(table, args.csv)
+        print(f"\n  [OK] Wrote {args.csv}")
+
+
+def main():
+    args = parse_args()
+    warehouse = PerformanceWarehouse(args.root)
+    if args.command == "sync":
+        run_sync(args, warehouse)
+    else:
+        run_query(args, warehouse)
+
+
+if __name__ == "__main__":
+    main()
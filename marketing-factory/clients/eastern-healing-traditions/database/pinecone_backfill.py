@@ -0,0 +1,439 @@
+"""
+Pinecone Backfill for Eastern Healing Traditions
+Droom Marketing Factory
+
+Streams profiles from a JSONL file or from Neo4j :Droom:Content nodes,
+embeds them (through the embedding cache, so unchanged text costs no API
+calls) and upserts them into a droom-*-{brand_id} namespace in fixed-size
+batches of at most 1000 vectors. Upserts run on a bounded pool of
+concurrent requests with exponential-backoff retries (transient and 429
+errors only), and progress is written to a checkpoint file so an
+interrupted run resumes where it stopped: after the last checkpointed id
+for Neo4j (content added meanwhile with a lower id is picked up by the
+next full run, never skipped in this one), or after the checkpointed
+line count for a JSONL file. Memory stays flat: only the batches in
+flight are held.
+
+JSONL input: one object per line with an `id`, the text to embed (field
+given by --text-field, default `semantic_description`) and optionally a
+`metadata` object. Other top-level scalar fields are added to metadata.
+
+Usage:
+    python pinecone_backfill.py --jsonl profiles.jsonl
+    python pinecone_backfill.py --from-neo4j
+    python pinecone_backfill.py --jsonl scenarios.jsonl --namespace scenario-outcomes
+    python pinecone_backfill.py --jsonl profiles.jsonl --restart   # ignore checkpoint
+
+Requires:
+    pip install numpy openai pinecone-client neo4j python-dotenv
+
+Environment variables (loaded from ../../.env or set directly):
+    PINECONE_API_KEY, OPENAI_API_KEY
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD (only with --from-neo4j)
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from pathlib import Path
+
+from embedding_cache import EmbeddingCache
+from init_pinecone import (
+    BRAND_ID,
+    CLIENT_NAMESPACES,
+    INDEX_NAME,
+    PINECONE_API_KEY,
+    SHARED_NAMESPACE,
+    Pinecone,
+    require_env,
+)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Pinecone rejects upserts larger than this (see database-design spec).
+MAX_UPSERT_BATCH = 1000
+DEFAULT_WORKERS = 4
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+
+# Neo4j rows fetched per keyset-paginated page with --from-neo4j.
+NEO4J_PAGE_SIZE = 2000
+
+# Content node properties copied into vector metadata (None values dropped).
+CONTENT_METADATA_FIELDS = [
+    "brand_id", "filename", "media_type", "format", "status",
+    "quality_score", "avg_roas", "total_impressions", "total_spend",
+]
+
+_script_dir = Path(__file__).resolve().parent
+CHECKPOINT_DIR = _script_dir / ".." / ".." / ".." / ".cache" / "backfill"
+
+# ---------------------------------------------------------------------------
+# Sources
+# ---------------------------------------------------------------------------
+
+
+def clean_metadata(metadata):
+    """Drop values Pinecone metadata cannot hold (None, nested objects)."""
+    cleaned = {}
+    for key, value in metadata.items():
+        if value is None or isinstance(value, dict):
+            continue
+        if isinstance(value, list):
+            value = [str(v) for v in value]
+        cleaned[key] = value
+    return cleaned
+
+
+def read_jsonl(path, text_field):
+    """Yield (id, text, metadata) from a JSONL file, skipping blank lines."""
+    with open(path) as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            text = record.get(text_field)
+            if not record.get("id") or not text:
+                print(f"  [WARN] line {line_no}: missing id or {text_field}, skipped")
+                continue
+            metadata = {
+                k: v for k, v in record.items()
+                if k not in ("id", "metadata") and not isinstance(v, (dict, list))
+            }
+            metadata.update(record.get("metadata") or {})
+            metadata.setdefault("brand_id", BRAND_ID)
+            yield record["id"], text, clean_metadata(metadata)
+
+
+def read_neo4j_content(brand_id, after="", page_size=NEO4J_PAGE_SIZE, driver=None):
+    """Yield (id, semantic_description, metadata) for profiled Content nodes with id > `after`.
+
+    Pages by id (keyset pagination on the droom_content_id_unique index)
+    so the query cost stays flat however far into the catalog we are.
+    Opens (and closes) its own driver unless one is passed.
+    """
+    from init_neo4j import connect
+
+    fields = ", ".join(f"{name}: c.{name}" for name in CONTENT_METADATA_FIELDS)
+    cypher = (
+        "MATCH (c:Droom:Content) "
+        "WHERE c.brand_id = $brand_id AND c.id > $after "
+        "AND c.semantic_description IS NOT NULL "
+        f"RETURN c.id AS id, c.semantic_description AS text, {{{fields}}} AS metadata "
+        "ORDER BY c.id LIMIT $limit"
+    )
+    own_driver = driver is None
+    driver = driver or connect()
+    try:
+        with driver.session() as session:
+            while True:
+                records = list(session.run(
+                    cypher, brand_id=brand_id, after=after, limit=page_size
+                ))
+                for record in records:
+                    metadata = dict(record["metadata"])
+                    metadata["content_id"] = record["id"]
+                    yield record["id"], record["text"], clean_metadata(metadata)
+                if len(records) < page_size:
+                    break
+                after = records[-1]["id"]
+    finally:
+        if own_driver:
+            driver.close()
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+# ---------------------------------------------------------------------------
+# Checkpoint
+# ---------------------------------------------------------------------------
+
+
+class Checkpoint:
+    """Tracks the leading records that are durably upserted.
+
+    Batches finish out of order, so the checkpoint only advances over a
+    contiguous prefix of completed batches, recording its length and the
+    id of its last record; on resume the reader starts after that id (or
+    skips that many lines of a file) and everything later is re-sent
+    (upserts are idempotent).
+    """
+
+    def __init__(self, path, source, namespace):
+        self.path = Path(path)
+        self.source = source
+        self.namespace = namespace
+        self.completed_records = 0
+        self.last_id = None
+        self._done = {}
+        self._next_seq = 0
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self.path.exists():
+            with open(self.path) as f:
+                state = json.load(f)
+            if state.get("source") == self.source and state.get("namespace") == self.namespace:
+                self.completed_records = state["completed_records"]
+                self.last_id = state.get("last_id")
+        return self.completed_records
+
+    def mark_done(self, seq, size, last_id):
+        with self._lock:
+            self._done[seq] = (size, last_id)
+            advanced = False
+            while self._next_seq in self._done:
+                size, self.last_id = self._done.pop(self._next_seq)
+                self.completed_records += size
+                self._next_seq += 1
+                advanced = True
+            if advanced:
+                self._save()
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({
+                "source": self.source,
+                "namespace": self.namespace,
+                "completed_records": self.completed_records,
+                "last_id": self.last_id,
+                "updated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            }, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.path.exists():
+            self.path.unlink()
+
+
+# ---------------------------------------------------------------------------
+# Upsert
+# ---------------------------------------------------------------------------
+
+
+# Transport errors (urllib3 / the Pinecone SDK) that do not subclass OSError.
+TRANSIENT_ERRORS = {"ProtocolError", "MaxRetryError", "NewConnectionError",
+                    "ReadTimeoutError", "ServiceException"}
+
+
+def is_transient(error):
+    """True for errors worth retrying: 429, 5xx and connection failures."""
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return (isinstance(error, (ConnectionError, TimeoutError, OSError))
+            or type(error).__name__ in TRANSIENT_ERRORS)
+
+
+def upsert_with_retry(index, vectors, namespace, max_retries=MAX_RETRIES):
+    """Upsert one batch, retrying transient errors with exponential backoff and jitter.
+
+    Anything else (4xx, validation errors) is raised on the first attempt.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            index.upsert(vectors=vectors, namespace=namespace)
+            return attempt
+        except Exception as e:
+            if attempt == max_retries or not is_transient(e):
+                raise
+            delay = min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)
+            delay *= 0.5 + random.random() / 2
+            print(f"  [RETRY] {len(vectors)} vectors in {delay:.1f}s "
+                  f"(attempt {attempt + 1}/{max_retries}): {e}")
+            time.sleep(delay)
+
+
+def backfill(records, index, namespace, cache, checkpoint,
+             batch_size=MAX_UPSERT_BATCH, workers=DEFAULT_WORKERS):
+    """Embed and upsert `records` (id, text, metadata) in fixed-size batches.
+
+    At most `workers` upserts are in flight; the reader blocks until one
+    finishes, which bounds memory to roughly `workers + 1` batches.
+    """
+    summary = {"vectors": 0, "batches": 0, "retries": 0, "errors": []}
+    started = time.perf_counter()
+    in_flight = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+
+        def drain(block_until):
+            done, _ = wait(in_flight, return_when=block_until)
+            for future in done:
+                seq, size, last_id = in_flight.pop(future)
+                try:
+                    summary["retries"] += future.result()
+                except Exception as e:
+                    msg = f"  [FAIL] batch {seq} ({size} vectors): {e}"
+                    print(msg)
+                    summary["errors"].append(msg)
+                    continue
+                checkpoint.mark_done(seq, size, last_id)
+                summary["vectors"] += size
+                summary["batches"] += 1
+                rate = summary["vectors"] / (time.perf_counter() - started)
+                print(f"  [OK] batch {seq}: {size} vectors "
+                      f"({checkpoint.completed_records} checkpointed, {rate:.0f}/s)")
+
+        for seq, batch in enumerate(batched(records, batch_size)):
+            ids, texts, metadata = zip(*batch)
+            embeddings = cache.embed(list(texts))
+            vectors = [
+                {"id": vid, "values": emb.tolist(), "metadata": meta}
+                for vid, emb, meta in zip(ids, embeddings, metadata)
+            ]
+            while len(in_flight) >= workers:
+                drain(FIRST_COMPLETED)
+            future = pool.submit(upsert_with_retry, index, vectors, namespace)
+            in_flight[future] = (seq, len(vectors), ids[-1])
+        while in_flight:
+            drain(FIRST_COMPLETED)
+
+    summary["seconds"] = time.perf_counter() - started
+    summary["completed_records"] = checkpoint.completed_records
+    return summary
+
+
+def skip_completed(records, checkpoint):
+    """Drop the checkpointed prefix of a file-backed record stream.
+
+    The prefix must end at the checkpoint's last id; a file edited since
+    the checkpoint was written raises ValueError instead of resuming at
+    the wrong record.
+    """
+    records = iter(records)
+    last = None
+    for _ in range(checkpoint.completed_records):
+        last = next(records, None)
+        if last is None:
+            break
+    # Checkpoints written before last_id was recorded resume by position.
+    if checkpoint.last_id is not None and (last is None or last[0] != checkpoint.last_id):
+        raise ValueError(
+            f"record {checkpoint.completed_records} is {last[0] if last else 'past the end'}, "
+            f"checkpoint expected {checkpoint.last_id}; the file changed (use --restart)"
+        )
+    return records
+
+
+def resolve_namespace(name):
+    """Accept a full droom-* namespace or a type such as `content-essence`."""
+    known = [ns["name"] for ns in CLIENT_NAMESPACES] + [SHARED_NAMESPACE["name"]]
+    if name in known:
+        return name
+    candidate = f"droom-{name}-{BRAND_ID}"
+    if candidate in known:
+        return candidate
+    print(f"ERROR: Unknown namespace '{name}'. Choose one of:")
+    for ns in known:
+        print(f"  {ns}")
+    sys.exit(1)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Backfill a Droom Pinecone namespace.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--jsonl", type=Path, help="JSONL file of profiles")
+    source.add_argument("--from-neo4j", action="store_true",
+                        help="Read :Droom:Content nodes for this brand")
+    parser.add_argument("--namespace", default="content-essence",
+                        help="Namespace type or full name (default content-essence)")
+    parser.add_argument("--text-field", default="semantic_description",
+                        help="JSONL field to embed (default semantic_description)")
+    parser.add_argument("--batch-size", type=int, default=MAX_UPSERT_BATCH,
+                        help=f"Vectors per upsert (max {MAX_UPSERT_BATCH})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Concurrent upsert requests (default {DEFAULT_WORKERS})")
+    parser.add_argument("--checkpoint", type=Path, help="Checkpoint file path")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore any existing checkpoint")
+    args = parser.parse_args()
+    if not 1 <= args.batch_size <= MAX_UPSERT_BATCH:
+        parser.error(f"--batch-size must be between 1 and {MAX_UPSERT_BATCH}")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    return args
+
+
+def main():
+    args = parse_args()
+    require_env()
+    namespace = resolve_namespace(args.namespace)
+    source = str(args.jsonl.resolve()) if args.jsonl else f"neo4j:{BRAND_ID}"
+    checkpoint_path = args.checkpoint or CHECKPOINT_DIR / f"{namespace}.json"
+
+    print("=" * 64)
+    print("Droom Marketing Factory - Pinecone Backfill")
+    print(f"Source: {source}")
+    print(f"Target: {INDEX_NAME} / {namespace}")
+    print(f"Batch size: {args.batch_size}, concurrent upserts: {args.workers}")
+    print("=" * 64)
+
+    checkpoint = Checkpoint(checkpoint_path, source, namespace)
+    if args.restart:
+        checkpoint.clear()
+    elif checkpoint.load():
+        print(f"  Resuming after {checkpoint.completed_records} records "
+              f"(last id {checkpoint.last_id}) from {checkpoint.path}")
+
+    if args.jsonl:
+        try:
+            records = skip_completed(read_jsonl(args.jsonl, args.text_field), checkpoint)
+        except ValueError as e:
+            print(f"ERROR: Cannot resume: {e}")
+            sys.exit(1)
+    else:
+        records = read_neo4j_content(BRAND_ID, after=checkpoint.last_id or "")
+
+    index = Pinecone(api_key=PINECONE_API_KEY).Index(INDEX_NAME)
+    cache = EmbeddingCache()
+    try:
+        summary = backfill(
+            records, index, namespace, cache, checkpoint,
+            batch_size=args.batch_size, workers=args.workers,
+        )
+        stats = cache.stats()
+    finally:
+        cache.close()
+
+    print("\n" + "=" * 64)
+    print("BACKFILL SUMMARY")
+    print("=" * 64)
+    print(f"  Vectors upserted this run: {summary['vectors']} "
+          f"in {summary['batches']} batches")
+    print(f"  Records checkpointed:      {summary['completed_records']}")
+    print(f"  Retries:                   {summary['retries']}")
+    print(f"  Embedding API calls saved: {stats['memory_hits'] + stats['disk_hits']} "
+          f"of {stats['memory_hits'] + stats['disk_hits'] + stats['misses']}")
+    print(f"  Elapsed:                   {summary['seconds']:.1f}s")
+
+    if summary["errors"]:
+        print(f"\n  ERRORS ({len(summary['errors'])}):")
+        for err in summary["errors"]:
+            print(f"    {err}")
+        print(f"\n  Re-run to resume from {checkpoint_path}")
+        sys.exit(1)
+    else:
+        checkpoint.clear()
+        print("\n  Backfill complete.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Pinecone Namespace Snapshots for Eastern Healing Traditions
+Droom Marketing Factory
+
+Exports Droom namespaces to a compact on-disk snapshot and restores them.
+Export pages through the namespace's ids, fetches vectors in batches
+(a few fetches in flight at once) and streams them to disk, so memory
+stays flat regardless of namespace size. Import streams the snapshot back
+in 1000-vector upserts over a bounded pool of concurrent requests.
+
+Snapshot layout (one directory per namespace):
+
+    manifest.json        namespace, index, dimension, count, columns
+    vectors.npy          float32 matrix (count x dimension), mmap-friendly
+    ids.txt              one vector id per line, row order of vectors.npy
+    metadata/<key>.jsonl one JSON value per line per metadata key (null if unset)
+
+Usage:
+    python pinecone_snapshot.py export                       # all client namespaces
+    python pinecone_snapshot.py export --namespace content-essence
+    python pinecone_snapshot.py import <snapshot-dir>
+    python pinecone_snapshot.py import <snapshot-dir> --namespace content-essence
+
+    # Analytics: load a namespace with a single mmap
+    from pinecone_snapshot import load_snapshot
+    ids, vectors, metadata = load_snapshot("<snapshot-dir>")
+
+Requires:
+    pip install numpy pinecone-client python-dotenv
+
+Environment variables (loaded from ../../.env or set directly):
+    PINECONE_API_KEY
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+
+from init_pinecone import (
+    CLIENT_NAMESPACES,
+    EXPECTED_DIMENSIONS,
+    INDEX_NAME,
+    PINECONE_API_KEY,
+    Pinecone,
+    require_env,
+)
+from pinecone_backfill import (
+    DEFAULT_WORKERS,
+    MAX_UPSERT_BATCH,
+    batched,
+    resolve_namespace,
+    upsert_with_retry,
+)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Ids per list page and per fetch request.
+LIST_PAGE_SIZE = 100
+FETCH_BATCH_SIZE = 100
+FETCH_WORKERS = 4
+
+# Fixed .npy header size so the row count can be patched in after streaming.
+NPY_HEADER_BYTES = 128
+
+_script_dir = Path(__file__).resolve().parent
+SNAPSHOT_DIR = _script_dir / ".." / ".." / ".." / ".snapshots"
+
+# ---------------------------------------------------------------------------
+# Format helpers
+# ---------------------------------------------------------------------------
+
+
+def npy_header(rows, dimension):
+    """A version 1.0 .npy header for a float32 (rows, dimension) matrix."""
+    header = repr({
+        "descr": "<f4", "fortran_order": False, "shape": (rows, dimension),
+    }).encode("latin1")
+    prefix = b"\x93NUMPY\x01\x00"
+    body_len = NPY_HEADER_BYTES - len(prefix) - 2
+    header = header.ljust(body_len - 1) + b"\n"
+    return prefix + body_len.to_bytes(2, "little") + header
+
+
+def page_ids(page):
+    """Ids from one list() page (plain list or a ListResponse)."""
+    if hasattr(page, "vectors"):
+        return [item.id if hasattr(item, "id") else item["id"] for item in page.vectors]
+    return list(page)
+
+
+def load_snapshot(directory):
+    """Return (ids, vectors, metadata) with vectors memory-mapped.
+
+    `metadata` maps each column name to a list of values in row order.
+    """
+    directory = Path(directory)
+    with open(directory / "manifest.json") as f:
+        manifest = json.load(f)
+    vectors = np.load(directory / "vectors.npy", mmap_mode="r")
+    with open(directory / "ids.txt") as f:
+        ids = f.read().splitlines()
+    metadata = {}
+    for column in manifest["columns"]:
+        with open(directory / "metadata" / f"{column}.jsonl") as f:
+            metadata[column] = [json.loads(line) for line in f]
+    return ids, vectors, metadata
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+
+def iter_fetched(index, namespace, workers=FETCH_WORKERS):
+    """Yield (id, values, metadata) for every vector, in list order.
+
+    Keeps at most `workers` fetch requests in flight ahead of the consumer.
+    """
+    def ids():
+        for page in index.list(namespace=namespace, limit=LIST_PAGE_SIZE):
+            yield from page_ids(page)
+
+    def fetch(batch):
+        response = index.fetch(ids=batch, namespace=namespace)
+        return batch, response.vectors
+
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch in batched(ids(), FETCH_BATCH_SIZE):
+            pending.append(pool.submit(fetch, batch))
+            if len(pending) >= workers:
+                yield from _fetched_rows(pending.popleft().result())
+        while pending:
+            yield from _fetched_rows(pending.popleft().result())
+
+
+def _fetched_rows(result):
+    batch, vectors = result
+    for vid in batch:
+        vector = vectors.get(vid)
+        if vector is None:
+            continue  # deleted between list and fetch
+        yield vid, vector.values, dict(vector.metadata or {})
+
+
+def export_namespace(index, namespace, out_dir, dimension=EXPECTED_DIMENSIONS):
+    """Stream one namespace into a snapshot directory. Returns the row count."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / "metadata").mkdir(exist_ok=True)
+    columns = {}
+    count = 0
+    with open(out_dir / "vectors.npy", "wb") as vec_file, \
+            open(out_dir / "ids.txt", "w") as id_file:
+        vec_file.write(npy_header(0, dimension))
+        for vid, values, metadata in iter_fetched(index, namespace):
+            vec_file.write(np.asarray(values, dtype="<f4").tobytes())
+            id_file.write(vid + "\n")
+            for key in metadata.keys() - columns.keys():
+                columns[key] = open(out_dir / "metadata" / f"{key}.jsonl", "w")
+                columns[key].write("null\n" * count)
+            for key, handle in columns.items():
+                handle.write(json.dumps(metadata.get(key)) + "\n")
+            count += 1
+            if count % 10000 == 0:
+                print(f"  [..] {namespace}: {count} vectors")
+        vec_file.seek(0)
+        vec_file.write(npy_header(count, dimension))
+    for handle in columns.values():
+        handle.close()
+
+    with open(out_dir / "manifest.json", "w") as f:
+        json.dump({
+            "index": INDEX_NAME,
+            "namespace": namespace,
+            "dimension": dimension,
+            "count": count,
+            "columns": sorted(columns),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }, f, indent=2)
+    return count
+
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+
+
+def iter_snapshot(directory, manifest):
+    """Yield upsert-ready vector dicts from a snapshot, streaming every file."""
+    vectors = np.load(directory / "vectors.npy", mmap_mode="r")
+    handles = {
+        column: open(directory / "metadata" / f"{column}.jsonl")
+        for column in manifest["columns"]
+    }
+    try:
+        with open(directory / "ids.txt") as id_file:
+            for row, line in enumerate(id_file):
+                metadata = {}
+                for column, handle in handles.items():
+                    value = json.loads(handle.readline())
+                    if value is not None:
+                        metadata[column] = value
+                yield {
+                    "id": line.rstrip("\n"),
+                    "values": vectors[row].tolist(),
+                    "metadata": metadata,
+                }
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+
+def import_snapshot(index, directory, namespace, workers=DEFAULT_WORKERS):
+    """Restore a snapshot into `namespace` in bulk. Returns (count, errors)."""
+    with open(directory / "manifest.json") as f:
+        manifest = json.load(f)
+    restored = 0
+    errors = []
+    in_flight = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+
+        def drain():
+            nonlocal restored
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                size = in_flight.pop(future)
+                try:
+                    future.result()
+                    restored += size
+                except Exception as e:
+                    msg = f"  [FAIL] {size} vectors: {e}"
+                    print(msg)
+                    errors.append(msg)
+
+        for batch in batched(iter_snapshot(directory, manifest), MAX_UPSERT_BATCH):
+            while len(in_flight) >= workers:
+                drain()
+            in_flight[pool.submit(upsert_with_retry, index, batch, namespace)] = len(batch)
+        while in_flight:
+            drain()
+    return restored, errors
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Snapshot Droom Pinecone namespaces.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="Write namespaces to snapshot directories")
+    export.add_argument("--namespace", action="append",
+                        help="Namespace type or full name (repeatable; default all client namespaces)")
+    export.add_argument("--out", type=Path, help=f"Output root (default {SNAPSHOT_DIR.name}/)")
+    restore = sub.add_parser("import", help="Restore a snapshot directory")
+    restore.add_argument("snapshot", type=Path)
+    restore.add_argument("--namespace", help="Target namespace (default: the snapshot's)")
+    restore.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    require_env()
+    index = Pinecone(api_key=PINECONE_API_KEY).Index(INDEX_NAME)
+
+    print("=" * 64)
+    print(f"Droom Marketing Factory - Pinecone Snapshot ({args.command})")
+    print(f"Index: {INDEX_NAME}")
+    print("=" * 64)
+
+    errors = []
+    started = time.perf_counter()
+    if args.command == "export":
+        if args.namespace:
+            namespaces = [resolve_namespace(ns) for ns in args.namespace]
+        else:
+            namespaces = [ns["name"] for ns in CLIENT_NAMESPACES]
+        stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+        root = (args.out or SNAPSHOT_DIR) / stamp
+        for namespace in namespaces:
+            try:
+                count = export_namespace(index, namespace, root / namespace)
+                print(f"  [OK] {namespace}: {count} vectors -> {root / namespace}")
+            except Exception as e:
+                msg = f"  [FAIL] {namespace}: {e}"
+                print(msg)
+                errors.append(msg)
+    else:
+        with open(args.snapshot / "manifest.json") as f:
+            manifest = json.load(f)
+        namespace = resolve_namespace(args.namespace or manifest["namespace"])
+        restored, errors = import_snapshot(index, args.snapshot, namespace, args.workers)
+        print(f"  [{'FAIL' if errors else 'OK'}] {namespace}: "
+              f"{restored}/{manifest['count']} vectors restored")
+
+    print(f"\n  Elapsed: {time.perf_counter() - started:.1f}s")
+    if errors:
+        print(f"\n  ERRORS ({len(errors)}):")
+        for err in errors:
+            print(f"    {err}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
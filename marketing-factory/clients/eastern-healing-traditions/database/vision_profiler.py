@@ -0,0 +1,892 @@
+"""
+Concurrent Claude Vision Profiler for Eastern Healing Traditions
+Droom Marketing Factory
+
+Bulk replacement for the content-ingestion workflow's one-call-per-upload
+Claude Vision Analysis node. Takes the manifest.json written by
+content_fetch.py as its queue and profiles every asset not profiled yet:
+
+    limiter     token buckets for requests, input tokens and output tokens
+                per minute, refilled continuously; input cost is the prompt
+                plus the manifest's image-token estimate, output cost the
+                running mean of real usage, settled against the response
+    concurrency AIMD window: +1 per window of successes up to --concurrency,
+                halved on a 429 (at most once per cooldown), and the
+                buckets pause for the server's retry-after
+    validation  the reply's JSON must match the profile schema (the prompt's
+                enumerations, i.e. the seeded shared attributes); an
+                invalid reply is re-asked SCHEMA_RETRIES times, then failed
+                rather than stored as a placeholder profile
+    writer      one thread batches valid profiles into ingest_content's
+                Neo4j transactions and Pinecone content-essence upserts
+                (embeddings through the embedding cache)
+
+Progress is kept next to the manifest: profiles.jsonl caches every valid
+profile (a re-run never pays for the same Vision call twice) and
+written.txt lists the ids stored in Neo4j and Pinecone, so an interrupted
+run resumes with whatever is left.
+
+`stub` serves a local stand-in for /v1/messages that enforces its own
+rate limits and answers with generated profiles; `bench` runs the pool
+against an in-process stub with synthetic assets to measure throughput
+without the live API.
+
+Usage:
+    python vision_profiler.py run .cache/prepared/eht-20260301T120000/manifest.json
+    python vision_profiler.py run manifest.json --concurrency 32 --rpm 1000 --itpm 80000
+    python vision_profiler.py run manifest.json --no-write
+    python vision_profiler.py stub --port 8788 --stub-rpm 500
+    python vision_profiler.py run manifest.json --base-url http://127.0.0.1:8788 --no-write
+    python vision_profiler.py bench --assets 300 --stub-rpm 600 --rpm 600
+
+Requires:
+    pip install neo4j numpy openai pinecone-client python-dotenv
+
+Environment variables (loaded from ../../.env or set directly):
+    ANTHROPIC_API_KEY (not needed against the stub)
+    ANTHROPIC_BASE_URL (optional, default https://api.anthropic.com)
+    DROOM_VISION_RPM, DROOM_VISION_ITPM, DROOM_VISION_OTPM (optional
+        per-minute limits of the API key's tier, default 50 / 30000 / 8000)
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, PINECONE_API_KEY, OPENAI_API_KEY
+        (only when writing profiles)
+"""
+
+import argparse
+import base64
+import json
+import os
+import queue
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from init_neo4j import BRAND_ID, SHARED_ATTRIBUTES
+from ingest_content import content_id, content_row, ingest_profiles, new_summary
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+API_BASE_URL = os.environ.get("ANTHROPIC_BASE_URL", "https://api.anthropic.com")
+API_VERSION = "2023-06-01"
+MODEL = "claude-sonnet-4-20250514"
+MAX_TOKENS = 2000
+REQUEST_TIMEOUT = 90
+
+# Per-minute limits of the API key's tier.
+RPM = int(os.environ.get("DROOM_VISION_RPM", "50"))
+ITPM = int(os.environ.get("DROOM_VISION_ITPM", "30000"))
+OTPM = int(os.environ.get("DROOM_VISION_OTPM", "8000"))
+DEFAULT_CONCURRENCY = 8
+
+# Output reservation before any response has been seen.
+INITIAL_OUTPUT_ESTIMATE = 600
+OUTPUT_ESTIMATE_WEIGHT = 0.2
+# System prompt and instruction text, in tokens.
+PROMPT_TOKENS = 350
+# Minimum time between two cuts, so one burst of 429s halves the
+# concurrency window and the limiter's rates once.
+THROTTLE_COOLDOWN = 5.0
+# Slowest fraction of the configured limits after cuts, and the fraction
+# each success gives back.
+RATE_FLOOR = 0.05
+RATE_RECOVERY = 0.01
+
+MAX_RETRIES = 6
+# 429s are backpressure, not failures; they get a separate, larger budget.
+MAX_THROTTLED = 30
+SCHEMA_RETRIES = 1
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+WRITE_BATCH_SIZE = 50
+FLUSH_SECONDS = 10.0
+
+MIN_DESCRIPTION_WORDS = 50
+
+SYSTEM_PROMPT = (
+    "You are a content analyst for Eastern Healing Traditions, a TCM clinic. "
+    "Analyze the uploaded content and return JSON with these fields: "
+    "{semantic_description (150-200 word narrative), "
+    "tones (array of {name, confidence} from: " + ", ".join(SHARED_ATTRIBUTES["Tone"]) + "), "
+    "aesthetics (array of {name, confidence} from: "
+    + ", ".join(SHARED_ATTRIBUTES["Aesthetic"]) + "), "
+    "color_palette (one of: " + ", ".join(SHARED_ATTRIBUTES["ColorPalette"]) + "), "
+    "composition (one of: " + ", ".join(SHARED_ATTRIBUTES["Composition"]) + "), "
+    "narrative_elements (array from: " + ", ".join(SHARED_ATTRIBUTES["NarrativeElement"]) + "), "
+    "quality_score (0-100)}"
+)
+
+# ---------------------------------------------------------------------------
+# Rate limiting
+# ---------------------------------------------------------------------------
+
+
+class TokenBucket:
+    """`per_minute` units refilled continuously, holding at most a minute's worth.
+
+    The level may go negative when a settled cost exceeds its reservation;
+    the debt is paid back by refill before anything else is taken.
+    """
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        # A cost above capacity waits for a full bucket instead of forever.
+        needed = min(amount, self.capacity)
+        return 0.0 if self.level >= needed else (needed - self.level) / self.rate
+
+
+class RateLimiter:
+    """Requests, input-token and output-token buckets taken together.
+
+    `scale` slows every refill rate below the configured limits when the
+    server throttles anyway (another client on the same key, a lower tier
+    than configured) and creeps back up as requests succeed.
+    """
+
+    def __init__(self, rpm=RPM, itpm=ITPM, otpm=OTPM):
+        self.buckets = {
+            "requests": TokenBucket(rpm),
+            "input_tokens": TokenBucket(itpm),
+            "output_tokens": TokenBucket(otpm),
+        }
+        self.lock = threading.Lock()
+        self.blocked_until = 0.0
+        self.waited = 0.0
+        self.scale = 1.0
+
+    def acquire(self, costs):
+        """Block until every bucket covers its cost, then take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                for bucket in self.buckets.values():
+                    bucket.refill(now)
+                wait = max([self.blocked_until - now] +
+                           [self.buckets[k].wait_time(v) for k, v in costs.items()])
+                if wait <= 0:
+                    for k, v in costs.items():
+                        self.buckets[k].level -= v
+                    return
+                self.waited += wait
+            time.sleep(wait)
+
+    def settle(self, reserved, actual):
+        """Charge or refund the difference between a reservation and real usage."""
+        with self.lock:
+            for k, v in actual.items():
+                self.buckets[k].level -= v - reserved.get(k, 0)
+
+    def block(self, seconds):
+        """Pause every request for `seconds` and restart from empty buckets."""
+        with self.lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            for bucket in self.buckets.values():
+                bucket.refill(now)
+                bucket.level = min(bucket.level, 0.0)
+
+    def _rescale(self, scale):
+        now = time.monotonic()
+        self.scale = scale
+        for bucket in self.buckets.values():
+            bucket.refill(now)
+            bucket.rate = bucket.per_minute * scale / 60.0
+
+    def slow_down(self):
+        with self.lock:
+            self._rescale(max(RATE_FLOOR, self.scale / 2))
+
+    def speed_up(self):
+        with self.lock:
+            if self.scale < 1.0:
+                self._rescale(min(1.0, self.scale + RATE_RECOVERY))
+
+
+class AdaptiveConcurrency:
+    """AIMD cap on requests in flight, between 1 and `maximum`."""
+
+    def __init__(self, maximum):
+        self.maximum = maximum
+        self.limit = float(maximum)
+        self.active = 0
+        self.cond = threading.Condition()
+        self.last_cut = 0.0
+        self.cuts = 0
+
+    def __enter__(self):
+        with self.cond:
+            while self.active >= int(self.limit):
+                self.cond.wait()
+            self.active += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self.cond:
+            self.active -= 1
+            self.cond.notify_all()
+
+    def success(self):
+        with self.cond:
+            # +1 after a full window of successes.
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self.cond.notify_all()
+
+    def throttled(self):
+        """Halve the window unless it was cut within the cooldown; True if cut."""
+        with self.cond:
+            now = time.monotonic()
+            if now - self.last_cut < THROTTLE_COOLDOWN:
+                return False
+            self.limit = max(1.0, self.limit / 2)
+            self.last_cut = now
+            self.cuts += 1
+            return True
+
+
+# ---------------------------------------------------------------------------
+# Profile schema
+# ---------------------------------------------------------------------------
+
+
+def _name(value):
+    return str(value).strip().lower()
+
+
+def _weighted(values, label, field, errors):
+    if not isinstance(values, list) or not values:
+        errors.append(f"{field}: expected a non-empty array")
+        return []
+    cleaned = []
+    for value in values:
+        if not isinstance(value, dict):
+            errors.append(f"{field}: {value!r} is not {{name, confidence}}")
+            continue
+        name, confidence = _name(value.get("name")), value.get("confidence")
+        if name not in SHARED_ATTRIBUTES[label]:
+            errors.append(f"{field}: unknown value {name!r}")
+        elif not isinstance(confidence, (int, float)) or not 0 <= confidence <= 1:
+            errors.append(f"{field}: confidence of {name!r} must be 0-1")
+        else:
+            cleaned.append({"name": name, "confidence": float(confidence)})
+    return cleaned
+
+
+def validate_profile(analysis):
+    """Return (normalized analysis, [problems]); valid when the list is empty."""
+    if not isinstance(analysis, dict):
+        return None, ["reply is not a JSON object"]
+    errors = []
+    description = analysis.get("semantic_description")
+    if not isinstance(description, str) or len(description.split()) < MIN_DESCRIPTION_WORDS:
+        errors.append(f"semantic_description: expected at least {MIN_DESCRIPTION_WORDS} words")
+    profile = {
+        "semantic_description": description,
+        "tones": _weighted(analysis.get("tones"), "Tone", "tones", errors),
+        "aesthetics": _weighted(analysis.get("aesthetics"), "Aesthetic", "aesthetics", errors),
+    }
+    for field, label in (("color_palette", "ColorPalette"), ("composition", "Composition")):
+        value = _name(analysis.get(field))
+        if value not in SHARED_ATTRIBUTES[label]:
+            errors.append(f"{field}: unknown value {value!r}")
+        profile[field] = value
+    elements = analysis.get("narrative_elements")
+    if not isinstance(elements, list):
+        errors.append("narrative_elements: expected an array")
+        elements = []
+    profile["narrative_elements"] = [_name(v) for v in elements]
+    unknown = [v for v in profile["narrative_elements"]
+               if v not in SHARED_ATTRIBUTES["NarrativeElement"]]
+    if unknown:
+        errors.append(f"narrative_elements: unknown values {unknown}")
+    score = analysis.get("quality_score")
+    if isinstance(score, bool) or not isinstance(score, (int, float)) or not 0 <= score <= 100:
+        errors.append("quality_score: expected a number 0-100")
+    profile["quality_score"] = score
+    return profile, errors
+
+
+def parse_reply(text):
+    """The JSON object in a reply, fenced or bare, as the workflow parses it."""
+    match = re.search(r"```json\n?([\s\S]*?)\n?```", text) or re.search(r"\{[\s\S]*\}", text)
+    if match:
+        text = match.group(match.lastindex or 0)
+    return json.loads(text)
+
+
+# ---------------------------------------------------------------------------
+# Vision requests
+# ---------------------------------------------------------------------------
+
+
+class ProfileError(Exception):
+    pass
+
+
+class VisionProfiler:
+    """Profiles manifest entries under the shared limiter and concurrency window."""
+
+    def __init__(self, root, limiter, concurrency, base_url=API_BASE_URL, api_key=None):
+        self.root = Path(root)
+        self.limiter = limiter
+        self.concurrency = concurrency
+        self.url = base_url.rstrip("/") + "/v1/messages"
+        self.api_key = api_key or ""
+        self.output_estimate = float(INITIAL_OUTPUT_ESTIMATE)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0, "retries": 0, "invalid": 0,
+                      "input_tokens": 0, "output_tokens": 0}
+
+    def _count(self, **deltas):
+        with self.lock:
+            for k, v in deltas.items():
+                self.stats[k] += v
+
+    def request_body(self, entry):
+        images = [
+            {"type": "image", "source": {
+                "type": "base64", "media_type": "image/jpeg",
+                "data": base64.b64encode((self.root / frame).read_bytes()).decode("ascii"),
+            }}
+            for frame in entry["frames"]
+        ]
+        filename = entry["key"].rsplit("/", 1)[-1]
+        text = ("Analyze this content for Eastern Healing Traditions "
+                f"(TCM clinic in Grayslake, IL). File: {filename}")
+        if entry["media_type"] == "video":
+            text += (f". The images are {len(images)} keyframes of the video in order; "
+                     "profile the video as a whole.")
+        return json.dumps({
+            "model": MODEL,
+            "max_tokens": MAX_TOKENS,
+            "system": SYSTEM_PROMPT,
+            "messages": [{"role": "user", "content": images + [{"type": "text", "text": text}]}],
+        }).encode("utf-8")
+
+    def _post(self, body):
+        request = urllib.request.Request(self.url, data=body, method="POST", headers={
+            "x-api-key": self.api_key,
+            "anthropic-version": API_VERSION,
+            "content-type": "application/json",
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+
+    def profile(self, entry):
+        """Return (analysis, usage) for one manifest entry or raise ProfileError."""
+        body = self.request_body(entry)
+        input_cost = PROMPT_TOKENS + entry.get("vision_tokens", 0)
+        invalid = throttled = failed = 0
+        while True:
+            reserved = {"requests": 1, "input_tokens": input_cost,
+                        "output_tokens": round(self.output_estimate)}
+            self.limiter.acquire(reserved)
+            started = time.monotonic()
+            try:
+                with self.concurrency:
+                    status, headers, payload = self._post(body)
+            except (urllib.error.URLError, OSError) as e:
+                status, headers, payload = None, {}, str(e).encode()
+            self._count(requests=1)
+
+            if status == 200:
+                reply = json.loads(payload)
+                usage = reply.get("usage", {})
+                actual = {"input_tokens": usage.get("input_tokens", input_cost),
+                          "output_tokens": usage.get("output_tokens", 0)}
+                self.limiter.settle(reserved, actual)
+                self._count(**actual)
+                with self.lock:
+                    self.output_estimate += OUTPUT_ESTIMATE_WEIGHT * (
+                        actual["output_tokens"] - self.output_estimate)
+                self.concurrency.success()
+                self.limiter.speed_up()
+                text = "".join(block.get("text", "") for block in reply.get("content", []))
+                try:
+                    analysis, problems = validate_profile(parse_reply(text))
+                except (ValueError, AttributeError) as e:
+                    problems = [f"reply is not JSON: {e}"]
+                if not problems:
+                    return analysis, {**actual, "seconds": time.monotonic() - started}
+                self._count(invalid=1)
+                invalid += 1
+                if invalid > SCHEMA_RETRIES:
+                    raise ProfileError("invalid profile: " + "; ".join(problems[:3]))
+                continue
+
+            # Nothing was generated; hand the output reservation back.
+            self.limiter.settle(reserved, {"output_tokens": 0})
+            if status == 429:
+                throttled += 1
+                self._count(throttled=1)
+                if throttled > MAX_THROTTLED:
+                    raise ProfileError(f"still rate limited after {throttled} attempts")
+                if self.concurrency.throttled():
+                    self.limiter.slow_down()
+                retry_after = headers.get("retry-after")
+                self.limiter.block(float(retry_after) if retry_after else BACKOFF_BASE)
+            elif status is None or status == 529 or status >= 500:
+                failed += 1
+                if failed > MAX_RETRIES:
+                    raise ProfileError(f"gave up after {failed} attempts "
+                                       f"({status or payload.decode(errors='replace')})")
+                delay = min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (failed - 1))
+                time.sleep(delay * (0.5 + random.random() / 2))
+            else:
+                raise ProfileError(f"HTTP {status}: {payload[:200].decode(errors='replace')}")
+            self._count(retries=1)
+
+
+# ---------------------------------------------------------------------------
+# Writer
+# ---------------------------------------------------------------------------
+
+
+class ProfileWriter(threading.Thread):
+    """Appends profiles to the cache and writes them to the stores in batches.
+
+    Neo4j first (ingest_content's batched transactions), then Pinecone;
+    ids reach written.txt only after both succeed.
+    """
+
+    def __init__(self, state_dir, brand_id, write=True, batch_size=WRITE_BATCH_SIZE):
+        super().__init__(daemon=True)
+        self.profiles_path = Path(state_dir) / "profiles.jsonl"
+        self.written_path = Path(state_dir) / "written.txt"
+        self.brand_id = brand_id
+        self.write = write
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        self._cache_lock = threading.Lock()
+        self.written = 0
+        self.errors = []
+        self.driver = self.index = self.cache = None
+
+    def cache_profile(self, profile):
+        """Append one profile to profiles.jsonl; safe to call from worker threads."""
+        line = json.dumps(profile) + "\n"
+        with self._cache_lock, open(self.profiles_path, "a") as f:
+            f.write(line)
+
+    def put(self, profile):
+        self.queue.put(profile)
+
+    def close(self):
+        self.queue.put(None)
+        self.join()
+        if self.driver is not None:
+            self.driver.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def run(self):
+        batch, deadline, done = [], None, False
+        while not done:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                profile = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                profile = False
+            if profile is None:
+                done = True
+            elif profile:
+                batch.append(profile)
+                deadline = deadline or time.monotonic() + FLUSH_SECONDS
+            if batch and (done or profile is False or len(batch) >= self.batch_size):
+                self.flush(batch)
+                batch, deadline = [], None
+
+    def _connect(self):
+        from embedding_cache import EmbeddingCache
+        from init_neo4j import connect
+        from init_pinecone import INDEX_NAME, PINECONE_API_KEY, Pinecone, client_namespaces
+
+        self.driver = connect()
+        self.index = Pinecone(api_key=PINECONE_API_KEY).Index(INDEX_NAME)
+        self.namespace = client_namespaces(self.brand_id)[0]["name"]
+        self.cache = EmbeddingCache()
+
+    def flush(self, batch):
+        if not self.write:
+            return
+        from pinecone_backfill import CONTENT_METADATA_FIELDS, clean_metadata, upsert_with_retry
+
+        label = f"{len(batch)} profiles ({batch[0]['id']}..)"
+        try:
+            if self.driver is None:
+                self._connect()
+            summary = ingest_profiles(self.driver, batch, self.brand_id,
+                                      batch_size=len(batch), summary=new_summary(), echo=False)
+            if summary["errors"]:
+                raise RuntimeError(summary["errors"][0].strip())
+            rows = [content_row(profile, self.brand_id) for profile in batch]
+            embeddings = self.cache.embed([row["semantic_description"] for row in rows])
+            vectors = [
+                {"id": row["id"], "values": emb.tolist(), "metadata": clean_metadata(
+                    {**{f: row.get(f) for f in CONTENT_METADATA_FIELDS},
+                     "status": "active", "content_id": row["id"]})}
+                for row, emb in zip(rows, embeddings)
+            ]
+            upsert_with_retry(self.index, vectors, self.namespace)
+        except Exception as e:
+            msg = f"  [FAIL] write {label}: {e}"
+            print(msg)
+            self.errors.append(msg)
+            return
+        with open(self.written_path, "a") as f:
+            f.writelines(f"{profile['id']}\n" for profile in batch)
+        self.written += len(batch)
+        print(f"  [OK] wrote {label} to Neo4j and Pinecone")
+
+
+# ---------------------------------------------------------------------------
+# Pool
+# ---------------------------------------------------------------------------
+
+
+def load_state(state_dir):
+    """({s3 key: cached profile}, {written content ids}) from a previous run."""
+    profiled, written = {}, set()
+    profiles_path = Path(state_dir) / "profiles.jsonl"
+    if profiles_path.exists():
+        with open(profiles_path) as f:
+            for line in f:
+                if line.strip():
+                    profile = json.loads(line)
+                    profiled[profile["s3_key"]] = profile
+    written_path = Path(state_dir) / "written.txt"
+    if written_path.exists():
+        written = set(written_path.read_text().split())
+    return profiled, written
+
+
+def run_pool(entries, profiler, writer, brand_id, workers):
+    """Profile `entries` with `workers` threads; returns the failure messages."""
+    failures = []
+
+    def task(entry):
+        analysis, usage = profiler.profile(entry)
+        profile = {"id": content_id(entry["key"]), "brand_id": brand_id,
+                   "s3_key": entry["key"], "media_type": entry["media_type"],
+                   "analysis": analysis}
+        writer.cache_profile(profile)
+        writer.put(profile)
+        return usage
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(task, entry): entry for entry in entries}
+        for future in as_completed(futures):
+            entry = futures[future]
+            try:
+                usage = future.result()
+            except Exception as e:
+                msg = f"  [FAIL] {entry['key']}: {e}"
+                print(msg)
+                failures.append(msg)
+                continue
+            print(f"  [OK] {entry['key']} ({len(entry['frames'])} frame(s), "
+                  f"{usage['input_tokens']}+{usage['output_tokens']} tokens, "
+                  f"{usage['seconds']:.1f}s)")
+    return failures
+
+
+def print_summary(total, failures, profiler, writer, concurrency, limiter, elapsed):
+    stats = profiler.stats
+    print("\n" + "=" * 64)
+    print("PROFILING SUMMARY")
+    print("=" * 64)
+    print(f"  Assets profiled:     {total - len(failures)} of {total}")
+    print(f"  Throughput:          {(total - len(failures)) / elapsed * 60 if elapsed else 0:.1f}"
+          f" assets/min")
+    print(f"  Requests:            {stats['requests']} ({stats['throttled']} throttled, "
+          f"{stats['retries']} retried, {stats['invalid']} invalid replies)")
+    print(f"  Tokens:              {stats['input_tokens']} input, {stats['output_tokens']} output")
+    print(f"  Concurrency:         {concurrency.limit:.1f} of {concurrency.maximum} "
+          f"({concurrency.cuts} cut(s) on 429)")
+    print(f"  Limiter:             {limiter.waited:.1f}s waited (summed over workers), "
+          f"rates at {limiter.scale:.0%} of configured")
+    if writer.write:
+        print(f"  Written:             {writer.written} to Neo4j and Pinecone")
+    print(f"  Elapsed:             {elapsed:.1f}s")
+
+
+# ---------------------------------------------------------------------------
+# Local stub server
+# ---------------------------------------------------------------------------
+
+STUB_IMAGE_TOKENS = 1600
+STUB_WORDS = ("calm treatment room acupuncture herbal clinic practitioner patient warm light "
+              "wooden shelves tea cupping session wellness balance gentle natural").split()
+
+
+def stub_profile(rng):
+    """A schema-valid profile made of random shared-attribute values."""
+    def weighted(label):
+        return [{"name": name, "confidence": round(rng.uniform(0.5, 1.0), 2)}
+                for name in rng.sample(SHARED_ATTRIBUTES[label], 2)]
+    return {
+        "semantic_description": " ".join(rng.choice(STUB_WORDS) for _ in range(170)) + ".",
+        "tones": weighted("Tone"),
+        "aesthetics": weighted("Aesthetic"),
+        "color_palette": rng.choice(SHARED_ATTRIBUTES["ColorPalette"]),
+        "composition": rng.choice(SHARED_ATTRIBUTES["Composition"]),
+        "narrative_elements": rng.sample(SHARED_ATTRIBUTES["NarrativeElement"], 2),
+        "quality_score": rng.randint(40, 95),
+    }
+
+
+class StubServer(ThreadingHTTPServer):
+    """Stand-in for POST /v1/messages with its own rate limits.
+
+    Over-limit requests get a 429 with retry-after, like the API; accepted
+    ones sleep `latency` seconds plus `per_image` per image, then answer
+    with a generated profile (malformed with probability `invalid_rate`).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, rpm, itpm, otpm, latency=2.0, per_image=0.2, invalid_rate=0.0):
+        super().__init__(address, StubHandler)
+        self.limiter = RateLimiter(rpm, itpm, otpm)
+        self.latency = latency
+        self.per_image = per_image
+        self.invalid_rate = invalid_rate
+        self.rng = random.Random(0)
+        self.rng_lock = threading.Lock()
+        self.counts = {"accepted": 0, "rejected": 0}
+
+    def admit(self, costs, force=False):
+        """Take `costs` or return the seconds until they would fit."""
+        with self.limiter.lock:
+            now = time.monotonic()
+            for bucket in self.limiter.buckets.values():
+                bucket.refill(now)
+            wait = max(self.limiter.buckets[k].wait_time(v) for k, v in costs.items())
+            # Admission also needs the output bucket out of debt.
+            wait = max(wait, self.limiter.buckets["output_tokens"].wait_time(0))
+            if wait > 0 and not force:
+                self.counts["rejected"] += 1
+                return wait
+            for k, v in costs.items():
+                self.limiter.buckets[k].level -= v
+            if not force:
+                self.counts["accepted"] += 1
+            return 0.0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body, headers=()):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path != "/v1/messages":
+            return self._reply(404, {"type": "error", "error": {"type": "not_found_error"}})
+        request = json.loads(self.rfile.read(int(self.headers["content-length"])))
+        content = request["messages"][0]["content"]
+        images = sum(1 for block in content if block.get("type") == "image")
+        input_tokens = PROMPT_TOKENS + images * STUB_IMAGE_TOKENS
+        wait = self.server.admit({"requests": 1, "input_tokens": input_tokens})
+        if wait:
+            return self._reply(429, {"type": "error", "error": {
+                "type": "rate_limit_error", "message": "stub rate limit exceeded"}},
+                [("retry-after", str(max(1, round(wait))))])
+        time.sleep(self.server.latency + images * self.server.per_image)
+        with self.server.rng_lock:
+            profile = stub_profile(self.server.rng)
+            invalid = self.server.rng.random() < self.server.invalid_rate
+        text = "```json\n" + json.dumps(profile) + "\n```"
+        if invalid:
+            text = text.replace('"color_palette": "', '"color_palette": "neutral-')
+        # Output is charged after the fact, as the API does.
+        self.server.admit({"output_tokens": len(text) // 4}, force=True)
+        self._reply(200, {
+            "id": f"msg_stub_{time.monotonic_ns()}", "type": "message", "role": "assistant",
+            "model": request.get("model", MODEL), "stop_reason": "end_turn",
+            "content": [{"type": "text", "text": text}],
+            "usage": {"input_tokens": input_tokens, "output_tokens": len(text) // 4},
+        })
+
+
+def start_stub(port, rpm, itpm, otpm, latency, invalid_rate):
+    server = StubServer(("127.0.0.1", port), rpm, itpm, otpm, latency, invalid_rate=invalid_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def synthetic_manifest(directory, count, video_share=0.3):
+    """Manifest of `count` fake assets whose frames are small random blobs."""
+    rng = random.Random(1)
+    entries = []
+    for i in range(count):
+        media_type = "video" if rng.random() < video_share else "image"
+        frames = []
+        for j in range(rng.randint(4, 8) if media_type == "video" else 1):
+            frame = Path(directory) / f"asset-{i:05d}-{j:02d}.jpg"
+            frame.write_bytes(os.urandom(2048))
+            frames.append(frame.name)
+        ext = "mp4" if media_type == "video" else "jpg"
+        entries.append({"key": f"clients/{BRAND_ID}/content/bench/asset-{i:05d}.{ext}",
+                        "media_type": media_type, "frames": frames,
+                        "vision_tokens": len(frames) * STUB_IMAGE_TOKENS})
+    return entries
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Profile prepared content with Claude Vision.")
+    parser.add_argument("command", nargs="?", default="run", choices=["run", "stub", "bench"])
+    parser.add_argument("manifest", nargs="?", type=Path,
+                        help="run: manifest.json written by content_fetch.py")
+    parser.add_argument("--base-url", default=API_BASE_URL,
+                        help="Messages API base URL (a stub server for testing)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Maximum requests in flight (default {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--rpm", type=int,
+                        help=f"Requests/min (default {RPM}; bench: the stub's)")
+    parser.add_argument("--itpm", type=int,
+                        help=f"Input tokens/min (default {ITPM}; bench: the stub's)")
+    parser.add_argument("--otpm", type=int,
+                        help=f"Output tokens/min (default {OTPM}; bench: the stub's)")
+    parser.add_argument("--limit", type=int, help="Profile at most this many assets")
+    parser.add_argument("--no-write", action="store_true",
+                        help="Only cache profiles; do not write Neo4j or Pinecone")
+    parser.add_argument("--batch-size", type=int, default=WRITE_BATCH_SIZE,
+                        help=f"Profiles per store write (default {WRITE_BATCH_SIZE})")
+    stub = parser.add_argument_group("stub / bench")
+    stub.add_argument("--port", type=int, default=8788, help="stub: listen port")
+    stub.add_argument("--stub-rpm", type=int, default=500, help="Stub requests/min limit")
+    stub.add_argument("--stub-itpm", type=int, default=2_000_000,
+                      help="Stub input tokens/min limit")
+    stub.add_argument("--stub-otpm", type=int, default=400_000,
+                      help="Stub output tokens/min limit")
+    stub.add_argument("--latency", type=float, default=2.0, help="Stub seconds per request")
+    stub.add_argument("--invalid-rate", type=float, default=0.02,
+                      help="Share of stub replies that fail validation")
+    stub.add_argument("--assets", type=int, default=200, help="bench: synthetic assets")
+    args = parser.parse_args()
+    bench = args.command == "bench"
+    args.rpm = args.rpm or (args.stub_rpm if bench else RPM)
+    args.itpm = args.itpm or (args.stub_itpm if bench else ITPM)
+    args.otpm = args.otpm or (args.stub_otpm if bench else OTPM)
+    if args.command == "run" and args.manifest is None:
+        parser.error("run needs a manifest.json")
+    if min(args.concurrency, args.rpm, args.itpm, args.otpm, args.batch_size) < 1:
+        parser.error("--concurrency, limits and --batch-size must be at least 1")
+    return args
+
+
+def main():
+    args = parse_args()
+
+    if args.command == "stub":
+        server = StubServer(("127.0.0.1", args.port), args.stub_rpm, args.stub_itpm,
+                            args.stub_otpm, args.latency, invalid_rate=args.invalid_rate)
+        print(f"Stub Messages API on http://127.0.0.1:{args.port} "
+              f"({args.stub_rpm} RPM, {args.stub_itpm} ITPM, {args.latency}s latency)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print(f"\n  {server.counts['accepted']} accepted, {server.counts['rejected']} rejected")
+        return
+
+    tmp = None
+    if args.command == "bench":
+        tmp = tempfile.TemporaryDirectory(prefix="droom-vision-bench-")
+        server = start_stub(0, args.stub_rpm, args.stub_itpm, args.stub_otpm, args.latency,
+                            args.invalid_rate)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        root = state_dir = Path(tmp.name)
+        entries, brand_id, write = synthetic_manifest(root, args.assets), BRAND_ID, False
+        api_key = "stub"
+    else:
+        with open(args.manifest) as f:
+            manifest = json.load(f)
+        root = state_dir = args.manifest.parent
+        entries, brand_id = manifest["objects"], manifest.get("brand_id", BRAND_ID)
+        base_url, write = args.base_url, not args.no_write
+        api_key = os.getenv("ANTHROPIC_API_KEY")
+        if not api_key and base_url == API_BASE_URL:
+            print("ERROR: Missing ANTHROPIC_API_KEY.")
+            sys.exit(1)
+
+    profiled, written = load_state(state_dir)
+    pending = [e for e in entries if e["key"] not in profiled][:args.limit]
+    unwritten = [p for p in profiled.values() if p["id"] not in written] if write else []
+
+    print("=" * 64)
+    print(f"Droom Marketing Factory - Vision Profiling ({args.command})")
+    print(f"Brand: {brand_id}")
+    print(f"API: {base_url} ({MODEL})")
+    print(f"Limits: {args.rpm} RPM, {args.itpm} ITPM, {args.otpm} OTPM, "
+          f"{args.concurrency} in flight")
+    print(f"Queue: {len(pending)} to profile, {len(entries) - len(pending)} already profiled"
+          f"{f', {len(unwritten)} to write' if unwritten else ''}")
+    print(f"Writes: {'Neo4j + Pinecone' if write else 'off (profiles.jsonl only)'}")
+    print("=" * 64 + "\n")
+
+    limiter = RateLimiter(args.rpm, args.itpm, args.otpm)
+    concurrency = AdaptiveConcurrency(args.concurrency)
+    profiler = VisionProfiler(root, limiter, concurrency, base_url, api_key)
+    writer = ProfileWriter(state_dir, brand_id, write, args.batch_size)
+    writer.start()
+    for profile in unwritten:
+        writer.put(profile)
+
+    started = time.perf_counter()
+    try:
+        failures = run_pool(pending, profiler, writer, brand_id, args.concurrency)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - started
+    print_summary(len(pending), failures, profiler, writer, concurrency, limiter, elapsed)
+    if args.command == "bench":
+        print(f"  Stub:                {server.counts['accepted']} accepted, "
+              f"{server.counts['rejected']} rejected with 429")
+        server.shutdown()
+        tmp.cleanup()
+
+    errors = failures + writer.errors
+    if errors:
+        print(f"\n  ERRORS ({len(errors)}):")
+        for err in errors[:20]:
+            print(f"    {err}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,17 +6,34 @@ Business Model: brick-and-mortar-primary
 
 Tests connectivity and configuration for all integrated services.
 Each test is independent. Missing credentials cause a skip with warning, not a failure.
+The database module unit tests need no credentials (DROOM_VECTOR_STORE=local
+lets the Pinecone-backed modules import without the SDK).
 
 Usage:
     python test-suite.py              # Run all tests
     python test-suite.py -v           # Verbose output
     python test-suite.py -k neo4j     # Run only Neo4j tests
+    python test-suite.py --async      # Probe all services concurrently
+    python test-suite.py --async --timeout 10
+    python test-suite.py --benchmark                  # latency percentiles
+    python test-suite.py --benchmark --reps 50 --save-baseline
 """
 
 import os
 import sys
 import json
+import time
+import atexit
+import asyncio
+import concurrent.futures
+import argparse
+import fnmatch
+import random
+import shutil
+import tempfile
+import threading
 import unittest
+import uuid
 from pathlib import Path
 from functools import wraps
 
@@ -54,6 +71,24 @@ PINECONE_NAMESPACES = [
     f"droom-narrative-patterns-{BRAND_ID}",
     "droom-cross-campaign-learnings",
 ]
+# DROOM_VECTOR_STORE=local runs the Pinecone tests against the NumPy
+# stand-in in ../database/local_vector_store.py (no API key needed).
+LOCAL_VECTOR_STORE = os.getenv("DROOM_VECTOR_STORE", "").lower() == "local"
+PINECONE_ENV = () if LOCAL_VECTOR_STORE else ("PINECONE_API_KEY",)
+DATABASE_DIR = Path(__file__).resolve().parent.parent / "database"
+# Per-probe timeout (seconds) in --async mode.
+PROBE_TIMEOUT = float(os.getenv("INTEGRATION_PROBE_TIMEOUT", "30"))
+# --benchmark defaults. A probe regresses when its p95 exceeds the baseline
+# p95 by more than REGRESSION_THRESHOLD (fraction).
+BENCHMARK_REPS = 20
+BENCHMARK_WARMUP = 3
+BENCHMARK_BASELINE = Path(__file__).resolve().parent / "benchmark-baseline.json"
+REGRESSION_THRESHOLD = 0.25
+DASHBOARD_TARGET_MS = 500
+BENCHMARK_NAMESPACE = f"droom-benchmark-{BRAND_ID}"
+BENCHMARK_UPSERT_SIZE = 1000
+# Vectors seeded into the local stand-in so top-k queries scan a real matrix.
+BENCHMARK_LOCAL_VECTORS = 10000
 EXPECTED_NEO4J_CONSTRAINTS = [
     "droom_content_id_unique",
     "droom_campaign_id_unique",
@@ -87,6 +122,82 @@ def requires_env(*env_vars):
     return decorator
 
 
+_shared_clients = {}
+_shared_locks = {}
+_shared_guard = threading.Lock()
+
+
+def shared_client(name, factory):
+    """Return the once-per-run client `name`, building it with `factory()`.
+
+    Clients are shared by every test (and every concurrent probe in --async
+    mode) and closed at exit. Construction is locked per client so two
+    probes never build the same client twice.
+    """
+    with _shared_guard:
+        lock = _shared_locks.setdefault(name, threading.Lock())
+    with lock:
+        if name not in _shared_clients:
+            _shared_clients[name] = factory()
+        return _shared_clients[name]
+
+
+@atexit.register
+def close_shared_clients():
+    for client in _shared_clients.values():
+        close = getattr(client, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception:
+                pass
+    _shared_clients.clear()
+
+
+def neo4j_driver():
+    from neo4j import GraphDatabase
+
+    return shared_client(
+        "neo4j",
+        lambda: GraphDatabase.driver(
+            os.getenv("NEO4J_URI"),
+            auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD")),
+        ),
+    )
+
+
+def pinecone_client():
+    if LOCAL_VECTOR_STORE:
+        sys.path.insert(0, str(DATABASE_DIR))
+        from local_vector_store import LocalPinecone as Pinecone
+    else:
+        from pinecone import Pinecone
+
+    return shared_client(
+        "pinecone", lambda: Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    )
+
+
+def pinecone_index():
+    return shared_client(
+        "pinecone_index", lambda: pinecone_client().Index(PINECONE_INDEX)
+    )
+
+
+def s3_client():
+    import boto3
+
+    return shared_client(
+        "s3",
+        lambda: boto3.client(
+            "s3",
+            region_name="us-east-1",
+            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        ),
+    )
+
+
 # ---------------------------------------------------------------------------
 # Neo4j Tests
 # ---------------------------------------------------------------------------
@@ -98,19 +209,10 @@ class TestNeo4jIntegration(unittest.TestCase):
     @requires_env("NEO4J_URI", "NEO4J_USERNAME", "NEO4J_PASSWORD")
     def setUp(self):
         try:
-            from neo4j import GraphDatabase
-
-            self.driver = GraphDatabase.driver(
-                os.getenv("NEO4J_URI"),
-                auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD")),
-            )
+            self.driver = neo4j_driver()
         except ImportError:
             self.skipTest("Skipped — neo4j driver not installed. Run: pip install neo4j")
 
-    def tearDown(self):
-        if hasattr(self, "driver") and self.driver:
-            self.driver.close()
-
     @requires_env("NEO4J_URI", "NEO4J_USERNAME", "NEO4J_PASSWORD")
     def test_connectivity(self):
         """Verify basic Neo4j connectivity."""
@@ -144,19 +246,39 @@ class TestNeo4jIntegration(unittest.TestCase):
 
     @requires_env("NEO4J_URI", "NEO4J_USERNAME", "NEO4J_PASSWORD")
     def test_brand_isolation_query(self):
-        """Verify brand isolation query returns without error."""
-        with self.driver.session(
-            database=os.getenv("NEO4J_DATABASE", "neo4j")
-        ) as session:
-            result = session.run(
-                "MATCH (n:Droom) "
-                "WHERE n.brand_id = $brand_id OR NOT EXISTS(n.brand_id) "
-                "RETURN labels(n) AS node_labels, COUNT(n) AS count "
-                "ORDER BY count DESC",
-                brand_id=BRAND_ID,
-            )
-            records = list(result)
-            print(f"  [PASS] Brand isolation query OK — {len(records)} label groups returned")
+        """Verify the brand-scoped inventory (index seeks + count store); read-only."""
+        sys.path.insert(0, str(DATABASE_DIR))
+        from brand_inventory import BRAND_COUNT, BrandInventory
+        from init_neo4j import (
+            DEMOGRAPHICS, GEOGRAPHIC_ZONES, SCAN_OPERATORS, SHARED_ATTRIBUTES, _plan_operators,
+        )
+
+        database = os.getenv("NEO4J_DATABASE", "neo4j")
+        inventory = BrandInventory(self.driver, database=database)
+        counts = inventory.counts(BRAND_ID)
+        self.assertEqual(set(counts["shared"]), set(SHARED_ATTRIBUTES))
+        for label, count in counts["shared"].items():
+            self.assertGreaterEqual(count, len(SHARED_ATTRIBUTES[label]),
+                                    f"Missing :{label} nodes — run init_neo4j.py")
+
+        # Seeded per-brand data has known sizes; another brand's nodes would inflate them.
+        self.assertEqual(counts["brand"].get("Demographic"), len(DEMOGRAPHICS))
+        self.assertEqual(counts["brand"].get("Geographic"), len(GEOGRAPHIC_ZONES))
+        unknown = inventory.counts(f"test-isolation-{uuid.uuid4().hex[:8]}")
+        self.assertEqual(sum(unknown["brand"].values()), 0)
+
+        # Every brand count must be an index seek, never a label or all-nodes scan.
+        with self.driver.session(database=database) as session:
+            for label in counts["brand"]:
+                plan = session.run("EXPLAIN " + BRAND_COUNT.format(label=label),
+                                   brand_id=BRAND_ID).consume().plan
+                operators, _ = _plan_operators(plan)
+                self.assertFalse(SCAN_OPERATORS.intersection(operators),
+                                 f":Droom:{label} brand count scans: {operators}")
+        print(
+            f"  [PASS] Brand isolation query OK — {len(counts['brand'])} brand labels, "
+            f"{len(counts['shared'])} shared labels in {counts['seconds'] * 1000:.0f} ms"
+        )
 
 
 # ---------------------------------------------------------------------------
@@ -167,16 +289,14 @@ class TestNeo4jIntegration(unittest.TestCase):
 class TestPineconeIntegration(unittest.TestCase):
     """Tests Pinecone connectivity and index configuration."""
 
-    @requires_env("PINECONE_API_KEY")
+    @requires_env(*PINECONE_ENV)
     def test_connectivity_and_index(self):
         """Verify Pinecone API key works and graphelion-deux index exists."""
         try:
-            from pinecone import Pinecone
+            indexes = pinecone_client().list_indexes()
         except ImportError:
             self.skipTest("Skipped — pinecone client not installed. Run: pip install pinecone")
 
-        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-        indexes = pc.list_indexes()
         index_names = [idx.name for idx in indexes]
         self.assertIn(
             PINECONE_INDEX,
@@ -185,17 +305,14 @@ class TestPineconeIntegration(unittest.TestCase):
         )
         print(f"  [PASS] Pinecone connected — index '{PINECONE_INDEX}' exists")
 
-    @requires_env("PINECONE_API_KEY")
+    @requires_env(*PINECONE_ENV)
     def test_index_dimensions(self):
         """Verify the index uses 1536 dimensions (text-embedding-3-small)."""
         try:
-            from pinecone import Pinecone
+            stats = pinecone_index().describe_index_stats()
         except ImportError:
             self.skipTest("Skipped — pinecone client not installed.")
 
-        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-        index = pc.Index(PINECONE_INDEX)
-        stats = index.describe_index_stats()
         self.assertEqual(
             stats.dimension,
             1536,
@@ -203,17 +320,14 @@ class TestPineconeIntegration(unittest.TestCase):
         )
         print(f"  [PASS] Index dimensions: {stats.dimension} (text-embedding-3-small)")
 
-    @requires_env("PINECONE_API_KEY")
+    @requires_env(*PINECONE_ENV)
     def test_namespace_access(self):
         """Verify Droom namespaces are accessible (may be empty initially)."""
         try:
-            from pinecone import Pinecone
+            stats = pinecone_index().describe_index_stats()
         except ImportError:
             self.skipTest("Skipped — pinecone client not installed.")
 
-        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-        index = pc.Index(PINECONE_INDEX)
-        stats = index.describe_index_stats()
         existing_namespaces = set(stats.namespaces.keys()) if stats.namespaces else set()
         for ns in PINECONE_NAMESPACES:
             if ns in existing_namespaces:
@@ -236,16 +350,11 @@ class TestS3Integration(unittest.TestCase):
     def test_bucket_exists(self):
         """Verify the droom S3 bucket exists and is accessible."""
         try:
-            import boto3
+            import boto3  # noqa: F401
         except ImportError:
             self.skipTest("Skipped — boto3 not installed. Run: pip install boto3")
 
-        s3 = boto3.client(
-            "s3",
-            region_name="us-east-1",
-            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-        )
+        s3 = s3_client()
         try:
             s3.head_bucket(Bucket=S3_BUCKET)
             print(f"  [PASS] S3 bucket '{S3_BUCKET}' exists and is accessible")
@@ -262,16 +371,11 @@ class TestS3Integration(unittest.TestCase):
     def test_key_prefix_listable(self):
         """Verify the client key prefix is listable in the bucket."""
         try:
-            import boto3
+            import boto3  # noqa: F401
         except ImportError:
             self.skipTest("Skipped — boto3 not installed.")
 
-        s3 = boto3.client(
-            "s3",
-            region_name="us-east-1",
-            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-        )
+        s3 = s3_client()
         response = s3.list_objects_v2(
             Bucket=S3_BUCKET, Prefix=S3_KEY_PREFIX, MaxKeys=1
         )
@@ -301,7 +405,10 @@ class TestClaudeAPIIntegration(unittest.TestCase):
                 "Skipped — anthropic SDK not installed. Run: pip install anthropic"
             )
 
-        client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        client = shared_client(
+            "anthropic",
+            lambda: anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY")),
+        )
         try:
             message = client.messages.create(
                 model="claude-sonnet-4-20250514",
@@ -334,7 +441,9 @@ class TestOpenAIAPIIntegration(unittest.TestCase):
                 "Skipped — openai SDK not installed. Run: pip install openai"
             )
 
-        client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        client = shared_client(
+            "openai", lambda: openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        )
         try:
             response = client.embeddings.create(
                 model="text-embedding-3-small",
@@ -353,6 +462,601 @@ class TestOpenAIAPIIntegration(unittest.TestCase):
             self.fail(f"OpenAI API error: {e}")
 
 
+# ---------------------------------------------------------------------------
+# Database module unit tests (no services needed)
+# ---------------------------------------------------------------------------
+
+
+def import_database_module(test, name):
+    """Import ../database/<name>, skipping `test` when its dependencies are missing."""
+    sys.path.insert(0, str(DATABASE_DIR))
+    try:
+        return __import__(name)
+    except (ImportError, SystemExit) as e:
+        test.skipTest(f"Skipped — {name} dependencies unavailable: {e}")
+
+
+class _FakeContentDriver:
+    """Serves `content` ({id: text}) to keyset-paginated reads, recording `after`."""
+
+    def __init__(self, content):
+        self.content = content
+        self.afters = []
+
+    def session(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, cypher, brand_id, after, limit):
+        self.afters.append(after)
+        ids = sorted(i for i in self.content if i > after)[:limit]
+        return [{"id": i, "text": self.content[i], "metadata": {"brand_id": brand_id}}
+                for i in ids]
+
+
+class _FakeEmbeddings:
+    def embed(self, texts):
+        import numpy as np
+
+        return [np.zeros(4, dtype=np.float32) for _ in texts]
+
+
+class _FlakyIndex:
+    """Records upserted ids; raises `error` on the upsert calls numbered in `fail_on`."""
+
+    def __init__(self, fail_on=(), error=None):
+        self.fail_on = set(fail_on)
+        self.error = error or ValueError("vector dimension mismatch")
+        self.calls = 0
+        self.upserted = []
+
+    def upsert(self, vectors, namespace):
+        self.calls += 1
+        if self.calls in self.fail_on:
+            raise self.error
+        self.upserted.extend(v["id"] for v in vectors)
+
+
+class TestBackfillResume(unittest.TestCase):
+    """pinecone_backfill checkpoints resume by id, not by position."""
+
+    def setUp(self):
+        self.backfill = import_database_module(self, "pinecone_backfill")
+        self.tmp = Path(tempfile.mkdtemp(prefix="droom-backfill-test-"))
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+    def _run(self, driver, index):
+        checkpoint = self.backfill.Checkpoint(self.tmp / "cp.json", "neo4j:test", "ns")
+        checkpoint.load()
+        records = self.backfill.read_neo4j_content(
+            BRAND_ID, after=checkpoint.last_id or "", page_size=4, driver=driver
+        )
+        summary = self.backfill.backfill(records, index, "ns", _FakeEmbeddings(),
+                                         checkpoint, batch_size=3, workers=1)
+        return checkpoint, summary
+
+    def test_resume_after_insert_and_delete_below_checkpoint(self):
+        content = {f"c{i:03d}": f"text {i}" for i in range(0, 20, 2)}
+        driver = _FakeContentDriver(content)
+        # Third batch (c012, c014, c016) fails; the checkpoint stops at c010.
+        checkpoint, summary = self._run(driver, _FlakyIndex(fail_on={3}))
+        self.assertEqual(len(summary["errors"]), 1)
+        self.assertEqual((checkpoint.completed_records, checkpoint.last_id), (6, "c010"))
+
+        # Content changes below the checkpoint between runs.
+        content["c001"] = "inserted"
+        del content["c000"], content["c002"]
+        content["c013"] = "inserted"
+        driver.afters.clear()
+        index = _FlakyIndex()
+        checkpoint, summary = self._run(driver, index)
+
+        self.assertEqual(summary["errors"], [])
+        self.assertEqual(driver.afters[0], "c010")
+        self.assertEqual(index.upserted, ["c012", "c013", "c014", "c016", "c018"])
+        self.assertEqual(checkpoint.last_id, "c018")
+        print("  [PASS] Backfill resumes after the last checkpointed id")
+
+    def test_non_transient_errors_are_not_retried(self):
+        index = _FlakyIndex(fail_on={1})
+        with self.assertRaises(ValueError):
+            self.backfill.upsert_with_retry(index, [{"id": "a"}], "ns")
+        self.assertEqual(index.calls, 1)
+
+        class RateLimited(Exception):
+            status = 429
+
+        self.assertTrue(self.backfill.is_transient(RateLimited()))
+        self.assertTrue(self.backfill.is_transient(ConnectionResetError()))
+        self.assertFalse(self.backfill.is_transient(ValueError("bad vector")))
+        print("  [PASS] Upserts retry only transient errors")
+
+
+class TestSchemaPlan(unittest.TestCase):
+    """init_neo4j.plan_schema matches live indexes by their entity label."""
+
+    def setUp(self):
+        self.init = import_database_module(self, "init_neo4j")
+
+    def _index(self, labels, properties):
+        return {"type": "RANGE", "labelsOrTypes": labels, "properties": properties,
+                "owningConstraint": None}
+
+    def test_bare_droom_index_is_not_equivalent(self):
+        state = {"constraint": {},
+                 "index": {"legacy_droom_brand": self._index(["Droom"], ["brand_id"])}}
+        plan = {e["name"]: e["action"] for e in self.init.plan_schema(state)}
+        self.assertEqual(plan["droom_content_brand_id"], "create")
+
+        state["index"]["legacy_content_brand"] = self._index(["Content"], ["brand_id"])
+        plan = {e["name"]: e["action"] for e in self.init.plan_schema(state)}
+        self.assertEqual(plan["droom_content_brand_id"], "equivalent")
+        self.assertEqual(plan["droom_campaign_brand_id"], "create")
+        print("  [PASS] Schema plan requires the entity label on equivalent indexes")
+
+
+class TestDayDeltas(unittest.TestCase):
+    """content_aggregates.day_deltas turns Performance snapshots into deltas."""
+
+    def setUp(self):
+        self.aggregates = import_database_module(self, "content_aggregates")
+        self.fields = self.aggregates.FIELDS
+
+    def _record(self, pid, current, applied, content_ids, brand_id=BRAND_ID):
+        zeros = dict.fromkeys(self.fields, 0)
+        return {
+            "id": pid,
+            "brand_id": brand_id,
+            "current": [{**zeros, **current}[f] for f in self.fields],
+            "applied": [{**zeros, **applied}[f] for f in self.fields],
+            "content_ids": content_ids,
+        }
+
+    def test_reapplication_is_a_noop(self):
+        values = {"impressions": 1000, "clicks": 40, "spend": 12.34}
+        records = [self._record("p1", values, values, ["c1", "c2"])]
+        self.assertEqual(self.aggregates.day_deltas(records), {})
+        self.assertEqual(self.aggregates.day_deltas([]), {})
+        print("  [PASS] Re-applying a day writes nothing")
+
+    def test_corrections_apply_the_difference(self):
+        records = [
+            # Restated down after the first load.
+            self._record("p1", {"impressions": 900, "spend": 10.10},
+                         {"impressions": 1000, "spend": 12.34}, ["c1", "c1", "c2"]),
+            # First load of a node sharing c2.
+            self._record("p2", {"impressions": 50, "spend": 0.30}, {}, ["c2"]),
+            self._record("p3", {"clicks": 3}, {}, ["x1"], brand_id="other-brand"),
+        ]
+        result = self.aggregates.day_deltas(records)
+        self.assertEqual(set(result), {BRAND_ID, "other-brand"})
+
+        rows, stamps = result[BRAND_ID]
+        rows = {row["id"]: row for row in rows}
+        self.assertEqual((rows["c1"]["impressions"], rows["c1"]["spend"]), (-100, -2.24))
+        self.assertEqual((rows["c2"]["impressions"], rows["c2"]["spend"]), (-50, -1.94))
+        self.assertIsInstance(rows["c1"]["impressions"], int)
+        stamps = {stamp["id"]: stamp for stamp in stamps}
+        self.assertEqual((stamps["p1"]["impressions"], stamps["p1"]["spend"]), (900, 10.10))
+        self.assertEqual(stamps["p2"]["impressions"], 50)
+
+        other_rows, _ = result["other-brand"]
+        self.assertEqual([(r["id"], r["clicks"]) for r in other_rows], [("x1", 3)])
+        print("  [PASS] Corrections apply only the difference, per brand")
+
+
+class TestLocalStoreMetadata(unittest.TestCase):
+    """Journaling and namespace files of the local stand-in."""
+
+    def setUp(self):
+        self.store = import_database_module(self, "local_vector_store")
+        self.tmp = Path(tempfile.mkdtemp(prefix="droom-store-test-"))
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+    def test_batch_metadata_update(self):
+        pc = self.store.LocalPinecone(root=self.tmp)
+        pc.create_index("test", dimension=4)
+        index = pc.Index("test")
+        index.upsert([(f"v{i}", [1.0, 0, 0, i], {"n": i}) for i in range(5)], namespace="ns")
+        journal = self.tmp / "test" / "ns.journal"
+        before = journal.stat().st_size
+
+        result = index.update_metadata({"v1": {"n": 10}, "v3": {"m": 1}, "gone": {"n": 0}},
+                                       namespace="ns")
+        self.assertEqual(result.updated_count, 2)
+        self.assertGreater(journal.stat().st_size, before)
+        pc.close()
+
+        vectors = self.store.LocalPinecone(root=self.tmp).Index("test").fetch(
+            ["v1", "v3"], namespace="ns").vectors
+        self.assertEqual(vectors["v1"].metadata, {"n": 10})
+        self.assertEqual(vectors["v3"].metadata, {"n": 3, "m": 1})
+        print("  [PASS] Local metadata batch persists through compaction")
+
+    def test_writes_after_torn_journal_tail_survive(self):
+        store = self.store.LocalPinecone(root=self.tmp)
+        store.create_index("test", dimension=4)
+        store.Index("test").upsert([("a", [1.0, 0, 0, 0])], namespace="ns")
+        journal = self.tmp / "test" / "ns.journal"
+        with open(journal, "ab") as f:
+            f.write(b"\x40\x00\x00\x00{\"op\": \"ups")  # crash mid-append
+
+        store = self.store.LocalPinecone(root=self.tmp)
+        store.Index("test").upsert([("b", [0, 1.0, 0, 0])], namespace="ns")
+        # Reload without close(): the journal alone must carry both writes.
+        index = self.store.LocalPinecone(root=self.tmp).Index("test")
+        self.assertEqual(sorted(index.fetch(["a", "b"], namespace="ns").vectors), ["a", "b"])
+        print("  [PASS] Writes after a torn journal tail survive a reload")
+
+    def test_default_namespace_in_stats(self):
+        store = self.store.LocalPinecone(root=self.tmp)
+        store.create_index("test", dimension=4)
+        store.Index("test").upsert([("a", [1.0, 0, 0, 0]), ("b", [0, 1.0, 0, 0])])
+        index = self.store.LocalPinecone(root=self.tmp).Index("test")
+        stats = index.describe_index_stats()
+        self.assertEqual(stats.namespaces[""].vector_count, 2)
+        self.assertEqual(stats.total_vector_count, 2)
+        store.close()
+        stats = self.store.LocalPinecone(root=self.tmp).Index("test").describe_index_stats()
+        self.assertEqual(list(stats.namespaces), [""])
+        print("  [PASS] Default namespace is reported by describe_index_stats")
+
+
+class TestDedupRegister(unittest.TestCase):
+    """content_dedup stores a profile-less hit's profile on the original content."""
+
+    def setUp(self):
+        self.dedup = import_database_module(self, "content_dedup")
+        self.tmp = Path(tempfile.mkdtemp(prefix="droom-dedup-test-"))
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.index = self.dedup.DedupIndex(BRAND_ID, path=self.tmp / "dedup.sqlite3")
+        self.addCleanup(self.index.close)
+
+    def test_profileless_hit_registers_under_original(self):
+        fp = {"sha256": b"\x01" * 32, "media_type": "image", "phashes": [0x0F0F]}
+        self.index.add("eht-original", fp)
+        match = self.index.find(fp)
+        self.assertEqual((match["content_id"], match["profile"]), ("eht-original", None))
+
+        self.index.stage("raw/again.jpg", fp, content_id=match["content_id"])
+        profile = {"semantic_description": "Treatment room", "tones": []}
+        registered = self.index.register("raw/again.jpg", "eht-new", profile)
+
+        self.assertEqual(registered, "eht-original")
+        self.assertEqual(self.index.find(fp)["profile"], profile)
+        self.assertEqual(self.index.stats(), {"images": 1, "videos": 0, "pending": 0})
+        self.assertIsNone(self.index.register("raw/again.jpg", "eht-new", profile))
+        print("  [PASS] Profile-less duplicate is profiled under the original content_id")
+
+
+class TestReconcileMetadata(unittest.TestCase):
+    """content_reconcile repairs metadata drift, including cleared fields."""
+
+    def setUp(self):
+        self.reconcile = import_database_module(self, "content_reconcile")
+        store = import_database_module(self, "local_vector_store")
+        self.tmp = Path(tempfile.mkdtemp(prefix="droom-reconcile-test-"))
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        pc = store.LocalPinecone(root=self.tmp)
+        pc.create_index("test", dimension=4)
+        self.index = pc.Index("test")
+
+    def test_cleared_field_is_removed(self):
+        reconciler = self.reconcile.Reconciler(None, self.index, BRAND_ID,
+                                               check_metadata=True, repair=True)
+        namespace = reconciler.namespace
+        self.index.upsert([
+            ("a", [1.0, 0, 0, 0], {"status": "active", "avg_roas": 2.5, "content_id": "a"}),
+            ("b", [0, 1.0, 0, 0], {"status": "active", "avg_roas": 1.0, "content_id": "b"}),
+        ], namespace=namespace)
+        nodes = [{"id": "a", "status": "archived", "avg_roas": None},
+                 {"id": "b", "status": "paused", "avg_roas": 1.0}]
+        future = concurrent.futures.Future()
+        future.set_result(self.index.fetch(ids=["a", "b"], namespace=namespace))
+        reconciler._collect(nodes, future)
+
+        self.assertEqual(reconciler.errors, [])
+        self.assertEqual(reconciler.counts["metadata_fixed"], 2)
+        vectors = self.index.fetch(ids=["a", "b"], namespace=namespace).vectors
+        self.assertEqual(vectors["a"].metadata, {"status": "archived", "content_id": "a"})
+        self.assertEqual(vectors["a"].values, [1.0, 0, 0, 0])
+        self.assertEqual(vectors["b"].metadata["status"], "paused")
+        print("  [PASS] Reconcile clears metadata fields the node no longer has")
+
+
+class TestBudgetBounds(unittest.TestCase):
+    """budget_optimizer keeps small brands feasible under the platform minimum."""
+
+    def setUp(self):
+        self.optimizer = import_database_module(self, "budget_optimizer")
+
+    def _campaign(self, platform, budget, days):
+        return {"brand_id": BRAND_ID, "status": "active", "budget": budget,
+                "platform": platform, "days": days,
+                "demographics": [], "demographic_target": None,
+                "zones": [], "geographic_target": None}
+
+    def test_small_brand_keeps_best_platform(self):
+        for campaigns in (
+            [self._campaign("meta", 40.0, [[10.0, 20.0]])],
+            [self._campaign("meta", 20.0, [[10.0, 20.0]] * 5),
+             self._campaign("google", 20.0, [[10.0, 40.0]] * 5)],
+        ):
+            problems = self.optimizer.optimize(self.optimizer.build_problems(campaigns, []))
+            platform = next(p for p in problems if p["dimension"] == "platform")
+            kept = [n for n, hi in zip(platform["names"], platform["upper"]) if hi > 0]
+            self.assertEqual(len(kept), 1)
+            self.assertNotIn(kept[0], platform["deactivated"])
+            for p in problems:
+                self.assertEqual(self.optimizer.check_problem(p), [])
+        self.assertEqual(kept, ["google"])
+        print("  [PASS] Brand below the platform minimum keeps its best platform")
+
+
+# ---------------------------------------------------------------------------
+# Async runner
+# ---------------------------------------------------------------------------
+
+
+def _outcome(result):
+    """Map a single-test TestResult to (status, detail)."""
+    if result.errors:
+        return "ERROR", result.errors[0][1].strip().splitlines()[-1]
+    if result.failures:
+        return "FAIL", result.failures[0][1].strip().splitlines()[-1]
+    if result.skipped:
+        return "SKIP", result.skipped[0][1]
+    return "PASS", ""
+
+
+async def _probe(test, timeout):
+    """Run one test method in a worker thread under a timeout."""
+    result = unittest.TestResult()
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(asyncio.to_thread(test.run, result), timeout)
+        status, detail = _outcome(result)
+    except asyncio.TimeoutError:
+        status, detail = "TIMEOUT", f"no response within {timeout:.0f}s"
+    return test.id().split(".", 1)[1], status, detail, time.perf_counter() - started
+
+
+def _flatten(suite):
+    for item in suite:
+        if isinstance(item, unittest.TestSuite):
+            yield from _flatten(item)
+        else:
+            yield item
+
+
+async def run_async(patterns, timeout):
+    """Probe every selected test concurrently and print a results table.
+
+    The test methods, their requires_env skips and their shared clients are
+    the same as in the sequential run, so wall time approaches the slowest
+    single service instead of the sum of all of them.
+    """
+    suite = unittest.defaultTestLoader.loadTestsFromModule(sys.modules[__name__])
+    tests = [
+        test for test in _flatten(suite)
+        if not patterns
+        or any(fnmatch.fnmatchcase(test.id(), f"*{p}*") for p in patterns)
+    ]
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(_probe(test, timeout) for test in tests))
+    wall = time.perf_counter() - started
+
+    print()
+    print(f"{'Probe':<52} {'Status':<8} {'Secs':>6}")
+    print(f"{'-' * 52} {'-' * 8} {'-' * 6}")
+    for name, status, detail, seconds in results:
+        print(f"{name:<52} {status:<8} {seconds:>6.2f}")
+        if detail and status != "PASS":
+            print(f"    {detail}")
+    print()
+    print(f"Wall time: {wall:.2f}s (sequential sum {sum(r[3] for r in results):.2f}s)")
+
+    failed = [r for r in results if r[1] in ("FAIL", "ERROR", "TIMEOUT")]
+    return 1 if failed else 0
+
+
+# ---------------------------------------------------------------------------
+# Benchmark mode
+# ---------------------------------------------------------------------------
+
+
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _random_vector(dimension=1536):
+    return [random.uniform(-1.0, 1.0) for _ in range(dimension)]
+
+
+def _neo4j_probes():
+    missing = [v for v in ("NEO4J_URI", "NEO4J_USERNAME", "NEO4J_PASSWORD") if not os.getenv(v)]
+    if missing:
+        reason = f"missing env var(s): {', '.join(missing)}"
+        return [("neo4j.return_1", None, reason), ("neo4j.brand_match", None, reason)]
+    driver = neo4j_driver()
+    database = os.getenv("NEO4J_DATABASE", "neo4j")
+
+    def run(cypher, **params):
+        with driver.session(database=database) as session:
+            session.run(cypher, **params).consume()
+
+    return [
+        ("neo4j.return_1", "neo4j", lambda: run("RETURN 1")),
+        ("neo4j.brand_match", "neo4j", lambda: run(
+            "MATCH (n:Droom:Content {brand_id: $brand_id}) RETURN count(n)",
+            brand_id=BRAND_ID,
+        )),
+    ]
+
+
+def _pinecone_probes(cleanup):
+    """Pinecone probes; the local stand-in in a temp dir when there is no key."""
+    if os.getenv("PINECONE_API_KEY") and not LOCAL_VECTOR_STORE:
+        index = pinecone_index()
+        backend = "pinecone"
+        cleanup.append(lambda: index.delete(delete_all=True, namespace=BENCHMARK_NAMESPACE))
+    else:
+        sys.path.insert(0, str(DATABASE_DIR))
+        import numpy as np
+        from local_vector_store import LocalPinecone
+
+        root = tempfile.mkdtemp(prefix="droom-bench-")
+        cleanup.append(lambda: shutil.rmtree(root, ignore_errors=True))
+        index = LocalPinecone(root=root).Index(PINECONE_INDEX)
+        backend = "local"
+        seed = np.random.default_rng(0).standard_normal(
+            (BENCHMARK_LOCAL_VECTORS, 1536), dtype=np.float32
+        )
+        index.upsert(
+            vectors=[(f"seed-{i}", row) for i, row in enumerate(seed)],
+            namespace=BENCHMARK_NAMESPACE,
+        )
+
+    batch = [
+        {"id": f"bench-{i}", "values": _random_vector()}
+        for i in range(BENCHMARK_UPSERT_SIZE)
+    ]
+    query = _random_vector()
+    return [
+        ("pinecone.describe_index_stats", backend, index.describe_index_stats),
+        # Upserts overwrite the same ids, so the namespace size stays fixed.
+        (f"pinecone.upsert_{BENCHMARK_UPSERT_SIZE}", backend, lambda: index.upsert(
+            vectors=batch, namespace=BENCHMARK_NAMESPACE
+        )),
+        ("pinecone.query_top10", backend, lambda: index.query(
+            vector=query, top_k=10, namespace=BENCHMARK_NAMESPACE
+        )),
+    ]
+
+
+def _s3_probes():
+    if not (os.getenv("AWS_ACCESS_KEY_ID") and os.getenv("AWS_SECRET_ACCESS_KEY")):
+        return [("s3.list_objects_v2", None, "missing AWS credentials")]
+    s3 = s3_client()
+    return [("s3.list_objects_v2", "s3", lambda: s3.list_objects_v2(
+        Bucket=S3_BUCKET, Prefix=S3_KEY_PREFIX, MaxKeys=1
+    ))]
+
+
+def _openai_probes():
+    if not os.getenv("OPENAI_API_KEY"):
+        return [("openai.embedding", None, "missing OPENAI_API_KEY")]
+    import openai
+
+    client = shared_client(
+        "openai", lambda: openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    )
+    return [("openai.embedding", "openai", lambda: client.embeddings.create(
+        model="text-embedding-3-small", input="benchmark probe"
+    ))]
+
+
+def _measure(fn, reps, warmup):
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - t0) * 1000)
+    total = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        "p99_ms": round(_percentile(latencies, 99), 3),
+        "ops_per_sec": round(reps / total, 2) if total else None,
+        "reps": reps,
+    }
+
+
+def run_benchmark(patterns, reps, warmup, baseline_path, threshold, save_baseline):
+    """Time every probe, print percentiles and compare with the baseline.
+
+    Probes without credentials are skipped, except Pinecone, which falls
+    back to the local stand-in. Baseline entries are only compared when
+    they were recorded against the same backend. Returns 1 if any probe
+    errors or regresses past `threshold`.
+    """
+    cleanup = []
+    probes = []
+    builders = (_neo4j_probes, lambda: _pinecone_probes(cleanup), _s3_probes, _openai_probes)
+    for build in builders:
+        try:
+            probes.extend(build())
+        except ImportError as e:
+            print(f"  [WARN] Probe unavailable: {e}")
+    if patterns:
+        probes = [
+            probe for probe in probes
+            if any(fnmatch.fnmatchcase(probe[0], f"*{p}*") for p in patterns)
+        ]
+
+    baseline = {}
+    if baseline_path.exists():
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+    results = {}
+    failed = False
+    print(f"Benchmark: {reps} reps after {warmup} warmup, regression threshold "
+          f"{threshold:.0%} over baseline p95")
+    print()
+    print(f"{'Probe':<30} {'Backend':<9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'ops/s':>8}  Status")
+    print(f"{'-' * 30} {'-' * 9} {'-' * 8} {'-' * 8} {'-' * 8} {'-' * 8}  {'-' * 6}")
+    try:
+        for name, backend, fn in probes:
+            if backend is None:
+                print(f"{name:<30} {'-':<9} {'':>8} {'':>8} {'':>8} {'':>8}  SKIP ({fn})")
+                continue
+            try:
+                stats = _measure(fn, reps, warmup)
+            except Exception as e:
+                failed = True
+                print(f"{name:<30} {backend:<9} {'':>8} {'':>8} {'':>8} {'':>8}  ERROR ({e})")
+                continue
+            stats["backend"] = backend
+            results[name] = stats
+
+            status = "OK"
+            previous = baseline.get(name)
+            if previous and previous.get("backend") == backend:
+                if stats["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+                    status = f"REGRESSED (baseline p95 {previous['p95_ms']:.1f})"
+                    failed = True
+            if stats["p95_ms"] > DASHBOARD_TARGET_MS:
+                status += f", over {DASHBOARD_TARGET_MS}ms target"
+            print(f"{name:<30} {backend:<9} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} "
+                  f"{stats['p99_ms']:>8.1f} {stats['ops_per_sec'] or 0:>8.1f}  {status}")
+    finally:
+        for action in cleanup:
+            try:
+                action()
+            except Exception:
+                pass
+
+    if save_baseline and results:
+        with open(baseline_path, "w") as f:
+            json.dump({**baseline, **results}, f, indent=2)
+        print(f"\nBaseline written to {baseline_path}")
+    return 1 if failed else 0
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
@@ -365,6 +1069,31 @@ if __name__ == "__main__":
     print("=" * 70)
     print()
 
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--async", dest="run_async", action="store_true")
+    parser.add_argument("--timeout", type=float, default=PROBE_TIMEOUT)
+    parser.add_argument("-k", dest="patterns", action="append")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--reps", type=int, default=BENCHMARK_REPS)
+    parser.add_argument("--warmup", type=int, default=BENCHMARK_WARMUP)
+    parser.add_argument("--baseline", type=Path, default=BENCHMARK_BASELINE)
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--save-baseline", action="store_true")
+    options, remaining = parser.parse_known_args()
+    if options.benchmark:
+        exit_code = run_benchmark(
+            options.patterns, options.reps, options.warmup,
+            options.baseline, options.threshold, options.save_baseline,
+        )
+        close_shared_clients()
+        sys.exit(exit_code)
+    if options.run_async:
+        exit_code = asyncio.run(run_async(options.patterns, options.timeout))
+        close_shared_clients()
+        sys.stdout.flush()
+        # Worker threads of timed-out probes may still be blocked on I/O.
+        os._exit(exit_code)
+
     # Run with higher verbosity by default for clarity
     default_verbosity = 2 if "-v" not in sys.argv and "-q" not in sys.argv else 0
     unittest.main(verbosity=default_verbosity)
@@ -0,0 +1,275 @@
+"""
+Multi-Client Database Initialization
+Droom Marketing Factory
+
+Discovers every client under clients/ that has a brand-config.json and a
+database/ directory, then initializes all of them in one run:
+
+  1. Neo4j schema (constraints + indexes) and shared attribute nodes —
+     executed exactly once, up front.
+  2. Per-client Demographic and Geographic nodes, built from each client's
+     brand-config.json by init_neo4j's own row builders (so a later
+     per-client init_neo4j.py run writes identical rows) and seeded
+     concurrently by a bounded worker pool over one shared, pooled Neo4j
+     driver.
+  3. Pinecone index verification through one client and a single
+     describe_index_stats call, reported per client namespace.
+
+The schema definitions and seeding functions come from one client's
+database/init_neo4j.py (the first client alphabetically, or
+--schema-client). Every client's copy is generated from the same template.
+
+Usage:
+    python scripts/init_all_clients.py
+    python scripts/init_all_clients.py --workers 8 --batch-size 1000
+    python scripts/init_all_clients.py --client eastern-healing-traditions
+    python scripts/init_all_clients.py --skip-pinecone
+
+Requires:
+    pip install neo4j pinecone-client python-dotenv
+
+Environment variables (loaded from ../.env or set directly):
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, PINECONE_API_KEY
+"""
+
+import argparse
+import importlib.util
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+_script_dir = Path(__file__).resolve().parent
+CLIENTS_DIR = _script_dir.parent / "clients"
+
+DEFAULT_WORKERS = 8
+
+# ---------------------------------------------------------------------------
+# Discovery
+# ---------------------------------------------------------------------------
+
+
+def load_module(name, path):
+    """Import a client script by file path under a unique module name."""
+    # Let the script import its sibling modules (e.g. local_vector_store).
+    if str(path.parent) not in sys.path:
+        sys.path.insert(0, str(path.parent))
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def discover_clients(clients_dir, only=None):
+    """Return one entry per client directory with a brand config and database/."""
+    clients = []
+    for client_dir in sorted(p for p in clients_dir.iterdir() if p.is_dir()):
+        if only and client_dir.name not in only:
+            continue
+        config_path = client_dir / "brand-config.json"
+        if not config_path.exists() or not (client_dir / "database").is_dir():
+            continue
+        with open(config_path) as f:
+            config = json.load(f)
+        clients.append({
+            "dir": client_dir,
+            "brand_id": config["brand_id"],
+            "brand_name": config.get("brand_name", config["brand_id"]),
+            "config": config,
+        })
+    return clients
+
+
+# ---------------------------------------------------------------------------
+# Execution
+# ---------------------------------------------------------------------------
+
+
+def init_client(init_neo4j, driver, client, batch_size):
+    """Seed one client's nodes. Runs inside a worker thread."""
+    started = time.perf_counter()
+    summary = init_neo4j.new_summary()
+    init_neo4j.seed_client_nodes(
+        driver,
+        summary,
+        demographics=init_neo4j.demographic_rows(client["config"]),
+        geographic_zones=init_neo4j.geographic_rows(client["config"]),
+        batch_size=batch_size,
+        echo=False,
+    )
+    summary["seconds"] = time.perf_counter() - started
+    return summary
+
+
+def verify_pinecone(init_pinecone, clients):
+    """Verify the shared index once and count vectors per client namespace."""
+    pc = init_pinecone.Pinecone(api_key=init_pinecone.PINECONE_API_KEY)
+    index_info = next(
+        (idx for idx in pc.list_indexes() if idx.name == init_pinecone.INDEX_NAME),
+        None,
+    )
+    if index_info is None:
+        raise RuntimeError(f"Index '{init_pinecone.INDEX_NAME}' does not exist")
+    if index_info.dimension != init_pinecone.EXPECTED_DIMENSIONS:
+        raise RuntimeError(
+            f"Index dimensions {index_info.dimension}, expected "
+            f"{init_pinecone.EXPECTED_DIMENSIONS}"
+        )
+    print(f"  [OK] Index '{init_pinecone.INDEX_NAME}' "
+          f"({index_info.dimension} dims, {index_info.metric})")
+
+    stats = pc.Index(init_pinecone.INDEX_NAME).describe_index_stats()
+    existing_ns = stats.namespaces if stats.namespaces else {}
+    counts = {}
+    for client in clients:
+        names = [ns["name"] for ns in init_pinecone.client_namespaces(client["brand_id"])]
+        counts[client["brand_id"]] = {
+            name: existing_ns[name].vector_count for name in names if name in existing_ns
+        }
+    return counts
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Initialize every Droom client.")
+    parser.add_argument(
+        "--client",
+        action="append",
+        help="Only initialize this client directory (repeatable)",
+    )
+    parser.add_argument(
+        "--schema-client",
+        help="Client whose database/init_neo4j.py supplies the schema",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Clients seeded concurrently (default {DEFAULT_WORKERS})",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        help="Rows per UNWIND write transaction (default from init_neo4j)",
+    )
+    parser.add_argument(
+        "--skip-pinecone",
+        action="store_true",
+        help="Only initialize Neo4j",
+    )
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    return args
+
+
+def main():
+    args = parse_args()
+
+    clients = discover_clients(CLIENTS_DIR, only=args.client)
+    if not clients:
+        print(f"ERROR: No clients with brand-config.json and database/ in {CLIENTS_DIR}")
+        sys.exit(1)
+
+    schema_dir = clients[0]["dir"]
+    if args.schema_client:
+        schema_dir = CLIENTS_DIR / args.schema_client
+    init_neo4j = load_module("droom_init_neo4j", schema_dir / "database" / "init_neo4j.py")
+    init_pinecone = None
+    if not args.skip_pinecone:
+        init_pinecone = load_module(
+            "droom_init_pinecone", schema_dir / "database" / "init_pinecone.py"
+        )
+    # Check every credential before any client is touched.
+    init_neo4j.require_env()
+    if init_pinecone is not None:
+        init_pinecone.require_env()
+    batch_size = args.batch_size or init_neo4j.SEED_BATCH_SIZE
+    workers = min(args.workers, len(clients))
+
+    print("=" * 64)
+    print("Droom Marketing Factory - Multi-Client Initialization")
+    print(f"Clients: {len(clients)} ({workers} concurrent)")
+    print(f"Schema source: {schema_dir.name}")
+    print(f"Target: {init_neo4j.NEO4J_URI}")
+    print("=" * 64)
+
+    # One pooled driver shared by every worker.
+    driver = init_neo4j.connect(max_connection_pool_size=workers + 1)
+    try:
+        # --- Schema + shared attributes, once ---
+        shared = init_neo4j.new_summary()
+        init_neo4j.create_schema(driver, shared)
+        init_neo4j.seed_shared_attributes(driver, shared, batch_size=batch_size)
+
+        # --- Per-client nodes, concurrently ---
+        print(f"\n--- Seeding {len(clients)} client(s) ---")
+        results = {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(init_client, init_neo4j, driver, client, batch_size): client
+                for client in clients
+            }
+            for future in as_completed(futures):
+                client = futures[future]
+                try:
+                    results[client["brand_id"]] = future.result()
+                except Exception as e:
+                    summary = init_neo4j.new_summary()
+                    summary["errors"].append(f"  [FAIL] {client['brand_id']}: {e}")
+                    summary["seconds"] = 0.0
+                    results[client["brand_id"]] = summary
+                status = "FAIL" if results[client["brand_id"]]["errors"] else "OK"
+                print(f"  [{status}] {client['brand_id']}")
+    finally:
+        driver.close()
+
+    # --- Pinecone, once ---
+    vector_counts = {}
+    if init_pinecone is not None:
+        print("\n--- Verifying Pinecone ---")
+        try:
+            vector_counts = verify_pinecone(init_pinecone, clients)
+        except Exception as e:
+            msg = f"  [FAIL] Pinecone: {e}"
+            print(msg)
+            shared["errors"].append(msg)
+
+    # --- Print summary ---
+    print("\n" + "=" * 64)
+    print("INITIALIZATION SUMMARY")
+    print("=" * 64)
+    print(f"  Constraints created/verified: {shared['constraints_created']}")
+    print(f"  Indexes created/verified:     {shared['indexes_created']}")
+    print(f"  Shared attribute nodes:       {shared['shared_attribute_nodes']}")
+    print()
+    print(f"  {'Client':<36} {'Demo':>4} {'Geo':>4} {'NS':>3} {'Err':>4} {'Secs':>6}")
+    print(f"  {'-' * 36} {'-' * 4} {'-' * 4} {'-' * 3} {'-' * 4} {'-' * 6}")
+    errors = list(shared["errors"])
+    for client in clients:
+        summary = results[client["brand_id"]]
+        namespaces = len(vector_counts.get(client["brand_id"], {}))
+        ns_cell = "-" if args.skip_pinecone else str(namespaces)
+        print(
+            f"  {client['brand_id']:<36} {summary['demographic_nodes']:>4} "
+            f"{summary['geographic_nodes']:>4} {ns_cell:>3} "
+            f"{len(summary['errors']):>4} {summary['seconds']:>6.2f}"
+        )
+        errors.extend(summary["errors"])
+    print("  (NS = client namespaces that already hold vectors)")
+
+    if errors:
+        print(f"\n  ERRORS ({len(errors)}):")
+        for err in errors:
+            print(f"    {err}")
+        sys.exit(1)
+    else:
+        print("\n  All clients initialized successfully.")
+
+
+if __name__ == "__main__":
+    main()